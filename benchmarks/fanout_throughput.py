@@ -0,0 +1,352 @@
+"""
+End-to-end fan-out benchmark: TeamTalk join/leave event -> outbox -> send scheduler -> Telegram.
+
+Seeds N synthetic subscribers with varied settings into a temporary SQLite file, replaces
+the aiogram session of the event bot with an in-memory fake (configurable latency and
+error injection) and drives send_join_leave_notification_logic with synthetic users.
+Every subscriber count runs in its own process so caches, singletons and peak memory
+do not leak between runs.
+
+Reports events/s (event -> recipients resolved and enqueued), messages/s (until the outbox
+is drained or --drain-timeout passes; "left" counts what was still undelivered), peak RSS,
+event-loop lag and end-to-end p95 latency.
+
+Usage: python -m benchmarks.fanout_throughput [subscribers ...] [--events N] [--latency-ms MS]
+       [--blocked-rate R] [--network-error-rate R] [--retry-after-rate R] [--telegram-limits] [--event-bots N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DEFAULT_SUBSCRIBER_COUNTS = (1_000, 10_000, 100_000)
+LOOP_LAG_PROBE_INTERVAL_SECONDS = 0.005
+DRAIN_POLL_INTERVAL_SECONDS = 0.2
+SEED_BATCH_SIZE = 5_000
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Join/leave fan-out throughput benchmark with a fake Telegram session.")
+    parser.add_argument("subscribers", nargs="*", type=int, help=f"Subscriber counts (default: {' '.join(map(str, DEFAULT_SUBSCRIBER_COUNTS))})")
+    parser.add_argument("--events", type=int, default=10, help="Join/leave events per run")
+    parser.add_argument("--event-interval-ms", type=float, default=0.0, help="Pause between events (0 = back to back)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake Telegram API latency per request")
+    parser.add_argument("--latency-jitter-ms", type=float, default=10.0, help="Uniform jitter added to the latency")
+    parser.add_argument("--blocked-rate", type=float, default=0.0, help="Share of sends failing with 'bot was blocked by the user'")
+    parser.add_argument("--network-error-rate", type=float, default=0.0, help="Share of sends failing with a retryable network error")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="Share of sends answered with RetryAfter(1)")
+    parser.add_argument("--telegram-limits", action="store_true", help="Keep the real Telegram rate limits (otherwise they are lifted)")
+    parser.add_argument("--event-bots", type=int, default=1, help="Event bot shards; subscribers are spread evenly over them")
+    parser.add_argument("--drain-timeout", type=float, default=600.0, help="Stop waiting for the outbox after this many seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS) # Child process mode: one subscriber count
+    return parser.parse_args()
+
+
+ARGS = _parse_args()
+sys.argv = sys.argv[:1] # bot.config treats the first argument as an .env path
+
+# Never touch the real database or tokens; the rest only has to pass config validation
+_temp_dir = tempfile.TemporaryDirectory(prefix="tt_sender_bench_")
+os.environ["DATABASE_FILE"] = os.path.join(_temp_dir.name, "benchmark.db")
+os.environ["TELEGRAM_BOT_EVENT_TOKEN"] = "0:benchmark"
+os.environ["TG_EVENT_SHARD_TOKENS"] = ",".join(f"{bot_id}:benchmark" for bot_id in range(1, ARGS.event_bots))
+os.environ["JOIN_LEAVE_COALESCE_SECONDS"] = "0"
+for env_name, env_value in {
+    "HOST_NAME": "localhost",
+    "USER_NAME": "benchmark",
+    "PASSWORD": "benchmark",
+    "CHANNEL": "1",
+    "NICK_NAME": "benchmark",
+    "SERVER_NAME": "Benchmark Server",
+}.items():
+    os.environ.setdefault(env_name, env_value)
+
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter  # noqa: E402
+from aiogram.methods import SendMessage  # noqa: E402
+from aiogram.types import Chat, Message  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from bot.constants import NOTIFICATION_EVENT_JOIN, NOTIFICATION_EVENT_LEAVE  # noqa: E402
+from bot.database.engine import SessionFactory, init_db  # noqa: E402
+from bot.database.models import MutedUser, NotificationSetting, OutboxMessage, OutboxStatus, SubscribedUser, UserSettings  # noqa: E402
+from bot.core.user_settings import load_user_settings_to_cache  # noqa: E402
+from bot.core.notifications import send_join_leave_notification_logic  # noqa: E402
+from bot.core.digest import NOTIFICATION_DIGEST  # noqa: E402
+from bot.core.outbox import NOTIFICATION_OUTBOX  # noqa: E402
+from bot.core.recipient_reaper import RECIPIENT_REAPER  # noqa: E402
+from bot.core.metrics import LATENCY_METRICS  # noqa: E402
+from bot.teamtalk_bot import bot_instance as tt_bot_module  # noqa: E402
+from bot.telegram_bot import send_scheduler  # noqa: E402
+from bot.telegram_bot.bot_instances import tg_event_bots  # noqa: E402
+from bot.telegram_bot.event_shards import EVENT_SHARDS  # noqa: E402
+from bot.database.crud import get_subscriber_event_bot_ids  # noqa: E402
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+
+class FakeTelegramSession(BaseSession):
+    """In-memory aiogram session: answers SendMessage after a simulated latency, optionally with injected errors."""
+
+    def __init__(self, latency: float, jitter: float, blocked_rate: float, network_error_rate: float, retry_after_rate: float, rng: random.Random):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.blocked_rate = blocked_rate
+        self.network_error_rate = network_error_rate
+        self.retry_after_rate = retry_after_rate
+        self.rng = rng
+        self.blocked_chat_ids: set[int] = set()
+        self.sent_count = 0
+        self.error_count = 0
+        self._message_id = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError
+        yield b"" # pragma: no cover - makes this an async generator
+
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if not isinstance(method, SendMessage):
+            return True
+
+        if method.chat_id in self.blocked_chat_ids:
+            self.error_count += 1
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        roll = self.rng.random()
+        if roll < self.blocked_rate:
+            self.blocked_chat_ids.add(method.chat_id) # Stays blocked, like a real user
+            self.error_count += 1
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        roll -= self.blocked_rate
+        if roll < self.network_error_rate:
+            self.error_count += 1
+            raise TelegramNetworkError(method=method, message="Injected network error")
+        roll -= self.network_error_rate
+        if roll < self.retry_after_rate:
+            self.error_count += 1
+            raise TelegramRetryAfter(method=method, message="Too Many Requests: retry after 1", retry_after=1)
+
+        self.sent_count += 1
+        self._message_id += 1
+        return Message(
+            message_id=self._message_id,
+            date=datetime.now(),
+            chat=Chat(id=method.chat_id, type="private"),
+            text=method.text
+        )
+
+
+class SyntheticTeamTalkUser:
+    """The attributes of pytalk's User that the notification path reads."""
+
+    def __init__(self, user_id: int, username: str, nickname: str):
+        self.id = user_id
+        self.username = username
+        self.nickname = nickname
+
+
+def _synthetic_username(user_idx: int) -> str:
+    return f"user{user_idx}"
+
+
+def _settings_row(telegram_id: int, rng: random.Random, event_count: int) -> tuple[dict, list[str]]:
+    """
+    Mix of languages, notification modes, mute lists (names, prefixes, globs), allowlists, digests and NOON.
+    Returns the user_settings row and the muted_users entries.
+    """
+    muted_users = []
+    mute_all = rng.random() < 0.05
+    if mute_all or rng.random() < 0.3:
+        for _ in range(rng.randint(1, 5)):
+            muted_users.append(_synthetic_username(rng.randrange(event_count * 2)))
+        if rng.random() < 0.1:
+            muted_users.append(f"{_synthetic_username(rng.randrange(10))}*")
+        if rng.random() < 0.05:
+            muted_users.append("*bot?")
+    teamtalk_username = f"tg_linked_{telegram_id}" if rng.random() < 0.2 else None
+    settings_row = {
+        "telegram_id": telegram_id,
+        "language": "ru" if rng.random() < 0.4 else "en",
+        "notification_settings": rng.choices(
+            [NotificationSetting.ALL, NotificationSetting.JOIN_OFF, NotificationSetting.LEAVE_OFF, NotificationSetting.NONE],
+            weights=[80, 8, 8, 4]
+        )[0],
+        "mute_all": mute_all,
+        "teamtalk_username": teamtalk_username,
+        "not_on_online_enabled": teamtalk_username is not None,
+        "not_on_online_confirmed": teamtalk_username is not None,
+        "digest_enabled": rng.random() < 0.1,
+    }
+    return settings_row, list(dict.fromkeys(muted_users))
+
+
+async def _seed_subscribers(subscriber_count: int, rng: random.Random, event_count: int) -> None:
+    async with SessionFactory() as session:
+        for batch_start in range(1, subscriber_count + 1, SEED_BATCH_SIZE):
+            telegram_ids = range(batch_start, min(batch_start + SEED_BATCH_SIZE, subscriber_count + 1))
+            await session.execute(insert(SubscribedUser), [
+                {"telegram_id": telegram_id, "event_bot_id": telegram_id % ARGS.event_bots} # Bot IDs are the token prefixes 0..N-1
+                for telegram_id in telegram_ids
+            ])
+            settings_rows = [_settings_row(telegram_id, rng, event_count) for telegram_id in telegram_ids]
+            await session.execute(insert(UserSettings), [settings_row for settings_row, _ in settings_rows])
+            muted_user_rows = [
+                {"telegram_id": settings_row["telegram_id"], "tt_username": username}
+                for settings_row, muted_usernames in settings_rows for username in muted_usernames
+            ]
+            if muted_user_rows:
+                await session.execute(insert(MutedUser), muted_user_rows)
+        await session.commit()
+
+
+async def _undelivered_outbox_count() -> int:
+    async with SessionFactory() as session:
+        result = await session.execute(
+            select(func.count()).select_from(OutboxMessage)
+            .where(OutboxMessage.status.in_([OutboxStatus.PENDING, OutboxStatus.SENDING]))
+        )
+        return result.scalar_one()
+
+
+async def _probe_loop_lag(lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected_at = loop.time() + LOOP_LAG_PROBE_INTERVAL_SECONDS
+        await asyncio.sleep(LOOP_LAG_PROBE_INTERVAL_SECONDS)
+        lags.append(max(0.0, loop.time() - expected_at))
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KiB on Linux
+
+
+async def run_single(subscriber_count: int) -> dict:
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(ARGS.seed)
+    if not ARGS.telegram_limits:
+        # Measure the bot's own overhead rather than Telegram's 30 msg/s cap
+        send_scheduler.TELEGRAM_GLOBAL_MESSAGES_PER_SECOND = 1e9
+        send_scheduler.TELEGRAM_PER_CHAT_MESSAGES_PER_SECOND = 1e9
+
+    await init_db()
+    seed_started = time.perf_counter()
+    await _seed_subscribers(subscriber_count, rng, ARGS.events)
+    await load_user_settings_to_cache(SessionFactory)
+    async with SessionFactory() as session:
+        EVENT_SHARDS.load(await get_subscriber_event_bot_ids(session))
+    seed_seconds = time.perf_counter() - seed_started
+
+    fake_session = FakeTelegramSession(
+        ARGS.latency_ms / 1000, ARGS.latency_jitter_ms / 1000,
+        ARGS.blocked_rate, ARGS.network_error_rate, ARGS.retry_after_rate, rng
+    )
+    for event_bot in tg_event_bots:
+        event_bot.session = fake_session
+    tt_bot_module.current_tt_instance = None
+    tt_bot_module.login_complete_time = datetime.utcnow() # Logged in
+
+    await NOTIFICATION_OUTBOX.start()
+    RECIPIENT_REAPER.start()
+    loop_lags: list[float] = []
+    lag_probe = asyncio.create_task(_probe_loop_lag(loop_lags))
+
+    started = time.perf_counter()
+    for event_idx in range(ARGS.events):
+        user_idx = event_idx // 2
+        tt_user = SyntheticTeamTalkUser(user_idx, _synthetic_username(user_idx), f"User {user_idx}")
+        event_type = NOTIFICATION_EVENT_JOIN if event_idx % 2 == 0 else NOTIFICATION_EVENT_LEAVE
+        await send_join_leave_notification_logic(event_type, tt_user, None, time.time())
+        if ARGS.event_interval_ms:
+            await asyncio.sleep(ARGS.event_interval_ms / 1000)
+    fanout_seconds = time.perf_counter() - started
+
+    await NOTIFICATION_DIGEST.flush_all()
+    undelivered_count = await _undelivered_outbox_count()
+    while undelivered_count and time.perf_counter() - started < ARGS.drain_timeout:
+        await asyncio.sleep(DRAIN_POLL_INTERVAL_SECONDS)
+        undelivered_count = await _undelivered_outbox_count()
+    total_seconds = time.perf_counter() - started
+
+    lag_probe.cancel()
+    await NOTIFICATION_OUTBOX.stop()
+    await send_scheduler.close_send_schedulers()
+    await RECIPIENT_REAPER.stop()
+
+    loop_lags.sort()
+    end_to_end = LATENCY_METRICS.snapshot().get("notification.ingress_to_ack", {})
+    return {
+        "subscribers": subscriber_count,
+        "event_bots": ARGS.event_bots,
+        "seed_seconds": seed_seconds,
+        "events_per_second": ARGS.events / fanout_seconds,
+        "messages": fake_session.sent_count,
+        "errors": fake_session.error_count,
+        "undelivered": undelivered_count,
+        "messages_per_second": fake_session.sent_count / total_seconds,
+        "total_seconds": total_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "loop_lag_p99_ms": loop_lags[int(len(loop_lags) * 0.99)] * 1000 if loop_lags else 0.0,
+        "loop_lag_max_ms": loop_lags[-1] * 1000 if loop_lags else 0.0,
+        "end_to_end_p95_ms": end_to_end.get("p95", 0.0) * 1000,
+    }
+
+
+def main() -> None:
+    if ARGS.single is not None:
+        print(json.dumps(asyncio.run(run_single(ARGS.single))))
+        return
+
+    passthrough_args = [
+        "--events", str(ARGS.events),
+        "--event-interval-ms", str(ARGS.event_interval_ms),
+        "--drain-timeout", str(ARGS.drain_timeout),
+        "--latency-ms", str(ARGS.latency_ms),
+        "--latency-jitter-ms", str(ARGS.latency_jitter_ms),
+        "--blocked-rate", str(ARGS.blocked_rate),
+        "--network-error-rate", str(ARGS.network_error_rate),
+        "--retry-after-rate", str(ARGS.retry_after_rate),
+        "--seed", str(ARGS.seed),
+        "--event-bots", str(ARGS.event_bots),
+    ] + (["--telegram-limits"] if ARGS.telegram_limits else [])
+
+    print(
+        f"{'subscribers':>11} {'bots':>4} {'events/s':>9} {'messages':>9} {'errors':>7} {'left':>6} {'msgs/s':>8} {'total, s':>9} "
+        f"{'peak RSS, MB':>13} {'lag p99, ms':>12} {'lag max, ms':>12} {'e2e p95, ms':>12}"
+    )
+    for subscriber_count in ARGS.subscribers or DEFAULT_SUBSCRIBER_COUNTS:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.fanout_throughput", *passthrough_args, "--single", str(subscriber_count)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            print(f"{subscriber_count:>11} failed:\n{completed.stderr}", file=sys.stderr)
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        peak_rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{result['subscribers']:>11} {result['event_bots']:>4} {result['events_per_second']:>9.1f} {result['messages']:>9} {result['errors']:>7} {result['undelivered']:>6} "
+            f"{result['messages_per_second']:>8.0f} {result['total_seconds']:>9.2f} {peak_rss:>13} "
+            f"{result['loop_lag_p99_ms']:>12.1f} {result['loop_lag_max_ms']:>12.1f} {result['end_to_end_p95_ms']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: CPU time spent rendering one join notification for N recipients.
+
+Compares rendering the text for every recipient (the previous fan-out behaviour)
+with rendering it once per language and sharing the string.
+
+Usage: python -m benchmarks.notification_render [recipients ...]
+"""
+import os
+import sys
+import time
+
+# The bot config is loaded on import and requires these; values are irrelevant here
+for env_name, env_value in {
+    "TG_BOT_TOKEN": "0:benchmark",
+    "HOST_NAME": "localhost",
+    "USER_NAME": "benchmark",
+    "PASSWORD": "benchmark",
+    "CHANNEL": "1",
+    "NICK_NAME": "benchmark",
+}.items():
+    os.environ.setdefault(env_name, env_value)
+RECIPIENT_COUNT_ARGS = [int(arg) for arg in sys.argv[1:]]
+sys.argv = sys.argv[:1] # bot.config treats the first argument as an .env path
+
+from aiogram import html  # noqa: E402
+
+from bot.localization import get_text  # noqa: E402
+from bot.core.user_settings import USER_SETTINGS_CACHE, UserSpecificSettings, group_chat_ids_by_language  # noqa: E402
+
+DEFAULT_RECIPIENT_COUNTS = (10_000, 100_000)
+ROUNDS = 5
+USER_NICKNAME = "Some <User> & Co"
+SERVER_NAME = "Benchmark Server"
+
+
+def _text_generator(lang_code: str) -> str:
+    return get_text("JOIN_NOTIFICATION", lang_code, user_nickname=html.quote(USER_NICKNAME), server_name=html.quote(SERVER_NAME))
+
+
+def render_per_recipient(chat_ids: list[int]) -> list[dict]:
+    messages = []
+    for chat_id in chat_ids:
+        user_settings = USER_SETTINGS_CACHE.peek(chat_id)
+        language = user_settings.language if user_settings else "en"
+        messages.append({"chat_id": chat_id, "text": _text_generator(language)})
+    return messages
+
+
+def render_per_language(chat_ids: list[int]) -> list[dict]:
+    messages = []
+    for language, language_chat_ids in group_chat_ids_by_language(chat_ids).items():
+        text = _text_generator(language)
+        messages.extend({"chat_id": chat_id, "text": text} for chat_id in language_chat_ids)
+    return messages
+
+
+def _best_cpu_time(render_func, chat_ids: list[int]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.process_time()
+        render_func(chat_ids)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main() -> None:
+    recipient_counts = RECIPIENT_COUNT_ARGS or DEFAULT_RECIPIENT_COUNTS
+    print(f"{'recipients':>10} {'per recipient, ms':>18} {'per language, ms':>17} {'speedup':>8}")
+    for recipient_count in recipient_counts:
+        USER_SETTINGS_CACHE.clear()
+        for chat_id in range(recipient_count):
+            USER_SETTINGS_CACHE.pin(chat_id) # Recipients are subscribers, kept out of the bounded tier
+            USER_SETTINGS_CACHE[chat_id] = UserSpecificSettings(language="ru" if chat_id % 3 == 0 else "en")
+        chat_ids = list(USER_SETTINGS_CACHE)
+
+        per_recipient = _best_cpu_time(render_per_recipient, chat_ids)
+        per_language = _best_cpu_time(render_per_language, chat_ids)
+        print(f"{recipient_count:>10} {per_recipient * 1000:>18.2f} {per_language * 1000:>17.2f} {per_recipient / per_language:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
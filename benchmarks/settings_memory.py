@@ -0,0 +1,129 @@
+"""
+Memory report: bytes per user held by USER_SETTINGS_CACHE.
+
+Builds the cache for N synthetic users from DB-like user_settings rows and muted_users
+entries (fresh strings per row, as the SQLite driver returns them) twice: with the
+previous layout (a plain dataclass with a __dict__ and its own sets per user) and with
+the compact UserSpecificSettings, and reports the memory retained by each (tracemalloc).
+
+Usage: python -m benchmarks.settings_memory [users ...]
+"""
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+# The bot config is loaded on import and requires these; values are irrelevant here
+for env_name, env_value in {
+    "TG_BOT_TOKEN": "0:benchmark",
+    "HOST_NAME": "localhost",
+    "USER_NAME": "benchmark",
+    "PASSWORD": "benchmark",
+    "CHANNEL": "1",
+    "NICK_NAME": "benchmark",
+}.items():
+    os.environ.setdefault(env_name, env_value)
+USER_COUNT_ARGS = [int(arg) for arg in sys.argv[1:]]
+sys.argv = sys.argv[:1] # bot.config treats the first argument as an .env path
+
+from bot.database.models import NotificationSetting  # noqa: E402
+from bot.core.user_settings import UserSpecificSettings  # noqa: E402
+
+DEFAULT_USER_COUNTS = (10_000, 100_000)
+MUTED_LIST_CHOICES = ("", "", "", "spammer", "spammer,bot*", "alice,bob,carol") # Most users share a few lists
+
+
+@dataclass
+class LegacyUserSpecificSettings:
+    """The cache entry layout before the compact representation."""
+    language: str = "en"
+    notification_settings: NotificationSetting = NotificationSetting.ALL
+    muted_users_set: set[str] = field(default_factory=set)
+    mute_all_flag: bool = False
+    teamtalk_username: str | None = None
+    not_on_online_enabled: bool = False
+    not_on_online_confirmed: bool = False
+    digest_enabled: bool = False
+    watched_channels: set[int] = field(default_factory=set)
+    quiet_hours_start: int | None = None
+    quiet_hours_end: int | None = None
+    quiet_hours_timezone: str | None = None
+    quiet_hours_mode: str = "digest"
+
+    @classmethod
+    def from_db_row(cls, settings_row, muted_usernames):
+        return cls(
+            language=settings_row.language,
+            notification_settings=settings_row.notification_settings,
+            muted_users_set=set(muted_usernames),
+            mute_all_flag=settings_row.mute_all,
+            teamtalk_username=settings_row.teamtalk_username,
+            not_on_online_enabled=settings_row.not_on_online_enabled,
+            not_on_online_confirmed=settings_row.not_on_online_confirmed,
+            digest_enabled=settings_row.digest_enabled,
+            watched_channels={int(channel_id) for channel_id in settings_row.watched_channels.split(",")} if settings_row.watched_channels else set(),
+            quiet_hours_start=settings_row.quiet_hours_start,
+            quiet_hours_end=settings_row.quiet_hours_end,
+            quiet_hours_timezone=settings_row.quiet_hours_timezone,
+            quiet_hours_mode=settings_row.quiet_hours_mode or "digest",
+        )
+
+
+def _fresh(text: str | None) -> str | None:
+    return text.encode().decode() if text is not None else None # New object, like a value read from SQLite
+
+
+def _rows(user_count: int):
+    rng = random.Random(1)
+    for telegram_id in range(user_count):
+        has_quiet_hours = rng.random() < 0.1
+        muted_users = rng.choice(MUTED_LIST_CHOICES)
+        muted_usernames = [_fresh(username) for username in muted_users.split(",")] if muted_users else []
+        yield telegram_id, muted_usernames, SimpleNamespace(
+            language=_fresh("ru" if telegram_id % 3 == 0 else "en"),
+            notification_settings=NotificationSetting.ALL,
+            mute_all=False,
+            teamtalk_username=_fresh(f"user{telegram_id}") if rng.random() < 0.3 else None,
+            not_on_online_enabled=False,
+            not_on_online_confirmed=False,
+            digest_enabled=False,
+            watched_channels=_fresh("1,5") if rng.random() < 0.05 else None,
+            quiet_hours_start=23 * 60 if has_quiet_hours else None,
+            quiet_hours_end=7 * 60 if has_quiet_hours else None,
+            quiet_hours_timezone=_fresh("Europe/Moscow") if has_quiet_hours else None,
+            quiet_hours_mode=_fresh("digest") if has_quiet_hours else None,
+        )
+
+
+def _retained_bytes(settings_cls, user_count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    cache = {
+        telegram_id: settings_cls.from_db_row(settings_row, muted_usernames)
+        for telegram_id, muted_usernames, settings_row in _rows(user_count)
+    }
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del cache
+    return retained
+
+
+def main() -> None:
+    user_counts = USER_COUNT_ARGS or DEFAULT_USER_COUNTS
+    print(f"{'users':>8} {'before, B/user':>15} {'after, B/user':>14} {'before, MiB':>12} {'after, MiB':>11} {'saved':>6}")
+    for user_count in user_counts:
+        before = _retained_bytes(LegacyUserSpecificSettings, user_count)
+        after = _retained_bytes(UserSpecificSettings, user_count)
+        print(
+            f"{user_count:>8} {before / user_count:>15.0f} {after / user_count:>14.0f} "
+            f"{before / 2**20:>12.1f} {after / 2**20:>11.1f} {1 - after / before:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
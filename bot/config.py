@@ -7,6 +7,15 @@ from bot.constants import (
     DEFAULT_TT_STATUS_TEXT,
     DEFAULT_TT_CLIENT_NAME,
     DEFAULT_DATABASE_FILE,
+    DEFAULT_JOIN_LEAVE_COALESCE_SECONDS,
+    DEFAULT_DIGEST_WINDOW_SECONDS,
+    DEFAULT_DIGEST_MAX_EVENTS,
+    DEFAULT_USER_SETTINGS_CACHE_SIZE,
+    DEFAULT_USER_SETTINGS_CACHE_TTL_SECONDS,
+    DEFAULT_TG_HTTP_POOL_LIMIT,
+    DEFAULT_TG_HTTP_POOL_LIMIT_PER_HOST,
+    DEFAULT_TG_HTTP_KEEPALIVE_SECONDS,
+    DEFAULT_TG_HTTP_TIMEOUT_SECONDS,
     MIN_ARGS_FOR_ENV_PATH,
     DEFAULT_LANGUAGE as FALLBACK_DEFAULT_LANGUAGE
 )
@@ -16,8 +25,14 @@ def load_app_config(env_path: str | None = None) -> dict[str, Any]:
     config_data = {
         "TG_BOT_TOKEN": os.getenv("TG_BOT_TOKEN"),
         "TG_EVENT_TOKEN": os.getenv("TELEGRAM_BOT_EVENT_TOKEN") or os.getenv("TG_BOT_TOKEN"),
+        "TG_EVENT_SHARD_TOKENS": [token.strip() for token in os.getenv("TG_EVENT_SHARD_TOKENS", "").split(",") if token.strip()],
         "TG_BOT_MESSAGE_TOKEN": os.getenv("TG_BOT_MESSAGE_TOKEN"),
         "TG_ADMIN_CHAT_ID": os.getenv("TG_ADMIN_CHAT_ID"),
+        "TG_HTTP_POOL_LIMIT": int(os.getenv("TG_HTTP_POOL_LIMIT", str(DEFAULT_TG_HTTP_POOL_LIMIT))),
+        "TG_HTTP_POOL_LIMIT_PER_HOST": int(os.getenv("TG_HTTP_POOL_LIMIT_PER_HOST", str(DEFAULT_TG_HTTP_POOL_LIMIT_PER_HOST))),
+        "TG_HTTP_KEEPALIVE_SECONDS": float(os.getenv("TG_HTTP_KEEPALIVE_SECONDS", str(DEFAULT_TG_HTTP_KEEPALIVE_SECONDS))),
+        "TG_HTTP_TIMEOUT_SECONDS": float(os.getenv("TG_HTTP_TIMEOUT_SECONDS", str(DEFAULT_TG_HTTP_TIMEOUT_SECONDS))),
+        "TG_HTTP_SHARED_SESSION": os.getenv("TG_HTTP_SHARED_SESSION", "1") == "1",
         "HOSTNAME": os.getenv("HOST_NAME"),
         "PORT": int(os.getenv("PORT", str(DEFAULT_TT_PORT))),
         "ENCRYPTED": os.getenv("ENCRYPTED") == "1",
@@ -31,6 +46,11 @@ def load_app_config(env_path: str | None = None) -> dict[str, Any]:
         "SERVER_NAME": os.getenv("SERVER_NAME"),
         "ADMIN_USERNAME": os.getenv("ADMIN"),
         "GLOBAL_IGNORE_USERNAMES": os.getenv("GLOBAL_IGNORE_USERNAMES"),
+        "JOIN_LEAVE_COALESCE_SECONDS": float(os.getenv("JOIN_LEAVE_COALESCE_SECONDS", str(DEFAULT_JOIN_LEAVE_COALESCE_SECONDS))),
+        "DIGEST_WINDOW_SECONDS": float(os.getenv("DIGEST_WINDOW_SECONDS", str(DEFAULT_DIGEST_WINDOW_SECONDS))),
+        "DIGEST_MAX_EVENTS": int(os.getenv("DIGEST_MAX_EVENTS", str(DEFAULT_DIGEST_MAX_EVENTS))),
+        "USER_SETTINGS_CACHE_SIZE": int(os.getenv("USER_SETTINGS_CACHE_SIZE", str(DEFAULT_USER_SETTINGS_CACHE_SIZE))),
+        "USER_SETTINGS_CACHE_TTL_SECONDS": float(os.getenv("USER_SETTINGS_CACHE_TTL_SECONDS", str(DEFAULT_USER_SETTINGS_CACHE_TTL_SECONDS))),
         "DATABASE_FILE": os.getenv("DATABASE_FILE", DEFAULT_DATABASE_FILE),
         "DEFAULT_LANG": os.getenv("DEFAULT_LANG", FALLBACK_DEFAULT_LANGUAGE),
     }
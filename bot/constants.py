@@ -20,9 +20,6 @@ DEFAULT_LANGUAGE = "en"
 # TeamTalk message type for private messages
 TEAMTALK_PRIVATE_MESSAGE_TYPE = 1
 
-# Delay for ignoring initial user logins after bot login (seconds)
-INITIAL_LOGIN_IGNORE_DELAY_SECONDS = 2
-
 # Reconnect/Rejoin constants
 RECONNECT_DELAY_SECONDS = 5
 RECONNECT_RETRY_SECONDS = 15
@@ -33,6 +30,64 @@ REJOIN_CHANNEL_MAX_ATTEMPTS = 3
 REJOIN_CHANNEL_FAIL_WAIT_SECONDS = 20
 TT_HELP_MESSAGE_PART_DELAY = 0.3
 TT_MAX_MESSAGE_BYTES = 511
+TT_SDK_SLOW_CALL_SECONDS = 0.5 # SDK calls slower than this (including queueing) are logged
+TT_COMMAND_REPLY_TIMEOUT_SECONDS = 5.0 # How long kick/ban wait for the server's reply
+DEFAULT_JOIN_LEAVE_COALESCE_SECONDS = 3.0 # Login/logout flaps within this window cancel out
+DEFAULT_DIGEST_WINDOW_SECONDS = 60.0
+DEFAULT_DIGEST_MAX_EVENTS = 20
+DEFAULT_USER_SETTINGS_CACHE_SIZE = 10000 # Cached settings of non-subscribers; subscribers are always cached
+DEFAULT_USER_SETTINGS_CACHE_TTL_SECONDS = 3600.0
+QUIET_HOURS_MODE_DIGEST = "digest" # Events during quiet hours are sent as one digest when the window ends
+QUIET_HOURS_MODE_SUPPRESS = "suppress" # Events during quiet hours are dropped
+QUIET_HOURS_MAX_DEFERRED_EVENTS = 50 # Per subscriber; the rest are only counted in the digest
+TIMER_WHEEL_TICK_SECONDS = 1.0
+TIMER_WHEEL_SLOT_COUNT = 3600
+USER_SETTINGS_LOAD_BATCH_SIZE = 5000 # Rows per streamed partition of the startup settings load
+USER_SETTINGS_LOAD_PROGRESS_ROWS = 50000
+
+# Telegram outbound rate limiting (per bot instance)
+TELEGRAM_GLOBAL_MESSAGES_PER_SECOND = 30
+TELEGRAM_PER_CHAT_MESSAGES_PER_SECOND = 1
+# Send priority lanes (lower value is served first) and their in-flight budgets
+SEND_PRIORITY_URGENT = 0 # Admin forwards, command replies
+SEND_PRIORITY_NOTIFICATION = 1 # Join/leave notifications
+SEND_PRIORITY_DIGEST = 2
+TELEGRAM_SEND_LANE_CONCURRENCY = {
+    SEND_PRIORITY_URGENT: 5,
+    SEND_PRIORITY_NOTIFICATION: 15,
+    SEND_PRIORITY_DIGEST: 5,
+}
+TELEGRAM_CHAT_BUCKET_IDLE_SECONDS = 60 # Per-chat buckets unused for this long are dropped
+TELEGRAM_SEND_SHUTDOWN_DRAIN_SECONDS = 5
+
+# Telegram HTTP connection pool (defaults for the TG_HTTP_* settings)
+DEFAULT_TG_HTTP_POOL_LIMIT = 100 # Total connections of one session
+DEFAULT_TG_HTTP_POOL_LIMIT_PER_HOST = 0 # 0 = no separate per-host limit (all requests go to api.telegram.org)
+DEFAULT_TG_HTTP_KEEPALIVE_SECONDS = 30.0 # Idle connections are kept this long for reuse
+DEFAULT_TG_HTTP_TIMEOUT_SECONDS = 60.0 # Per-request timeout
+
+# Notification outbox (durable queue in SQLite)
+OUTBOX_WORKER_COUNT = 8
+OUTBOX_CLAIM_BATCH_SIZE = 200
+OUTBOX_POLL_INTERVAL_SECONDS = 2
+OUTBOX_RETRY_BASE_SECONDS = 5
+OUTBOX_RETRY_MAX_SECONDS = 600
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETENTION_HOURS = 24 # Sent/failed rows are kept this long
+OUTBOX_PURGE_INTERVAL_SECONDS = 3600
+
+# Per-chat delivery circuit breaker (timeouts, server errors, non-fatal BadRequests)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5 # Consecutive failures that open a chat's circuit
+CIRCUIT_BREAKER_BASE_COOLDOWN_SECONDS = 60 # First cool-down; doubles on every trip
+CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS = 6 * 3600
+CIRCUIT_BREAKER_LIST_LIMIT = 20 # Chats shown by /circuits
+
+# Removal of recipients that blocked the bot / no longer exist
+REAPER_BATCH_SIZE = 500
+REAPER_FLUSH_INTERVAL_SECONDS = 2
+
+# Write-behind persistence of user settings changes
+SETTINGS_FLUSH_INTERVAL_SECONDS = 0.3
 
 # Minimum arguments for env path
 MIN_ARGS_FOR_ENV_PATH = 2
@@ -47,6 +102,8 @@ LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 # Database
 DEFAULT_DATABASE_FILE = "bot_data.db"
 DB_MAIN_NAME = "main"
+SQLITE_BUSY_TIMEOUT_MS = 30000 # Writers wait for the lock instead of failing with "database is locked"
+DB_SCHEMA_VERSION_MUTED_USERS_TABLE = 1 # PRAGMA user_version once muted lists live in the muted_users table
 
 # TeamTalk Client
 DEFAULT_TT_CLIENT_NAME = "TTTM"
@@ -0,0 +1,104 @@
+import logging
+import asyncio
+from aiogram import html
+
+from bot.config import app_config
+from bot.localization import get_text
+from bot.core.user_settings import USER_SETTINGS_CACHE
+from bot.core.outbox import NOTIFICATION_OUTBOX
+from bot.constants import DEFAULT_LANGUAGE, NOTIFICATION_EVENT_JOIN, SEND_PRIORITY_DIGEST
+
+logger = logging.getLogger(__name__)
+
+
+def render_digest(events: list[tuple[str, str]], server_name: str, language: str, omitted_count: int = 0) -> str:
+    """One message listing (event_type, user nickname) events; omitted_count adds an "and N more" line."""
+    lines = [get_text("DIGEST_HEADER", language, count=len(events) + omitted_count, server_name=html.quote(server_name))]
+    for event_type, user_nickname in events:
+        line_key = "DIGEST_JOIN_LINE" if event_type == NOTIFICATION_EVENT_JOIN else "DIGEST_LEAVE_LINE"
+        lines.append(get_text(line_key, language, user_nickname=html.quote(user_nickname)))
+    if omitted_count:
+        lines.append(get_text("DIGEST_MORE_LINE", language, count=omitted_count))
+    return "\n".join(lines)
+
+
+class _DigestEntry:
+    __slots__ = ("events", "server_name", "first_event_at", "timer")
+
+    def __init__(self, timer: asyncio.TimerHandle | None, first_event_at: float | None):
+        self.events: list[tuple[str, str]] = [] # (event_type, user nickname)
+        self.server_name = ""
+        self.first_event_at = first_event_at # Ingress time of the oldest buffered event, for latency metrics
+        self.timer = timer
+
+
+class NotificationDigestBuffer:
+    """
+    Buffers join/leave events of subscribers with digest mode enabled.
+
+    A subscriber's buffer is flushed as one combined message window_seconds after its first
+    event or as soon as it holds max_events events. Buffers that become due in the same
+    loop iteration are enqueued to the outbox together.
+    """
+
+    def __init__(self, window_seconds: float, max_events: int):
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self._buffers: dict[int, _DigestEntry] = {}
+        self._due_chat_ids: set[int] = set()
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def buffered_chats(self) -> int:
+        return len(self._buffers)
+
+    def add(self, chat_ids: list[int], event_type: str, user_nickname: str, server_name: str, ingress_time: float | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        for chat_id in chat_ids:
+            entry = self._buffers.get(chat_id)
+            if entry is None:
+                entry = _DigestEntry(loop.call_later(self.window_seconds, self._mark_due, chat_id), ingress_time)
+                self._buffers[chat_id] = entry
+            entry.events.append((event_type, user_nickname))
+            entry.server_name = server_name
+            if len(entry.events) >= self.max_events:
+                entry.timer.cancel()
+                self._mark_due(chat_id)
+
+    async def flush_all(self) -> None:
+        """Flushes every buffer immediately (used at shutdown)."""
+        for entry in self._buffers.values():
+            entry.timer.cancel()
+        self._due_chat_ids.update(self._buffers)
+        await self._flush_due()
+
+    def _mark_due(self, chat_id: int) -> None:
+        self._due_chat_ids.add(chat_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_due())
+
+    async def _flush_due(self) -> None:
+        while self._due_chat_ids:
+            due_chat_ids, self._due_chat_ids = self._due_chat_ids, set()
+            outbox_messages = []
+            for chat_id in due_chat_ids:
+                entry = self._buffers.pop(chat_id, None)
+                if entry is None or not entry.events:
+                    continue
+                user_settings = USER_SETTINGS_CACHE.peek(chat_id)
+                language = user_settings.language if user_settings else DEFAULT_LANGUAGE
+                outbox_messages.append({
+                    "chat_id": chat_id,
+                    "text": render_digest(entry.events, entry.server_name, language),
+                    "priority": SEND_PRIORITY_DIGEST,
+                    "event_at": entry.first_event_at,
+                })
+            if not outbox_messages:
+                continue
+            if not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+                logger.error(f"Failed to enqueue {len(outbox_messages)} notification digests.")
+            else:
+                logger.debug(f"Enqueued {len(outbox_messages)} notification digests.")
+
+
+NOTIFICATION_DIGEST = NotificationDigestBuffer(app_config["DIGEST_WINDOW_SECONDS"], app_config["DIGEST_MAX_EVENTS"])
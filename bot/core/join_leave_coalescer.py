@@ -0,0 +1,107 @@
+import logging
+import asyncio
+
+import pytalk
+from pytalk.instance import TeamTalkInstance
+from pytalk.user import User as TeamTalkUser
+
+from bot.config import app_config
+from bot.core.notifications import send_join_leave_notification_logic, get_join_leave_ignore_reason
+
+logger = logging.getLogger(__name__)
+ttstr = pytalk.instance.sdk.ttstr
+
+
+class _PendingEvent:
+    __slots__ = ("event_type", "tt_user", "tt_instance", "ingress_time", "channel_id", "timer")
+
+    def __init__(
+        self,
+        event_type: str,
+        tt_user: TeamTalkUser,
+        tt_instance: TeamTalkInstance,
+        ingress_time: float | None,
+        channel_id: int | None,
+        timer: asyncio.TimerHandle
+    ):
+        self.event_type = event_type
+        self.tt_user = tt_user
+        self.tt_instance = tt_instance
+        self.ingress_time = ingress_time
+        self.channel_id = channel_id
+        self.timer = timer
+
+
+class JoinLeaveCoalescer:
+    """
+    Holds join/leave events per TeamTalk username for a short window.
+
+    A login followed by a logout (or a logout followed by a login) of the same username
+    within the window cancels out, so flapping clients produce no notifications at all;
+    only events that are still pending when their window ends are fanned out.
+    A window of 0 disables coalescing.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._pending: dict[str, _PendingEvent] = {}
+        self._dispatch_tasks: set[asyncio.Task] = set()
+        self.cancelled_pairs = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def submit(
+        self,
+        event_type: str,
+        tt_user: TeamTalkUser,
+        tt_instance: TeamTalkInstance,
+        ingress_time: float | None = None,
+        channel_id: int | None = None # Known at ingress for leaves; None resolves the user's channel at dispatch
+    ) -> None:
+        username = ttstr(tt_user.username)
+        # Initial sync events are decided at ingress; after the window the login may no longer look recent
+        if self.window_seconds <= 0 or not username or get_join_leave_ignore_reason():
+            await send_join_leave_notification_logic(event_type, tt_user, tt_instance, ingress_time, channel_id)
+            return
+
+        pending = self._pending.pop(username, None)
+        if pending is not None:
+            pending.timer.cancel()
+            if pending.event_type != event_type:
+                self.cancelled_pairs += 1
+                logger.debug(f"Coalesced {pending.event_type}/{event_type} flap of {username}; no notification sent.")
+                return
+            # Same event twice (e.g. a second client session): the earlier one is real, send it now
+            self._dispatch(pending)
+
+        timer = asyncio.get_running_loop().call_later(self.window_seconds, self._on_window_end, username)
+        self._pending[username] = _PendingEvent(event_type, tt_user, tt_instance, ingress_time, channel_id, timer)
+
+    async def flush(self) -> None:
+        """Sends all pending events immediately and waits for their fan-out (used at shutdown)."""
+        pending_events = list(self._pending.values())
+        self._pending.clear()
+        for pending in pending_events:
+            pending.timer.cancel()
+            self._dispatch(pending)
+        if self._dispatch_tasks:
+            await asyncio.gather(*self._dispatch_tasks, return_exceptions=True)
+
+    def _on_window_end(self, username: str) -> None:
+        pending = self._pending.pop(username, None)
+        if pending is not None:
+            self._dispatch(pending)
+
+    def _dispatch(self, pending: _PendingEvent) -> None:
+        task = asyncio.create_task(
+            send_join_leave_notification_logic(
+                pending.event_type, pending.tt_user, pending.tt_instance, pending.ingress_time, pending.channel_id
+            )
+        )
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+
+JOIN_LEAVE_COALESCER = JoinLeaveCoalescer(app_config["JOIN_LEAVE_COALESCE_SECONDS"])
@@ -0,0 +1,82 @@
+import bisect
+import math
+import time
+
+# Histogram bucket upper bounds in seconds: 1 ms to ~1 hour, 10 buckets per decade
+_BUCKET_BOUNDS: tuple[float, ...] = tuple(10 ** (exponent / 10) for exponent in range(-30, 36))
+
+# Stage names used by the notification pipeline
+STAGE_INGRESS_TO_RESOLVED = "ingress_to_resolved" # TeamTalk event received -> recipients resolved (includes flap coalescing)
+STAGE_RESOLVED_TO_SEND_START = "resolved_to_send_start" # Outbox/digest queueing
+STAGE_SEND_START_TO_ACK = "send_start_to_ack" # Rate limiting + Telegram API call
+STAGE_INGRESS_TO_ACK = "ingress_to_ack" # End to end
+
+
+class LatencyHistogram:
+    """Fixed log-bucket histogram; percentiles are reported as the upper bound of the bucket."""
+    __slots__ = ("counts", "count", "total", "max_value")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1) # Last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+
+    def observe(self, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max_value:
+            self.max_value = seconds
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for bucket_idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(_BUCKET_BOUNDS[bucket_idx], self.max_value) if bucket_idx < len(_BUCKET_BOUNDS) else self.max_value
+        return self.max_value
+
+
+class LatencyRegistry:
+    """Per-stage latency histograms, keyed by "<pipeline>.<stage>" (e.g. "notification.send_start_to_ack")."""
+
+    def __init__(self):
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self.started_at = time.time()
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self._histograms[name] = histogram
+        histogram.observe(seconds)
+
+    def observe_since(self, name: str, started_at: float | None) -> None:
+        """Records time.time() - started_at; no-op when the start timestamp is unknown."""
+        if started_at is not None:
+            self.observe(name, time.time() - started_at)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {
+                "count": histogram.count,
+                "mean": histogram.total / histogram.count if histogram.count else 0.0,
+                "p50": histogram.percentile(0.50),
+                "p95": histogram.percentile(0.95),
+                "p99": histogram.percentile(0.99),
+                "max": histogram.max_value,
+            }
+            for name, histogram in sorted(self._histograms.items())
+        }
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self.started_at = time.time()
+
+
+LATENCY_METRICS = LatencyRegistry()
@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime, timedelta
+import time
 from aiogram import html
 
 import pytalk
@@ -8,140 +8,189 @@ from pytalk.user import User as TeamTalkUser # Убедитесь, что это
 
 from bot.config import app_config
 from bot.localization import get_text
-from bot.database.crud import get_all_subscribers_ids
 from bot.database.engine import SessionFactory
-from bot.core.user_settings import get_or_create_user_settings
-from bot.telegram_bot.utils import send_telegram_messages_to_list
+from bot.core.user_settings import rebuild_recipient_index
+from bot.core.recipient_index import RECIPIENT_INDEX
+from bot.core.username_filters import UsernamePatternMatcher, parse_username_patterns
+from bot.core.metrics import LATENCY_METRICS, STAGE_INGRESS_TO_RESOLVED
+from bot.core.user_settings import USER_SETTINGS_CACHE, USER_SETTINGS_READY, group_chat_ids_by_language
+from bot.core.outbox import NOTIFICATION_OUTBOX
+from bot.core.digest import NOTIFICATION_DIGEST
+from bot.core.quiet_hours import QUIET_HOURS
 from bot.constants import (
     NOTIFICATION_EVENT_JOIN,
-    NOTIFICATION_EVENT_LEAVE,
-    INITIAL_LOGIN_IGNORE_DELAY_SECONDS
+    NOTIFICATION_EVENT_LEAVE
 )
 # Import teamtalk_bot.bot_instance carefully
 from bot.teamtalk_bot import bot_instance as tt_bot_module
+from bot.teamtalk_bot.online_users import ONLINE_USERS, RosterUser
 from bot.core.utils import get_effective_server_name, get_tt_user_display_name
 
 logger = logging.getLogger(__name__)
 ttstr = pytalk.instance.sdk.ttstr # Убедитесь, что sdk здесь доступен или импортируйте правильно
 
+# Compiled once; the setting only changes with a restart
+GLOBAL_IGNORE_MATCHER = UsernamePatternMatcher(parse_username_patterns(app_config.get("GLOBAL_IGNORE_USERNAMES")))
 
-async def should_notify_user(
-    telegram_id: int,
-    tt_user_username: str, 
-    event_type: str, 
-    session 
-) -> bool:
-    user_specific_settings = await get_or_create_user_settings(telegram_id, session)
+# Users whose join was dispatched before they entered a channel: user_id -> ingress time of the login.
+# Subscribers with channel filters are notified about them on their first channel join.
+_JOINS_AWAITING_CHANNEL: dict[int, float | None] = {}
 
-    notification_pref = user_specific_settings.notification_settings
-    mute_all_flag = user_specific_settings.mute_all_flag
-    muted_users = user_specific_settings.muted_users_set
 
-    try:
-        from bot.database.models import NotificationSetting as NotificationSettingEnum
-        if notification_pref == NotificationSettingEnum.NONE: return False
-        if event_type == NOTIFICATION_EVENT_JOIN and notification_pref == NotificationSettingEnum.JOIN_OFF: return False
-        if event_type == NOTIFICATION_EVENT_LEAVE and notification_pref == NotificationSettingEnum.LEAVE_OFF: return False
-    except ImportError:
-        logger.error("Could not import NotificationSetting enum for should_notify_user checks. String comparison fallback might be unreliable.")
-        # Fallback, если enum не импортируется (менее надежно)
-        if str(notification_pref.value) == "none": return False # Сравнение со строковым значением enum
-        if event_type == NOTIFICATION_EVENT_JOIN and str(notification_pref.value) == "join_off": return False
-        if event_type == NOTIFICATION_EVENT_LEAVE and str(notification_pref.value) == "leave_off": return False
+def get_join_leave_ignore_reason() -> str:
+    """Returns why join/leave events are currently ignored (not logged in yet), or an empty string."""
+    # Получаем актуальное значение login_complete_time из модуля bot_instance
+    if tt_bot_module.login_complete_time is None:
+        return "bot still initializing/reconnecting"
+    return ""
+
+
+async def _build_join_leave_messages(
+    event_type: str,
+    tt_user: TeamTalkUser | RosterUser,
+    server_name_val: str,
+    ingress_time: float | None,
+    channel_id: int,
+    channel_watchers_only: bool = False
+) -> list[dict]:
+    """
+    Applies the ignore filters and resolves the recipients of one join/leave event.
+    Digest subscribers get the event added to their digest; returns the outbox messages for everyone else.
+    """
+    user_nickname_val = get_tt_user_display_name(tt_user, "en") # Using "en" as per original logic for this specific var
+    user_username_val = ttstr(tt_user.username) # Still needed for specific checks like global ignore
+    user_id_val = tt_user.id
+
+    if not user_username_val:
+        logger.warning(f"User {event_type} with empty username (Nickname: {user_nickname_val}, ID: {user_id_val}). Skipping notification.")
+        return []
+
+    if GLOBAL_IGNORE_MATCHER.matches(user_username_val):
+        logger.info(f"User {user_username_val} is in the global ignore list. Skipping {event_type} notification.")
+        return []
 
+    await USER_SETTINGS_READY.wait() # The index is built from the settings cache once it is loaded
+    if not RECIPIENT_INDEX.is_built:
+        async with SessionFactory() as session:
+            await rebuild_recipient_index(session)
 
-    if mute_all_flag:
-        return tt_user_username in muted_users
-    else:
-        return tt_user_username not in muted_users
+    chat_ids_to_notify_list = list(RECIPIENT_INDEX.resolve(event_type, user_username_val, channel_id, channel_watchers_only))
+    LATENCY_METRICS.observe_since(f"notification.{STAGE_INGRESS_TO_RESOLVED}", ingress_time)
+    logger.debug(f"Recipient index resolved {len(chat_ids_to_notify_list)} of {len(RECIPIENT_INDEX)} subscribers for {event_type} of {user_username_val}.")
+
+    # Subscribers in quiet hours are dropped here or get the event in their end-of-window digest
+    chat_ids_to_notify_list = QUIET_HOURS.filter_recipients(chat_ids_to_notify_list, event_type, user_nickname_val, server_name_val)
+    if not chat_ids_to_notify_list:
+        return []
+    logger.info(f"Notifications for {event_type} of {user_username_val} will be sent to {len(chat_ids_to_notify_list)} Telegram users.")
+
+    def text_generator_func(lang_code: str) -> str:
+        key_str = "JOIN_NOTIFICATION" if event_type == NOTIFICATION_EVENT_JOIN else "LEAVE_NOTIFICATION"
+        return get_text(key_str, lang_code, user_nickname=html.quote(user_nickname_val), server_name=html.quote(server_name_val))
+
+    immediate_chat_ids = []
+    digest_chat_ids = []
+    for chat_id_val in chat_ids_to_notify_list:
+        user_settings_val = USER_SETTINGS_CACHE.peek(chat_id_val)
+        if user_settings_val and user_settings_val.digest_enabled:
+            digest_chat_ids.append(chat_id_val)
+        else:
+            immediate_chat_ids.append(chat_id_val)
+
+    # Text depends only on the language, so each variant is rendered once per event
+    outbox_messages = []
+    for language_val, chat_ids_val in group_chat_ids_by_language(immediate_chat_ids).items():
+        text_val = text_generator_func(language_val)
+        outbox_messages.extend({"chat_id": chat_id_val, "text": text_val, "event_at": ingress_time} for chat_id_val in chat_ids_val)
+
+    if digest_chat_ids:
+        NOTIFICATION_DIGEST.add(digest_chat_ids, event_type, user_nickname_val, server_name_val, ingress_time)
+    return outbox_messages
 
 
 async def send_join_leave_notification_logic(
     event_type: str,
     tt_user: TeamTalkUser,
-    tt_instance: TeamTalkInstance
+    tt_instance: TeamTalkInstance,
+    ingress_time: float | None = None, # time.time() when the TeamTalk event arrived, for latency metrics
+    channel_id: int | None = None # User's channel for channel filters; None looks it up now
 ):
     logger.info(f"--- send_join_leave_notification_logic started for event: {event_type}, user: {ttstr(tt_user.username)} ---")
 
-    # Получаем актуальное значение login_complete_time из модуля bot_instance
-    current_login_complete_time = tt_bot_module.login_complete_time
-    reason_for_ignore = ""
-
-    if current_login_complete_time is None:
-        reason_for_ignore = "bot still initializing/reconnecting"
-    elif datetime.utcnow() < current_login_complete_time + timedelta(seconds=INITIAL_LOGIN_IGNORE_DELAY_SECONDS):
-        reason_for_ignore = "bot login too recent"
-
+    reason_for_ignore = get_join_leave_ignore_reason()
     if reason_for_ignore:
-        if event_type == NOTIFICATION_EVENT_JOIN:
-             logger.debug(f"Ignoring potential initial sync {event_type} for {ttstr(tt_user.username)} ({tt_user.id}). Reason: {reason_for_ignore}.")
-        logger.info(f"--- send_join_leave_notification_logic finished: Ignored. Reason: {reason_for_ignore} ---")
+        logger.debug(f"Ignoring {event_type} for {ttstr(tt_user.username)} ({tt_user.id}). Reason: {reason_for_ignore}.")
         return
 
-    user_nickname_val = get_tt_user_display_name(tt_user, "en") # Using "en" as per original logic for this specific var
-    user_username_val = ttstr(tt_user.username) # Still needed for specific checks like global ignore
-    user_id_val = tt_user.id
+    if channel_id is None:
+        # Joins are resolved after the coalescing window, by when the user has usually entered a channel
+        channel_id = ONLINE_USERS.channel_of(tt_user.id)
+    if event_type == NOTIFICATION_EVENT_JOIN and not channel_id:
+        # Not in a channel yet: only subscribers without channel filters are resolved now
+        _JOINS_AWAITING_CHANNEL[tt_user.id] = ingress_time
+    outbox_messages = await _build_join_leave_messages(event_type, tt_user, get_effective_server_name(), ingress_time, channel_id)
+    if not outbox_messages:
+        return
 
-    global_ignore_usernames_str = app_config.get("GLOBAL_IGNORE_USERNAMES", "")
-    globally_ignored_usernames_set = set()
-    if global_ignore_usernames_str:
-        globally_ignored_usernames_set = {name.strip() for name in global_ignore_usernames_str.split(',') if name.strip()}
+    # Persisted first, delivered by the outbox workers; survives restarts and Telegram outages
+    if not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+        logger.error(f"Failed to enqueue {len(outbox_messages)} {event_type} notifications for {ttstr(tt_user.username)}.")
 
-    if not user_username_val:
-        logger.warning(f"User {event_type} with empty username (Nickname: {user_nickname_val}, ID: {user_id_val}). Skipping notification.")
-        logger.info(f"--- send_join_leave_notification_logic finished: Empty username ---")
-        return
 
-    if user_username_val in globally_ignored_usernames_set:
-        logger.info(f"User {user_username_val} is in the global ignore list. Skipping {event_type} notification.")
-        logger.info(f"--- send_join_leave_notification_logic finished: User globally ignored ---")
+async def send_channel_join_notifications(tt_user: TeamTalkUser, channel_id: int):
+    """
+    Completes a join dispatched while the user was not in a channel yet: notifies the
+    subscribers watching the first channel the user enters. Later channel switches are ignored.
+    """
+    if tt_user.id not in _JOINS_AWAITING_CHANNEL:
         return
-
-    server_name_val = get_effective_server_name(tt_instance)
-
-    chat_ids_to_notify_list = []
-    async with SessionFactory() as session:
-        all_subscriber_ids = await get_all_subscribers_ids(session)
-        logger.debug(f"Subscribers to check for notification: {all_subscriber_ids}")
-
-        if not all_subscriber_ids:
-            logger.info("No subscribers found in the database.")
-        
-        logger.info(f"Processing {event_type} notifications for TeamTalk user {user_username_val}. Checking {len(all_subscriber_ids)} subscribed Telegram users.")
-        for chat_id_val in all_subscriber_ids:
-            user_specific_settings_for_log = await get_or_create_user_settings(chat_id_val, session)
-            # Используем .value для enum, если он доступен, иначе пытаемся привести к строке
-            notification_pref_value = "N/A"
-            if hasattr(user_specific_settings_for_log.notification_settings, 'value'):
-                notification_pref_value = user_specific_settings_for_log.notification_settings.value
-            elif user_specific_settings_for_log.notification_settings is not None:
-                notification_pref_value = str(user_specific_settings_for_log.notification_settings)
-
-            logger.debug(f"Checking notification for TG_ID {chat_id_val}. Settings: NotifyPref={notification_pref_value}, MuteAll={user_specific_settings_for_log.mute_all_flag}, MutedUsers={user_specific_settings_for_log.muted_users_set}. Event TT User: {user_username_val}")
-
-            should_notify_result = await should_notify_user(chat_id_val, user_username_val, event_type, session)
-            logger.debug(f"Result of should_notify_user for TG_ID {chat_id_val}: {should_notify_result}")
-
-            if should_notify_result:
-                chat_ids_to_notify_list.append(chat_id_val)
-                logger.debug(f"TG_ID {chat_id_val} WILL be notified for {user_username_val}.")
-            else:
-                logger.debug(f"TG_ID {chat_id_val} WILL NOT be notified for {user_username_val}.")
-
-    if chat_ids_to_notify_list:
-        logger.info(f"Notifications for {event_type} of {user_username_val} will be sent to {len(chat_ids_to_notify_list)} Telegram users.")
-    if not chat_ids_to_notify_list:
+    ingress_time = _JOINS_AWAITING_CHANNEL.pop(tt_user.id)
+    if get_join_leave_ignore_reason():
         return
+    outbox_messages = await _build_join_leave_messages(
+        NOTIFICATION_EVENT_JOIN, tt_user, get_effective_server_name(), ingress_time, channel_id, channel_watchers_only=True
+    )
+    if outbox_messages and not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+        logger.error(f"Failed to enqueue {len(outbox_messages)} channel join notifications for {ttstr(tt_user.username)}.")
 
-    def text_generator_func(lang_code: str) -> str:
-        key_str = "JOIN_NOTIFICATION" if event_type == NOTIFICATION_EVENT_JOIN else "LEAVE_NOTIFICATION"
-        return get_text(key_str, lang_code, user_nickname=html.quote(user_nickname_val), server_name=html.quote(server_name_val))
 
-    await send_telegram_messages_to_list(
-        bot_token_to_use=app_config["TG_EVENT_TOKEN"], 
-        chat_ids=chat_ids_to_notify_list,
-        text_generator=text_generator_func,
-        tt_user_username_for_markup=user_username_val,
-        tt_user_nickname_for_markup=user_nickname_val, 
-        tt_instance_for_check=tt_instance 
-    )
+def forget_join_awaiting_channel(user_id: int) -> None:
+    """Called on logout; the user's ID may be reused by a later session."""
+    _JOINS_AWAITING_CHANNEL.pop(user_id, None)
+
+
+def clear_joins_awaiting_channel() -> None:
+    """Called on disconnect; the roster resync after reconnecting reports users who logged in meanwhile."""
+    _JOINS_AWAITING_CHANNEL.clear()
+
+
+async def send_roster_diff_notifications(
+    joined_users: list[TeamTalkUser],
+    left_users: list[RosterUser],
+    tt_instance: TeamTalkInstance
+):
+    """
+    Notifies about users whose presence changed while the bot was disconnected
+    (see OnlineUserIndex.resync). All messages are enqueued as one batch.
+    """
+    if not joined_users and not left_users:
+        return
+    logger.info(f"Roster resync after reconnect: {len(joined_users)} joined, {len(left_users)} left during the gap.")
+
+    ingress_time = time.time()
+    server_name_val = get_effective_server_name()
+    outbox_messages = []
+    for user in joined_users:
+        channel_id = ONLINE_USERS.channel_of(user.id)
+        if not channel_id:
+            _JOINS_AWAITING_CHANNEL[user.id] = ingress_time
+        outbox_messages.extend(await _build_join_leave_messages(
+            NOTIFICATION_EVENT_JOIN, user, server_name_val, ingress_time, channel_id
+        ))
+    for roster_user in left_users:
+        outbox_messages.extend(await _build_join_leave_messages(
+            NOTIFICATION_EVENT_LEAVE, roster_user, server_name_val, ingress_time, roster_user.channel_id
+        ))
+
+    if outbox_messages and not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+        logger.error(f"Failed to enqueue {len(outbox_messages)} roster resync notifications.")
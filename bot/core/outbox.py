@@ -0,0 +1,222 @@
+import logging
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramBadRequest
+
+from bot.database.engine import SessionFactory
+from bot.database.crud import (
+    add_outbox_messages,
+    claim_due_outbox_messages,
+    save_outbox_results,
+    release_stale_outbox_claims,
+    purge_sent_outbox_messages,
+)
+from bot.database.models import OutboxMessage
+from bot.core.user_settings import USER_SETTINGS_CACHE, USER_SETTINGS_READY
+from bot.core.metrics import (
+    LATENCY_METRICS,
+    STAGE_RESOLVED_TO_SEND_START,
+    STAGE_SEND_START_TO_ACK,
+    STAGE_INGRESS_TO_ACK,
+)
+from bot.telegram_bot.event_shards import EVENT_SHARDS
+from bot.telegram_bot.circuit_breaker import ChatCircuitOpenError
+from bot.telegram_bot.utils import deliver_telegram_message, _handle_telegram_api_error
+from bot.teamtalk_bot import bot_instance as tt_bot_module
+from bot.constants import (
+    DEFAULT_LANGUAGE,
+    SEND_PRIORITY_DIGEST,
+    OUTBOX_WORKER_COUNT,
+    OUTBOX_CLAIM_BATCH_SIZE,
+    OUTBOX_POLL_INTERVAL_SECONDS,
+    OUTBOX_RETRY_BASE_SECONDS,
+    OUTBOX_RETRY_MAX_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETENTION_HOURS,
+    OUTBOX_PURGE_INTERVAL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_delay_seconds(attempts: int) -> float:
+    return min(OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX_SECONDS)
+
+
+class OutboxDispatcher:
+    """
+    Drains the SQLite notification outbox to Telegram.
+
+    A feeder task claims due messages in batches and hands them to a pool of drain workers.
+    Outcomes are buffered and written back in one transaction per feeder iteration:
+    delivered messages are marked SENT, transient failures are rescheduled with
+    exponential backoff, permanent ones (blocked bot, chat not found) are marked FAILED.
+    """
+
+    def __init__(self, worker_count: int = OUTBOX_WORKER_COUNT):
+        self.worker_count = worker_count
+        self._queue: asyncio.Queue[OutboxMessage] = asyncio.Queue(maxsize=OUTBOX_CLAIM_BATCH_SIZE * 2)
+        self._new_messages = asyncio.Event()
+        self._claimed_ids: set[int] = set()
+        self._sent_ids: list[int] = []
+        self._failed_ids: list[int] = []
+        self._retries: list[tuple[int, int, datetime]] = []
+        self._tasks: list[asyncio.Task] = []
+        self._last_purge: datetime | None = None
+        self.failed_flush_count = 0
+
+    @property
+    def pending_in_memory(self) -> int:
+        return len(self._claimed_ids)
+
+    async def enqueue(self, messages: list[dict]) -> bool:
+        """Appends rendered messages ({"chat_id", "text"[, "priority", "event_at", "not_before"]}) to the outbox and wakes the feeder."""
+        async with SessionFactory() as session:
+            added = await add_outbox_messages(session, messages)
+        if added:
+            self._new_messages.set()
+        return added
+
+    async def start(self) -> None:
+        async with SessionFactory() as session:
+            released_count = await release_stale_outbox_claims(session)
+        if released_count:
+            logger.info(f"Outbox: {released_count} messages claimed by a previous run returned to pending.")
+        self._tasks.append(asyncio.create_task(self._feed_loop(), name="outbox_feeder"))
+        for worker_idx in range(self.worker_count):
+            self._tasks.append(asyncio.create_task(self._drain_worker(), name=f"outbox_worker_{worker_idx}"))
+        logger.info(f"Outbox dispatcher started with {self.worker_count} drain workers.")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        # Messages taken from the DB but not attempted go back to PENDING for the next run
+        finished_ids = set(self._sent_ids) | set(self._failed_ids) | {message_id for message_id, _, _ in self._retries}
+        released_ids = list(self._claimed_ids - finished_ids)
+        await self._flush_results(released_ids)
+        logger.info(f"Outbox dispatcher stopped. {len(released_ids)} unsent messages kept for the next run.")
+
+    async def _feed_loop(self) -> None:
+        await USER_SETTINGS_READY.wait() # Deliveries read the recipients' cached settings
+        while True:
+            try:
+                await self._flush_results()
+                await self._purge_if_due()
+
+                if self._queue.qsize() < OUTBOX_CLAIM_BATCH_SIZE:
+                    async with SessionFactory() as session:
+                        messages = await claim_due_outbox_messages(session, OUTBOX_CLAIM_BATCH_SIZE)
+                    for message in messages:
+                        self._claimed_ids.add(message.id)
+                        await self._queue.put(message)
+                    if len(messages) == OUTBOX_CLAIM_BATCH_SIZE:
+                        continue # More may be due right away
+
+                self._new_messages.clear()
+                try:
+                    await asyncio.wait_for(self._new_messages.wait(), OUTBOX_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox feeder error: {e}", exc_info=True)
+                await asyncio.sleep(OUTBOX_POLL_INTERVAL_SECONDS)
+
+    async def _drain_worker(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox worker failed on message {message.id} for chat {message.chat_id}: {e}", exc_info=True)
+                self._schedule_retry(message)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: OutboxMessage) -> None:
+        pipeline = "digest" if message.priority == SEND_PRIORITY_DIGEST else "notification"
+        send_started_at = time.time()
+        LATENCY_METRICS.observe(
+            f"{pipeline}.{STAGE_RESOLVED_TO_SEND_START}",
+            send_started_at - message.created_at.replace(tzinfo=timezone.utc).timestamp()
+        )
+        try:
+            await deliver_telegram_message(
+                EVENT_SHARDS.bot_for_chat(message.chat_id),
+                message.chat_id,
+                message.text,
+                tt_instance_for_check=tt_bot_module.current_tt_instance,
+                priority=message.priority
+            )
+        except ChatCircuitOpenError as e:
+            # The chat keeps failing; skip instead of spending rate budget on it
+            logger.debug(f"Outbox message {message.id} skipped: {e}")
+            self._failed_ids.append(message.id)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Retrying will not help; let the common handler unsubscribe/clean up the chat
+            user_settings = USER_SETTINGS_CACHE.peek(message.chat_id)
+            await _handle_telegram_api_error(e, message.chat_id, user_settings.language if user_settings else DEFAULT_LANGUAGE)
+            self._failed_ids.append(message.id)
+        except TelegramAPIError as e:
+            logger.warning(f"Outbox message {message.id} for chat {message.chat_id} failed (attempt {message.attempts + 1}): {e}")
+            self._schedule_retry(message)
+        else:
+            self._sent_ids.append(message.id)
+            LATENCY_METRICS.observe_since(f"{pipeline}.{STAGE_SEND_START_TO_ACK}", send_started_at)
+            LATENCY_METRICS.observe_since(f"{pipeline}.{STAGE_INGRESS_TO_ACK}", message.event_at)
+        self._new_messages.set() # Let the feeder write results back promptly
+
+    def _schedule_retry(self, message: OutboxMessage) -> None:
+        attempts = message.attempts + 1
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Outbox message {message.id} for chat {message.chat_id} dropped after {attempts} attempts.")
+            self._failed_ids.append(message.id)
+            return
+        next_attempt_at = datetime.utcnow() + timedelta(seconds=_retry_delay_seconds(attempts))
+        self._retries.append((message.id, attempts, next_attempt_at))
+
+    async def _flush_results(self, released_ids: list[int] | None = None) -> None:
+        if not (self._sent_ids or self._failed_ids or self._retries or released_ids):
+            return
+        sent_ids, failed_ids, retries = self._sent_ids, self._failed_ids, self._retries
+        self._sent_ids, self._failed_ids, self._retries = [], [], []
+        async with SessionFactory() as session:
+            try:
+                await save_outbox_results(session, sent_ids, failed_ids, retries, released_ids)
+            except Exception as e:
+                # Keep the outcomes for the next flush attempt
+                self._sent_ids.extend(sent_ids)
+                self._failed_ids.extend(failed_ids)
+                self._retries.extend(retries)
+                self.failed_flush_count += 1
+                logger.error(
+                    f"Failed to save {len(sent_ids) + len(failed_ids) + len(retries)} outbox results "
+                    f"({len(self._claimed_ids)} messages claimed): {e}",
+                    exc_info=True
+                )
+                return
+        self._claimed_ids.difference_update(sent_ids)
+        self._claimed_ids.difference_update(failed_ids)
+        self._claimed_ids.difference_update(message_id for message_id, _, _ in retries)
+        if released_ids:
+            self._claimed_ids.difference_update(released_ids)
+
+    async def _purge_if_due(self) -> None:
+        now = datetime.utcnow()
+        if self._last_purge and (now - self._last_purge).total_seconds() < OUTBOX_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        async with SessionFactory() as session:
+            purged_count = await purge_sent_outbox_messages(session, now - timedelta(hours=OUTBOX_RETENTION_HOURS))
+        if purged_count:
+            logger.info(f"Outbox: purged {purged_count} delivered/failed messages older than {OUTBOX_RETENTION_HOURS}h.")
+
+
+# Workers wait on one send each; every event bot shard brings its own rate limit to fill
+NOTIFICATION_OUTBOX = OutboxDispatcher(OUTBOX_WORKER_COUNT * len(EVENT_SHARDS))
@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from bot.core.user_settings import USER_SETTINGS_CACHE, UserSpecificSettings
+from bot.core.digest import render_digest
+from bot.core.outbox import NOTIFICATION_OUTBOX
+from bot.core.timer_wheel import TimerWheel
+from bot.constants import (
+    DEFAULT_LANGUAGE,
+    SEND_PRIORITY_DIGEST,
+    QUIET_HOURS_MODE_SUPPRESS,
+    QUIET_HOURS_MAX_DEFERRED_EVENTS,
+    TIMER_WHEEL_TICK_SECONDS,
+    TIMER_WHEEL_SLOT_COUNT,
+)
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def get_timezone(timezone_name: str | None) -> ZoneInfo | timezone:
+    """ZoneInfo for an IANA name; UTC for empty or unknown names."""
+    if not timezone_name:
+        return timezone.utc
+    try:
+        return ZoneInfo(timezone_name) # ZoneInfo caches instances itself
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def is_valid_timezone(timezone_name: str) -> bool:
+    try:
+        ZoneInfo(timezone_name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def quiet_window_end(settings: UserSpecificSettings, now: datetime) -> datetime | None:
+    """
+    If now (aware) falls in the subscriber's quiet hours, returns when that window ends (aware);
+    otherwise None. Windows may wrap past midnight (23:00-07:00).
+    """
+    start_minute, end_minute = settings.quiet_hours_start, settings.quiet_hours_end
+    if start_minute is None or end_minute is None or start_minute == end_minute:
+        return None
+    local_now = now.astimezone(get_timezone(settings.quiet_hours_timezone))
+    minute_of_day = local_now.hour * 60 + local_now.minute
+    if start_minute < end_minute:
+        in_window = start_minute <= minute_of_day < end_minute
+    else:
+        in_window = minute_of_day >= start_minute or minute_of_day < end_minute
+    if not in_window:
+        return None
+    minutes_left = (end_minute - minute_of_day) % MINUTES_PER_DAY
+    # Aware arithmetic is wall-clock time, so the end stays e.g. 07:00 across a DST change
+    return local_now.replace(second=0, microsecond=0) + timedelta(minutes=minutes_left)
+
+
+class _DeferredEntry:
+    __slots__ = ("events", "server_name", "omitted_count")
+
+    def __init__(self):
+        self.events: list[tuple[str, str]] = [] # (event_type, user nickname)
+        self.server_name = ""
+        self.omitted_count = 0
+
+
+class QuietHoursScheduler:
+    """
+    Applies subscribers' quiet hours to join/leave fan-out.
+
+    During quiet hours events are dropped (suppress mode) or collected and sent as one
+    digest when the window ends (digest mode). End-of-window deliveries are kept on a
+    single timer wheel, so 100k deferred subscribers cost one task, not 100k.
+    Pending digests are moved to the outbox at shutdown, delayed to their window end.
+    """
+
+    def __init__(self, max_events_per_chat: int):
+        self.max_events_per_chat = max_events_per_chat
+        self._deferred: dict[int, _DeferredEntry] = {}
+        self._wheel = TimerWheel(TIMER_WHEEL_TICK_SECONDS, TIMER_WHEEL_SLOT_COUNT, self._deliver_due)
+        self.suppressed_count = 0
+        self.deferred_count = 0
+
+    @property
+    def deferred_chats(self) -> int:
+        return len(self._deferred)
+
+    def filter_recipients(self, chat_ids: list[int], event_type: str, user_nickname: str, server_name: str) -> list[int]:
+        """Returns the chat_ids that are not in quiet hours; the others are suppressed or deferred here."""
+        now = None
+        awake_chat_ids = []
+        for chat_id in chat_ids:
+            user_settings = USER_SETTINGS_CACHE.peek(chat_id)
+            if user_settings is None or user_settings.quiet_hours_start is None:
+                awake_chat_ids.append(chat_id)
+                continue
+            now = now or datetime.now(timezone.utc)
+            window_end = quiet_window_end(user_settings, now)
+            if window_end is None:
+                awake_chat_ids.append(chat_id)
+            elif user_settings.quiet_hours_mode == QUIET_HOURS_MODE_SUPPRESS:
+                self.suppressed_count += 1
+            else:
+                self._defer(chat_id, window_end, event_type, user_nickname, server_name)
+        return awake_chat_ids
+
+    def _defer(self, chat_id: int, window_end: datetime, event_type: str, user_nickname: str, server_name: str) -> None:
+        entry = self._deferred.get(chat_id)
+        if entry is None:
+            entry = _DeferredEntry()
+            self._deferred[chat_id] = entry
+        if chat_id not in self._wheel:
+            self._wheel.schedule(chat_id, window_end.timestamp())
+        if len(entry.events) < self.max_events_per_chat:
+            entry.events.append((event_type, user_nickname))
+        else:
+            entry.omitted_count += 1
+        entry.server_name = server_name
+        self.deferred_count += 1
+
+    def _build_messages(self, chat_ids: list[int], not_before: dict[int, float] | None = None) -> list[dict]:
+        outbox_messages = []
+        for chat_id in chat_ids:
+            entry = self._deferred.pop(chat_id, None)
+            if entry is None or not entry.events:
+                continue
+            user_settings = USER_SETTINGS_CACHE.peek(chat_id)
+            language = user_settings.language if user_settings else DEFAULT_LANGUAGE
+            message = {
+                "chat_id": chat_id,
+                "text": render_digest(entry.events, entry.server_name, language, entry.omitted_count),
+                "priority": SEND_PRIORITY_DIGEST,
+            }
+            if not_before and chat_id in not_before:
+                message["not_before"] = datetime.utcfromtimestamp(not_before[chat_id])
+            outbox_messages.append(message)
+        return outbox_messages
+
+    async def _deliver_due(self, chat_ids: list[int]) -> None:
+        outbox_messages = self._build_messages(chat_ids)
+        if not outbox_messages:
+            return
+        if not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+            logger.error(f"Failed to enqueue {len(outbox_messages)} quiet hours digests.")
+        else:
+            logger.info(f"Enqueued {len(outbox_messages)} quiet hours digests.")
+
+    async def stop(self) -> None:
+        """Stops the wheel and hands pending digests to the outbox, delayed to their window end."""
+        await self._wheel.stop()
+        due_at_by_chat_id = {chat_id: self._wheel.due_at(chat_id) for chat_id in self._deferred if chat_id in self._wheel}
+        self._wheel.pop_all()
+        outbox_messages = self._build_messages(list(self._deferred), due_at_by_chat_id)
+        if outbox_messages and not await NOTIFICATION_OUTBOX.enqueue(outbox_messages):
+            logger.error(f"Failed to persist {len(outbox_messages)} quiet hours digests at shutdown.")
+
+
+QUIET_HOURS = QuietHoursScheduler(QUIET_HOURS_MAX_DEFERRED_EVENTS)
@@ -0,0 +1,185 @@
+import logging
+from typing import Iterable, Callable
+
+from bot.database.models import NotificationSetting
+from bot.constants import NOTIFICATION_EVENT_JOIN
+from bot.core.username_filters import UsernamePatternMatcher, classify_username_pattern
+
+logger = logging.getLogger(__name__)
+
+# Small integer codes for NotificationSetting, stored per subscriber instead of enum members.
+NOTIFICATION_SETTING_CODES: dict[NotificationSetting, int] = {
+    NotificationSetting.ALL: 0,
+    NotificationSetting.JOIN_OFF: 1,
+    NotificationSetting.LEAVE_OFF: 2,
+    NotificationSetting.NONE: 3,
+}
+_JOIN_ALLOWED_CODES = frozenset({NOTIFICATION_SETTING_CODES[NotificationSetting.ALL], NOTIFICATION_SETTING_CODES[NotificationSetting.LEAVE_OFF]})
+_LEAVE_ALLOWED_CODES = frozenset({NOTIFICATION_SETTING_CODES[NotificationSetting.ALL], NOTIFICATION_SETTING_CODES[NotificationSetting.JOIN_OFF]})
+
+
+class RecipientIndex:
+    """
+    Precomputed recipient index for join/leave fan-out.
+
+    Holds per-subscriber preference codes and an inverted index from TeamTalk username
+    to the subscribers that have it in their muted (or, with mute_all, allowed) list,
+    so that resolving the recipients of an event is a handful of set operations.
+    List entries that are patterns (prefix*, globs) are indexed by pattern; all distinct
+    patterns share one compiled matcher, rebuilt only when the set of patterns changes.
+    Subscribers with channel filters are indexed by channel ID only, so events in
+    channels nobody watches never touch them.
+    """
+
+    def __init__(self):
+        self.is_built: bool = False
+        self._pref_codes: dict[int, int] = {}
+        self._listed_usernames: dict[int, frozenset[str]] = {}
+        self._mute_all_ids: set[int] = set()
+        self._join_ids: set[int] = set() # Subscribers without channel filters
+        self._leave_ids: set[int] = set()
+        self._watched_channels: dict[int, frozenset[int]] = {}
+        self._join_ids_by_channel: dict[int, set[int]] = {}
+        self._leave_ids_by_channel: dict[int, set[int]] = {}
+        self._by_username: dict[str, set[int]] = {}
+        self._by_pattern: dict[str, set[int]] = {}
+        self._pattern_matcher: UsernamePatternMatcher | None = None
+
+    def __len__(self) -> int:
+        return len(self._pref_codes)
+
+    def __contains__(self, telegram_id: int) -> bool:
+        return telegram_id in self._pref_codes
+
+    def rebuild(self, subscriber_ids: Iterable[int], settings_lookup: Callable[[int], object | None]) -> None:
+        """Rebuilds the whole index. settings_lookup returns UserSpecificSettings or None for a subscriber."""
+        self._pref_codes.clear()
+        self._listed_usernames.clear()
+        self._mute_all_ids.clear()
+        self._join_ids.clear()
+        self._leave_ids.clear()
+        self._watched_channels.clear()
+        self._join_ids_by_channel.clear()
+        self._leave_ids_by_channel.clear()
+        self._by_username.clear()
+        self._by_pattern.clear()
+        self._pattern_matcher = None
+        for telegram_id in subscriber_ids:
+            self._insert(telegram_id, settings_lookup(telegram_id))
+        self.is_built = True
+        logger.info(
+            f"Recipient index built for {len(self._pref_codes)} subscribers, "
+            f"{len(self._by_username)} listed usernames, {len(self._by_pattern)} listed patterns, "
+            f"{len(self._watched_channels)} with channel filters."
+        )
+
+    def add_subscriber(self, telegram_id: int, settings=None) -> None:
+        self._discard(telegram_id)
+        self._insert(telegram_id, settings)
+
+    def remove_subscriber(self, telegram_id: int) -> None:
+        self._discard(telegram_id)
+
+    def update_settings(self, telegram_id: int, settings) -> None:
+        """Re-indexes a subscriber after a settings change. Non-subscribers are ignored."""
+        if telegram_id not in self._pref_codes:
+            return
+        self._discard(telegram_id)
+        self._insert(telegram_id, settings)
+
+    def resolve(self, event_type: str, tt_username: str, channel_id: int = 0, channel_watchers_only: bool = False) -> set[int]:
+        """
+        Returns the Telegram IDs that should be notified about event_type for tt_username.
+        channel_id is the user's channel (0 if unknown); it only matters for subscribers with channel filters.
+        With channel_watchers_only, only subscribers watching channel_id are considered.
+        """
+        if event_type == NOTIFICATION_EVENT_JOIN:
+            allowed_ids, allowed_ids_by_channel = self._join_ids, self._join_ids_by_channel
+        else:
+            allowed_ids, allowed_ids_by_channel = self._leave_ids, self._leave_ids_by_channel
+        channel_allowed_ids = allowed_ids_by_channel.get(channel_id) if channel_id else None
+        if channel_watchers_only:
+            allowed_ids = channel_allowed_ids or set()
+        elif channel_allowed_ids:
+            allowed_ids = allowed_ids | channel_allowed_ids
+        listed_ids = self._by_username.get(tt_username)
+        if self._by_pattern:
+            pattern_listed_ids = self._match_patterns(tt_username)
+            if pattern_listed_ids:
+                listed_ids = pattern_listed_ids | listed_ids if listed_ids else pattern_listed_ids
+        if not listed_ids:
+            return allowed_ids - self._mute_all_ids
+        # Block list subscribers are notified unless listed, allow list (mute_all) subscribers only if listed.
+        return (allowed_ids - self._mute_all_ids - listed_ids) | (listed_ids & self._mute_all_ids & allowed_ids)
+
+    def _match_patterns(self, tt_username: str) -> set[int]:
+        if self._pattern_matcher is None:
+            self._pattern_matcher = UsernamePatternMatcher(self._by_pattern)
+        matched_ids: set[int] = set()
+        for pattern in self._pattern_matcher.matching_patterns(tt_username):
+            matched_ids |= self._by_pattern[pattern]
+        return matched_ids
+
+    def _listing_map(self, username_or_pattern: str) -> dict[str, set[int]]:
+        return self._by_username if classify_username_pattern(username_or_pattern) == "exact" else self._by_pattern
+
+    def _insert(self, telegram_id: int, settings) -> None:
+        if settings is None:
+            pref_code = NOTIFICATION_SETTING_CODES[NotificationSetting.ALL]
+            mute_all = False
+            listed_usernames: frozenset[str] = frozenset()
+            watched_channels: frozenset[int] = frozenset()
+        else:
+            pref_code = NOTIFICATION_SETTING_CODES.get(settings.notification_settings, NOTIFICATION_SETTING_CODES[NotificationSetting.ALL])
+            mute_all = settings.mute_all_flag
+            listed_usernames = settings.muted_users_set # Already frozen and shared between subscribers
+            watched_channels = settings.watched_channels
+
+        self._pref_codes[telegram_id] = pref_code
+        if watched_channels:
+            self._watched_channels[telegram_id] = watched_channels
+            for channel_id in watched_channels:
+                if pref_code in _JOIN_ALLOWED_CODES:
+                    self._join_ids_by_channel.setdefault(channel_id, set()).add(telegram_id)
+                if pref_code in _LEAVE_ALLOWED_CODES:
+                    self._leave_ids_by_channel.setdefault(channel_id, set()).add(telegram_id)
+        else:
+            if pref_code in _JOIN_ALLOWED_CODES:
+                self._join_ids.add(telegram_id)
+            if pref_code in _LEAVE_ALLOWED_CODES:
+                self._leave_ids.add(telegram_id)
+        if mute_all:
+            self._mute_all_ids.add(telegram_id)
+        if listed_usernames:
+            self._listed_usernames[telegram_id] = listed_usernames
+            for username in listed_usernames:
+                listing_map = self._listing_map(username)
+                if listing_map is self._by_pattern and username not in self._by_pattern:
+                    self._pattern_matcher = None # New pattern; recompile on next use
+                listing_map.setdefault(username, set()).add(telegram_id)
+
+    def _discard(self, telegram_id: int) -> None:
+        if self._pref_codes.pop(telegram_id, None) is None:
+            return
+        self._join_ids.discard(telegram_id)
+        self._leave_ids.discard(telegram_id)
+        self._mute_all_ids.discard(telegram_id)
+        for channel_id in self._watched_channels.pop(telegram_id, ()):
+            for ids_by_channel in (self._join_ids_by_channel, self._leave_ids_by_channel):
+                channel_ids = ids_by_channel.get(channel_id)
+                if channel_ids is not None:
+                    channel_ids.discard(telegram_id)
+                    if not channel_ids:
+                        del ids_by_channel[channel_id]
+        for username in self._listed_usernames.pop(telegram_id, ()):
+            listing_map = self._listing_map(username)
+            listed_ids = listing_map.get(username)
+            if listed_ids is not None:
+                listed_ids.discard(telegram_id)
+                if not listed_ids:
+                    del listing_map[username]
+                    if listing_map is self._by_pattern:
+                        self._pattern_matcher = None
+
+
+RECIPIENT_INDEX = RecipientIndex()
@@ -0,0 +1,127 @@
+import logging
+import asyncio
+import enum
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramBadRequest
+
+from bot.database.engine import SessionFactory
+from bot.database.crud import remove_dead_recipients
+from bot.core.user_settings import USER_SETTINGS_CACHE
+from bot.core.recipient_index import RECIPIENT_INDEX
+from bot.telegram_bot.event_shards import EVENT_SHARDS
+from bot.constants import REAPER_BATCH_SIZE, REAPER_FLUSH_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class DeadRecipientReason(enum.Enum):
+    BLOCKED = "blocked"
+    DEACTIVATED = "deactivated"
+    KICKED = "kicked"
+    CHAT_NOT_FOUND = "chat_not_found"
+
+# Reasons whose user data is deleted entirely; the others are only unsubscribed
+_DELETE_DATA_REASONS = frozenset({DeadRecipientReason.CHAT_NOT_FOUND})
+
+# Telegram API error descriptions (the "description" field), by error class
+_DEAD_RECIPIENT_DESCRIPTIONS: dict[type[TelegramAPIError], tuple[tuple[str, DeadRecipientReason], ...]] = {
+    TelegramForbiddenError: (
+        ("bot was blocked by the user", DeadRecipientReason.BLOCKED),
+        ("user is deactivated", DeadRecipientReason.DEACTIVATED),
+        ("bot was kicked", DeadRecipientReason.KICKED),
+    ),
+    TelegramBadRequest: (
+        ("chat not found", DeadRecipientReason.CHAT_NOT_FOUND),
+    ),
+}
+
+
+def classify_dead_recipient(error: TelegramAPIError) -> DeadRecipientReason | None:
+    """Returns why the recipient can never be reached again, or None if the error is not of that kind."""
+    for error_class, descriptions in _DEAD_RECIPIENT_DESCRIPTIONS.items():
+        if isinstance(error, error_class):
+            description = error.message.lower()
+            for description_part, reason in descriptions:
+                if description_part in description:
+                    return reason
+    return None
+
+
+class RecipientReaper:
+    """
+    Removes unreachable recipients in batches.
+
+    Failed sends only enqueue the chat ID; a background task removes queued recipients
+    in one transaction per batch and then evicts them from USER_SETTINGS_CACHE and
+    RECIPIENT_INDEX, so a mass block event does not turn into many tiny concurrent transactions.
+    """
+
+    def __init__(self):
+        self._queue: dict[int, DeadRecipientReason] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.reaped_count = 0
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, chat_id: int, reason: DeadRecipientReason) -> None:
+        if chat_id in self._queue and self._queue[chat_id] in _DELETE_DATA_REASONS:
+            return # Already queued for the stronger action
+        self._queue[chat_id] = reason
+        if len(self._queue) >= REAPER_BATCH_SIZE:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="recipient_reaper")
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        while self._queue: # Reap what is left before shutdown
+            if not await self._reap_batch():
+                break
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), REAPER_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                if not await self._reap_batch():
+                    break
+
+    async def _reap_batch(self) -> bool:
+        batch = dict(list(self._queue.items())[:REAPER_BATCH_SIZE])
+        for chat_id in batch:
+            del self._queue[chat_id]
+        delete_ids = [chat_id for chat_id, reason in batch.items() if reason in _DELETE_DATA_REASONS]
+        unsubscribe_ids = [chat_id for chat_id, reason in batch.items() if reason not in _DELETE_DATA_REASONS]
+
+        try:
+            async with SessionFactory() as session:
+                await remove_dead_recipients(session, unsubscribe_ids, delete_ids)
+        except Exception as e:
+            logger.error(f"Failed to remove {len(batch)} unreachable recipients, will retry: {e}", exc_info=True)
+            # Put the batch back (without overriding newer entries) and retry on the next run
+            for chat_id, reason in batch.items():
+                self._queue.setdefault(chat_id, reason)
+            return False
+
+        for chat_id in batch:
+            USER_SETTINGS_CACHE.pop(chat_id, None)
+            RECIPIENT_INDEX.remove_subscriber(chat_id)
+            EVENT_SHARDS.remove(chat_id)
+        self.reaped_count += len(batch)
+        logger.info(f"Reaped {len(batch)} unreachable recipients: {len(unsubscribe_ids)} unsubscribed, {len(delete_ids)} deleted.")
+        return True
+
+
+RECIPIENT_REAPER = RecipientReaper()
@@ -0,0 +1,119 @@
+from typing import Generic, Hashable, Iterator, MutableMapping, TypeVar
+from cachetools import TTLCache
+
+_Value = TypeVar("_Value")
+
+
+class CountingTTLCache(TTLCache):
+    """cachetools TTLCache (LRU order, per-entry TTL) that counts what it evicts."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.evicted_count = 0 # Dropped to stay within maxsize
+        self.expired_count = 0
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.evicted_count += 1
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expired_count += len(expired)
+        return expired
+
+
+class UserSettingsCache(Generic[_Value]):
+    """
+    Settings cache with two tiers: pinned entries (active subscribers, needed on every
+    fan-out) are kept in a plain dict and never evicted; all other entries (e.g. users
+    who only pressed /start) live in a bounded transient cache, by default LRU with a TTL.
+    Any cachetools-style mapping can be plugged in as the transient tier.
+
+    Keys are pinned by ID, so an entry stored later for a pinned ID goes straight to
+    the pinned tier. Counts hits and misses of get(), which is meant for handler lookups
+    (get_or_create_user_settings); fan-out and other internal reads use peek().
+    """
+
+    def __init__(self, transient_cache: MutableMapping[Hashable, _Value]):
+        self._pinned: dict[Hashable, _Value] = {}
+        self._pinned_ids: set[Hashable] = set()
+        self._transient = transient_cache
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def pinned_count(self) -> int:
+        return len(self._pinned)
+
+    @property
+    def transient_count(self) -> int:
+        return len(self._transient)
+
+    @property
+    def evicted_count(self) -> int:
+        return getattr(self._transient, "evicted_count", 0) + getattr(self._transient, "expired_count", 0)
+
+    def pin(self, key: Hashable) -> None:
+        """Keeps the key's entry (now or once stored) out of eviction."""
+        self._pinned_ids.add(key)
+        value = self._transient.pop(key, None)
+        if value is not None:
+            self._pinned[key] = value
+
+    def unpin(self, key: Hashable) -> None:
+        """Makes the key's entry evictable again."""
+        self._pinned_ids.discard(key)
+        value = self._pinned.pop(key, None)
+        if value is not None:
+            self._transient[key] = value
+
+    def get(self, key: Hashable, default: _Value | None = None) -> _Value | None:
+        value = self._pinned.get(key)
+        if value is None:
+            value = self._transient.get(key)
+            if value is None:
+                self.misses += 1
+                return default
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> _Value | None:
+        """Like get(), but not counted in the hit/miss statistics (per-recipient and other internal lookups)."""
+        value = self._pinned.get(key)
+        return value if value is not None else self._transient.get(key)
+
+    def pop(self, key: Hashable, default: _Value | None = None) -> _Value | None:
+        """Removes the entry and its pin."""
+        self._pinned_ids.discard(key)
+        value = self._pinned.pop(key, None)
+        if value is None:
+            value = self._transient.pop(key, None)
+        return default if value is None else value
+
+    def clear(self) -> None:
+        self._pinned.clear()
+        self._pinned_ids.clear()
+        self._transient.clear()
+
+    def __setitem__(self, key: Hashable, value: _Value) -> None:
+        if key in self._pinned_ids:
+            self._pinned[key] = value
+        else:
+            self._transient[key] = value
+
+    def __getitem__(self, key: Hashable) -> _Value:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pinned or key in self._transient
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._transient)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        yield from self._pinned
+        yield from list(self._transient)
@@ -0,0 +1,136 @@
+import logging
+import asyncio
+from typing import Any, Iterable
+from sqlalchemy import delete, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from bot.database.engine import SessionFactory
+from bot.database.models import UserSettings, MutedUser
+from bot.constants import SETTINGS_FLUSH_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsWriteBehind:
+    """
+    Write-behind persistence for user settings.
+
+    Handlers update USER_SETTINGS_CACHE at once and only stage the change here; a background
+    task writes everything staged in one transaction every flush interval (and at shutdown).
+    Repeated changes of one user collapse into a single row upsert, and muted-list toggles
+    into one insert or delete per (user, username), so answering a callback no longer waits
+    for a SQLite commit. A failed flush keeps its changes staged for the next one.
+    """
+
+    def __init__(self, flush_interval_seconds: float):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._settings_rows: dict[int, dict[str, Any]] = {} # telegram_id -> user_settings column values
+        self._muted_users: dict[int, dict[str, bool]] = {} # telegram_id -> {tt_username: listed}
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flush_count = 0
+        self.written_count = 0
+        self.failed_flush_count = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._settings_rows) + sum(len(user_changes) for user_changes in self._muted_users.values())
+
+    def has_pending(self, telegram_id: int) -> bool:
+        return telegram_id in self._settings_rows or telegram_id in self._muted_users
+
+    def stage_settings(self, settings_row: dict[str, Any]) -> None:
+        self._settings_rows[settings_row["telegram_id"]] = settings_row
+
+    def stage_muted_user(self, telegram_id: int, tt_username: str, is_listed: bool) -> None:
+        self._muted_users.setdefault(telegram_id, {})[tt_username] = is_listed
+
+    async def discard(self, telegram_ids: Iterable[int]) -> None:
+        """
+        Drops staged changes of users whose data is being deleted. Runs under the flush lock,
+        after a flush in progress has finished (a failed one puts its rows back first), so no
+        flush can write their rows back after the deletion.
+        """
+        telegram_ids = set(telegram_ids)
+        async with self._flush_lock:
+            for telegram_id in telegram_ids:
+                self._settings_rows.pop(telegram_id, None)
+                self._muted_users.pop(telegram_id, None)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="settings_writer")
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if not await self.flush():
+            logger.error(f"Lost {self.pending_count} staged settings changes at shutdown.")
+
+    async def flush(self) -> bool:
+        """Writes all staged changes in one transaction; returns False (keeping them staged) on error."""
+        async with self._flush_lock:
+            if not self._settings_rows and not self._muted_users:
+                return True
+            settings_rows, self._settings_rows = self._settings_rows, {}
+            muted_users, self._muted_users = self._muted_users, {}
+            muted_change_count = sum(len(user_changes) for user_changes in muted_users.values())
+            try:
+                async with SessionFactory() as session:
+                    connection = await session.connection()
+                    if settings_rows:
+                        upsert = sqlite_insert(UserSettings)
+                        column_names = next(iter(settings_rows.values())).keys() - {"telegram_id"}
+                        upsert = upsert.on_conflict_do_update(
+                            index_elements=[UserSettings.telegram_id],
+                            set_={column_name: upsert.excluded[column_name] for column_name in column_names}
+                        )
+                        await connection.execute(upsert, list(settings_rows.values()))
+                    listed_rows = [
+                        {"telegram_id": telegram_id, "tt_username": tt_username}
+                        for telegram_id, user_changes in muted_users.items()
+                        for tt_username, is_listed in user_changes.items() if is_listed
+                    ]
+                    unlisted_rows = [
+                        {"row_telegram_id": telegram_id, "row_tt_username": tt_username}
+                        for telegram_id, user_changes in muted_users.items()
+                        for tt_username, is_listed in user_changes.items() if not is_listed
+                    ]
+                    if listed_rows:
+                        await connection.execute(sqlite_insert(MutedUser).on_conflict_do_nothing(), listed_rows)
+                    if unlisted_rows:
+                        await connection.execute(
+                            delete(MutedUser).where(
+                                MutedUser.telegram_id == bindparam("row_telegram_id"),
+                                MutedUser.tt_username == bindparam("row_tt_username")
+                            ),
+                            unlisted_rows
+                        )
+                    await session.commit()
+            except Exception as e:
+                # Put the changes back without overriding newer ones and retry on the next flush
+                for telegram_id, settings_row in settings_rows.items():
+                    self._settings_rows.setdefault(telegram_id, settings_row)
+                for telegram_id, user_changes in muted_users.items():
+                    staged_changes = self._muted_users.setdefault(telegram_id, {})
+                    for tt_username, is_listed in user_changes.items():
+                        staged_changes.setdefault(tt_username, is_listed)
+                self.failed_flush_count += 1
+                logger.error(f"Failed to write {len(settings_rows) + muted_change_count} staged settings changes: {e}", exc_info=True)
+                return False
+            self.flush_count += 1
+            self.written_count += len(settings_rows) + muted_change_count
+            logger.debug(f"Wrote {len(settings_rows)} settings rows and {muted_change_count} muted list changes.")
+            return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+
+
+SETTINGS_WRITER = SettingsWriteBehind(SETTINGS_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,104 @@
+import logging
+import asyncio
+import math
+import time
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel for many long-lived, coarse deadlines (e.g. one per subscriber).
+
+    A key is stored in the slot of its absolute tick (wall clock / tick_seconds); a single
+    task wakes up once per tick and hands all keys that became due to on_due in one call.
+    Scheduling and cancelling are O(1); deadlines are rounded up to the next tick.
+    """
+
+    def __init__(self, tick_seconds: float, slot_count: int, on_due: Callable[[list[Hashable]], Awaitable[None]]):
+        self.tick_seconds = tick_seconds
+        self.slot_count = slot_count
+        self._on_due = on_due
+        self._slots: list[dict[Hashable, int]] = [{} for _ in range(slot_count)] # key -> absolute tick
+        self._tick_by_key: dict[Hashable, int] = {}
+        self._last_processed_tick = self._current_tick()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._tick_by_key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tick_by_key
+
+    def due_at(self, key: Hashable) -> float | None:
+        """Unix time the key fires at, or None if it is not scheduled."""
+        tick = self._tick_by_key.get(key)
+        return tick * self.tick_seconds if tick is not None else None
+
+    def schedule(self, key: Hashable, due_at: float) -> None:
+        """Schedules (or moves) key to fire at unix time due_at."""
+        self.cancel(key)
+        if not self._tick_by_key:
+            self._last_processed_tick = self._current_tick() # Idle wheel: nothing to catch up on
+        tick = max(math.ceil(due_at / self.tick_seconds), self._last_processed_tick + 1)
+        self._slots[tick % self.slot_count][key] = tick
+        self._tick_by_key[key] = tick
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, key: Hashable) -> bool:
+        tick = self._tick_by_key.pop(key, None)
+        if tick is None:
+            return False
+        del self._slots[tick % self.slot_count][key]
+        return True
+
+    def pop_all(self) -> list[Hashable]:
+        """Removes and returns every scheduled key (used at shutdown)."""
+        keys = list(self._tick_by_key)
+        for slot in self._slots:
+            slot.clear()
+        self._tick_by_key.clear()
+        return keys
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _current_tick(self) -> int:
+        return math.floor(time.time() / self.tick_seconds)
+
+    def _collect_due(self) -> list[Hashable]:
+        current_tick = self._current_tick()
+        if current_tick <= self._last_processed_tick:
+            return []
+        due_keys = []
+        # After a long stall (or a clock jump) every slot may hold due keys
+        ticks_to_process = min(current_tick - self._last_processed_tick, self.slot_count)
+        for tick in range(current_tick - ticks_to_process + 1, current_tick + 1):
+            slot = self._slots[tick % self.slot_count]
+            slot_due_keys = [key for key, key_tick in slot.items() if key_tick <= current_tick]
+            for key in slot_due_keys:
+                del slot[key]
+                del self._tick_by_key[key]
+            due_keys.extend(slot_due_keys)
+        self._last_processed_tick = current_tick
+        return due_keys
+
+    async def _run(self) -> None:
+        while self._tick_by_key:
+            next_tick_at = (self._last_processed_tick + 1) * self.tick_seconds
+            await asyncio.sleep(max(next_tick_at - time.time(), 0.0))
+            due_keys = self._collect_due()
+            if not due_keys:
+                continue
+            try:
+                await self._on_due(due_keys)
+            except Exception as e:
+                logger.error(f"Timer wheel callback failed for {len(due_keys)} keys: {e}", exc_info=True)
@@ -1,36 +1,210 @@
 import logging
 import asyncio
-from dataclasses import dataclass, field
-from typing import Any
+import sys
+import time
+import weakref
+from typing import Any, Iterable
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from bot.database.models import UserSettings, NotificationSetting
+from bot.database.models import UserSettings, NotificationSetting, SubscribedUser, MutedUser
 from bot.config import app_config
+from bot.core.recipient_index import RECIPIENT_INDEX, NOTIFICATION_SETTING_CODES
+from bot.core.settings_writer import SETTINGS_WRITER
+from bot.core.settings_cache import UserSettingsCache, CountingTTLCache
+from bot.constants import (
+    DEFAULT_LANGUAGE,
+    QUIET_HOURS_MODE_DIGEST,
+    QUIET_HOURS_MODE_SUPPRESS,
+    USER_SETTINGS_LOAD_BATCH_SIZE,
+    USER_SETTINGS_LOAD_PROGRESS_ROWS,
+)
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+_NOTIFICATION_SETTINGS_BY_CODE: tuple[NotificationSetting, ...] = tuple(
+    sorted(NOTIFICATION_SETTING_CODES, key=NOTIFICATION_SETTING_CODES.__getitem__)
+)
+_QUIET_HOURS_MODES: tuple[str, ...] = (QUIET_HOURS_MODE_DIGEST, QUIET_HOURS_MODE_SUPPRESS) # Index is the stored code
+
+
+_EMPTY_SET: frozenset = frozenset()
+# hash -> shared frozenset; weak values, so sets no user holds any more drop out
+_SHARED_SETS: "weakref.WeakValueDictionary[int, frozenset]" = weakref.WeakValueDictionary()
+
+
+def _share_set(items) -> frozenset:
+    """Returns the one shared frozenset with these items (users with identical lists hold the same object)."""
+    new_set = frozenset(items)
+    if not new_set:
+        return _EMPTY_SET
+    set_hash = hash(new_set)
+    shared = _SHARED_SETS.get(set_hash)
+    if shared == new_set:
+        return shared
+    if shared is None:
+        _SHARED_SETS[set_hash] = new_set
+    return new_set # On a (rare) hash collision the set is simply not shared
+
+
+def _intern_optional(value: str | None) -> str | None:
+    return sys.intern(value) if value else value
+
+
 class UserSpecificSettings:
-    language: str = field(default_factory=lambda: app_config["EFFECTIVE_DEFAULT_LANG"])
-    notification_settings: NotificationSetting = NotificationSetting.ALL
-    muted_users_set: set[str] = field(default_factory=set)
-    mute_all_flag: bool = False
-    teamtalk_username: str | None = None
-    not_on_online_enabled: bool = False
-    not_on_online_confirmed: bool = False
+    """
+    Cached settings of one Telegram user, laid out compactly since there is one per subscriber:
+    slots instead of a __dict__, interned strings, enum values as small int codes, and muted-user /
+    watched-channel sets shared between users as frozensets. The sets are copy-on-write: change
+    them with the toggle_* helpers or by assigning a new collection, never in place.
+    """
+
+    __slots__ = (
+        "_language",
+        "_notification_code",
+        "_muted_users",
+        "mute_all_flag",
+        "_teamtalk_username",
+        "not_on_online_enabled",
+        "not_on_online_confirmed",
+        "digest_enabled",
+        "_watched_channels",
+        "quiet_hours_start", # Minute of the day; None disables quiet hours
+        "quiet_hours_end",
+        "_quiet_hours_timezone",
+        "_quiet_hours_mode_code",
+    )
+
+    def __init__(
+        self,
+        language: str | None = None,
+        notification_settings: NotificationSetting = NotificationSetting.ALL,
+        muted_users_set: Iterable[str] = (),
+        mute_all_flag: bool = False,
+        teamtalk_username: str | None = None,
+        not_on_online_enabled: bool = False,
+        not_on_online_confirmed: bool = False,
+        digest_enabled: bool = False,
+        watched_channels: Iterable[int] = (), # Empty: notify about all channels
+        quiet_hours_start: int | None = None,
+        quiet_hours_end: int | None = None,
+        quiet_hours_timezone: str | None = None,
+        quiet_hours_mode: str = QUIET_HOURS_MODE_DIGEST,
+    ):
+        self.language = language or app_config["EFFECTIVE_DEFAULT_LANG"]
+        self.notification_settings = notification_settings
+        self.muted_users_set = muted_users_set
+        self.mute_all_flag = mute_all_flag
+        self.teamtalk_username = teamtalk_username
+        self.not_on_online_enabled = not_on_online_enabled
+        self.not_on_online_confirmed = not_on_online_confirmed
+        self.digest_enabled = digest_enabled
+        self.watched_channels = watched_channels
+        self.quiet_hours_start = quiet_hours_start
+        self.quiet_hours_end = quiet_hours_end
+        self.quiet_hours_timezone = quiet_hours_timezone
+        self.quiet_hours_mode = quiet_hours_mode
+
+    def __repr__(self) -> str:
+        return (
+            f"UserSpecificSettings(language={self.language!r}, notification_settings={self.notification_settings}, "
+            f"muted_users={sorted(self._muted_users)}, mute_all={self.mute_all_flag}, "
+            f"watched_channels={sorted(self._watched_channels)})"
+        )
+
+    @property
+    def language(self) -> str:
+        return self._language
+
+    @language.setter
+    def language(self, value: str) -> None:
+        self._language = sys.intern(value)
+
+    @property
+    def notification_settings(self) -> NotificationSetting:
+        return _NOTIFICATION_SETTINGS_BY_CODE[self._notification_code]
+
+    @notification_settings.setter
+    def notification_settings(self, value: NotificationSetting) -> None:
+        self._notification_code = NOTIFICATION_SETTING_CODES[value]
+
+    @property
+    def muted_users_set(self) -> frozenset[str]:
+        return self._muted_users
+
+    @muted_users_set.setter
+    def muted_users_set(self, usernames: Iterable[str]) -> None:
+        self._muted_users = _share_set(sys.intern(username) for username in usernames)
+
+    def toggle_muted_user(self, username: str) -> bool:
+        """Adds or removes a username (or pattern) in the muted list; returns True if it is now listed."""
+        if username in self._muted_users:
+            self.muted_users_set = self._muted_users - {username}
+            return False
+        self.muted_users_set = self._muted_users | {username}
+        return True
+
+    @property
+    def teamtalk_username(self) -> str | None:
+        return self._teamtalk_username
+
+    @teamtalk_username.setter
+    def teamtalk_username(self, value: str | None) -> None:
+        self._teamtalk_username = _intern_optional(value)
+
+    @property
+    def watched_channels(self) -> frozenset[int]:
+        return self._watched_channels
+
+    @watched_channels.setter
+    def watched_channels(self, channel_ids: Iterable[int]) -> None:
+        self._watched_channels = _share_set(channel_ids)
+
+    def toggle_watched_channel(self, channel_id: int) -> bool:
+        """Adds or removes a channel filter; returns True if the channel is now watched."""
+        if channel_id in self._watched_channels:
+            self.watched_channels = self._watched_channels - {channel_id}
+            return False
+        self.watched_channels = self._watched_channels | {channel_id}
+        return True
+
+    @property
+    def quiet_hours_timezone(self) -> str | None:
+        return self._quiet_hours_timezone
+
+    @quiet_hours_timezone.setter
+    def quiet_hours_timezone(self, value: str | None) -> None:
+        self._quiet_hours_timezone = _intern_optional(value)
+
+    @property
+    def quiet_hours_mode(self) -> str:
+        return _QUIET_HOURS_MODES[self._quiet_hours_mode_code]
+
+    @quiet_hours_mode.setter
+    def quiet_hours_mode(self, value: str | None) -> None:
+        self._quiet_hours_mode_code = _QUIET_HOURS_MODES.index(value) if value in _QUIET_HOURS_MODES else 0
 
     @classmethod
-    def from_db_row(cls, settings_row: UserSettings | None):
+    def from_db_row(cls, settings_row: UserSettings | None, muted_usernames: Iterable[str] = ()):
+        """
+        Builds settings from a UserSettings row (or a column-only result row with the same names)
+        and the user's muted_users entries.
+        """
         if not settings_row:
             return cls()
         return cls(
             language=settings_row.language,
             notification_settings=settings_row.notification_settings,
-            muted_users_set=set(settings_row.muted_users.split(",")) if settings_row.muted_users else set(),
+            muted_users_set=muted_usernames,
             mute_all_flag=settings_row.mute_all,
             teamtalk_username=settings_row.teamtalk_username,
             not_on_online_enabled=settings_row.not_on_online_enabled,
             not_on_online_confirmed=settings_row.not_on_online_confirmed,
+            digest_enabled=settings_row.digest_enabled,
+            watched_channels=[int(channel_id) for channel_id in settings_row.watched_channels.split(",")] if settings_row.watched_channels else (),
+            quiet_hours_start=settings_row.quiet_hours_start,
+            quiet_hours_end=settings_row.quiet_hours_end,
+            quiet_hours_timezone=settings_row.quiet_hours_timezone,
+            quiet_hours_mode=settings_row.quiet_hours_mode,
         )
 
     def to_cache_dict(self) -> dict[str, Any]: # Not directly used but kept for potential future use
@@ -41,49 +215,129 @@ class UserSpecificSettings:
             "teamtalk_username": self.teamtalk_username,
             "not_on_online_enabled": self.not_on_online_enabled,
             "not_on_online_confirmed": self.not_on_online_confirmed,
+            "digest_enabled": self.digest_enabled,
+            "watched_channels": self.watched_channels,
+            "quiet_hours": {
+                "start": self.quiet_hours_start,
+                "end": self.quiet_hours_end,
+                "timezone": self.quiet_hours_timezone,
+                "mode": self.quiet_hours_mode,
+            },
         }
 
-def _prepare_muted_users_string(users_set: set[str]) -> str:
-    if not users_set: # Handle empty set directly to avoid unnecessary list conversion and sort
-        return ""
-    return ",".join(sorted(list(users_set)))
+def _prepare_watched_channels_string(channel_ids: frozenset[int]) -> str:
+    return ",".join(str(channel_id) for channel_id in sorted(channel_ids))
+
+# Subscribers are pinned; other users' settings are evicted (LRU/TTL) and reloaded from the DB on demand
+USER_SETTINGS_CACHE: UserSettingsCache[UserSpecificSettings] = UserSettingsCache(
+    CountingTTLCache(maxsize=app_config["USER_SETTINGS_CACHE_SIZE"], ttl=app_config["USER_SETTINGS_CACHE_TTL_SECONDS"])
+)
+# Set once load_user_settings_to_cache has finished (also if it failed); readers of the cache wait on it
+USER_SETTINGS_READY = asyncio.Event()
+
+# Only the columns from_db_row reads, so the bulk load does not build ORM objects
+_SETTINGS_LOAD_COLUMNS = (
+    UserSettings.telegram_id,
+    UserSettings.language,
+    UserSettings.notification_settings,
+    UserSettings.mute_all,
+    UserSettings.teamtalk_username,
+    UserSettings.not_on_online_enabled,
+    UserSettings.not_on_online_confirmed,
+    UserSettings.digest_enabled,
+    UserSettings.watched_channels,
+    UserSettings.quiet_hours_start,
+    UserSettings.quiet_hours_end,
+    UserSettings.quiet_hours_timezone,
+    UserSettings.quiet_hours_mode,
+)
 
-USER_SETTINGS_CACHE: dict[int, UserSpecificSettings] = {}
+def group_chat_ids_by_language(chat_ids: list[int]) -> dict[str, list[int]]:
+    """Groups recipients by their cached language, so per-language content is rendered once."""
+    chat_ids_by_language: dict[str, list[int]] = {}
+    for chat_id in chat_ids:
+        user_settings = USER_SETTINGS_CACHE.peek(chat_id)
+        language = user_settings.language if user_settings else DEFAULT_LANGUAGE
+        chat_ids_by_language.setdefault(language, []).append(chat_id)
+    return chat_ids_by_language
 
 async def load_user_settings_to_cache(session_factory) -> None: # session_factory type: sessionmaker from sqlalchemy.orm
+    """
+    Fills USER_SETTINGS_CACHE with one streamed scan of user_settings (plus one of muted_users)
+    and builds the recipient index, then sets USER_SETTINGS_READY.
+    """
     logger.info("Loading user settings into cache...")
-    async with session_factory() as session:
-        result = await session.execute(select(UserSettings))
-        user_settings_list = result.scalars().all()
-        for settings_row in user_settings_list:
-            USER_SETTINGS_CACHE[settings_row.telegram_id] = UserSpecificSettings.from_db_row(settings_row)
-    logger.info(f"{len(USER_SETTINGS_CACHE)} user settings loaded into cache.")
+    started_at = time.perf_counter()
+    loaded_count = 0
+    next_progress_count = USER_SETTINGS_LOAD_PROGRESS_ROWS
+    try:
+        async with session_factory() as session:
+            subscriber_ids = (await session.execute(select(SubscribedUser.telegram_id))).scalars().all()
+            for telegram_id in subscriber_ids:
+                USER_SETTINGS_CACHE.pin(telegram_id)
+            admin_chat_id = str(app_config.get("TG_ADMIN_CHAT_ID") or "")
+            if admin_chat_id.lstrip("-").isdigit():
+                USER_SETTINGS_CACHE.pin(int(admin_chat_id)) # Admin notifications use its language
+            muted_usernames_by_id = await _load_muted_usernames(session)
+            result = await session.stream(
+                select(*_SETTINGS_LOAD_COLUMNS).execution_options(yield_per=USER_SETTINGS_LOAD_BATCH_SIZE)
+            )
+            async for partition in result.partitions():
+                for settings_row in partition:
+                    USER_SETTINGS_CACHE[settings_row.telegram_id] = UserSpecificSettings.from_db_row(
+                        settings_row, muted_usernames_by_id.get(settings_row.telegram_id, ())
+                    )
+                loaded_count += len(partition)
+                if loaded_count >= next_progress_count:
+                    logger.info(f"Loading user settings: {loaded_count} rows in {time.perf_counter() - started_at:.1f}s...")
+                    next_progress_count += USER_SETTINGS_LOAD_PROGRESS_ROWS
+            load_seconds = time.perf_counter() - started_at
+            RECIPIENT_INDEX.rebuild(subscriber_ids, USER_SETTINGS_CACHE.peek)
+        logger.info(
+            f"{loaded_count} user settings loaded into cache in {load_seconds:.2f}s "
+            f"(recipient index ready after {time.perf_counter() - started_at:.2f}s)."
+        )
+    except Exception as e:
+        logger.error(f"Failed to load user settings into cache after {loaded_count} rows: {e}", exc_info=True)
+    finally:
+        USER_SETTINGS_READY.set() # On failure, settings fall back to per-user lookups
+
+async def _load_muted_usernames(session: AsyncSession) -> dict[int, list[str]]:
+    muted_usernames_by_id: dict[int, list[str]] = {}
+    result = await session.stream(
+        select(MutedUser.telegram_id, MutedUser.tt_username).execution_options(yield_per=USER_SETTINGS_LOAD_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        for telegram_id, tt_username in partition:
+            muted_usernames_by_id.setdefault(telegram_id, []).append(tt_username)
+    return muted_usernames_by_id
+
+async def rebuild_recipient_index(session: AsyncSession) -> None:
+    """Rebuilds RECIPIENT_INDEX from the subscriber table and the settings cache."""
+    result = await session.execute(select(SubscribedUser.telegram_id))
+    RECIPIENT_INDEX.rebuild(result.scalars().all(), USER_SETTINGS_CACHE.peek)
 
 async def get_or_create_user_settings(telegram_id: int, session: AsyncSession) -> UserSpecificSettings:
     """
     Retrieves user settings from cache or DB. If not found, creates default settings in DB and cache.
     This function is intended to be the primary way to get user settings.
     """
-    if telegram_id in USER_SETTINGS_CACHE:
-        return USER_SETTINGS_CACHE[telegram_id]
+    await USER_SETTINGS_READY.wait() # Until the bulk load is done, a cache miss does not mean "not in DB"
+    cached_settings = USER_SETTINGS_CACHE.get(telegram_id)
+    if cached_settings is not None:
+        return cached_settings
+    if SETTINGS_WRITER.has_pending(telegram_id):
+        await SETTINGS_WRITER.flush() # Evicted before its last change was written; read it back up to date
 
     user_settings_row = await session.get(UserSettings, telegram_id)
     if user_settings_row:
-        specific_settings = UserSpecificSettings.from_db_row(user_settings_row)
+        muted_result = await session.execute(select(MutedUser.tt_username).where(MutedUser.telegram_id == telegram_id))
+        specific_settings = UserSpecificSettings.from_db_row(user_settings_row, muted_result.scalars().all())
         USER_SETTINGS_CACHE[telegram_id] = specific_settings
         return specific_settings
     else:
         default_settings = UserSpecificSettings()
-        new_settings_row = UserSettings(
-            telegram_id=telegram_id,
-            language=default_settings.language,
-            notification_settings=default_settings.notification_settings,
-            muted_users=await asyncio.to_thread(_prepare_muted_users_string, default_settings.muted_users_set), # Ensure consistent string format
-            mute_all=default_settings.mute_all_flag,
-            teamtalk_username=default_settings.teamtalk_username,
-            not_on_online_enabled=default_settings.not_on_online_enabled,
-            not_on_online_confirmed=default_settings.not_on_online_confirmed,
-        )
+        new_settings_row = UserSettings(**_settings_row_values(telegram_id, default_settings), muted_users="")
         session.add(new_settings_row)
         try:
             await session.commit()
@@ -97,25 +351,43 @@ async def get_or_create_user_settings(telegram_id: int, session: AsyncSession) -
             return UserSpecificSettings()
 
 
-async def update_user_settings_in_db(session: AsyncSession, telegram_id: int, settings: UserSpecificSettings):
-    """Updates the UserSettings in the database and cache."""
-    user_settings_row = await session.get(UserSettings, telegram_id)
-    if not user_settings_row:
-        user_settings_row = UserSettings(telegram_id=telegram_id)
-        session.add(user_settings_row)
-
-    user_settings_row.language = settings.language
-    user_settings_row.notification_settings = settings.notification_settings
-    user_settings_row.muted_users = await asyncio.to_thread(_prepare_muted_users_string, settings.muted_users_set)
-    user_settings_row.mute_all = settings.mute_all_flag
-    user_settings_row.teamtalk_username = settings.teamtalk_username
-    user_settings_row.not_on_online_enabled = settings.not_on_online_enabled
-    user_settings_row.not_on_online_confirmed = settings.not_on_online_confirmed
+def _settings_row_values(telegram_id: int, settings: UserSpecificSettings) -> dict[str, Any]:
+    """user_settings column values for settings (the muted list lives in muted_users)."""
+    return {
+        "telegram_id": telegram_id,
+        "language": settings.language,
+        "notification_settings": settings.notification_settings,
+        "mute_all": settings.mute_all_flag,
+        "teamtalk_username": settings.teamtalk_username,
+        "not_on_online_enabled": settings.not_on_online_enabled,
+        "not_on_online_confirmed": settings.not_on_online_confirmed,
+        "digest_enabled": settings.digest_enabled,
+        "watched_channels": _prepare_watched_channels_string(settings.watched_channels),
+        "quiet_hours_start": settings.quiet_hours_start,
+        "quiet_hours_end": settings.quiet_hours_end,
+        "quiet_hours_timezone": settings.quiet_hours_timezone,
+        "quiet_hours_mode": settings.quiet_hours_mode,
+    }
 
-    try:
-        await session.commit()
-        USER_SETTINGS_CACHE[telegram_id] = settings # Update cache
-        logger.debug(f"Updated settings for user {telegram_id} in DB and cache.")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Error updating settings for user {telegram_id} in DB: {e}")
+
+def update_user_settings_in_db(telegram_id: int, settings: UserSpecificSettings):
+    """
+    Updates the cache at once and stages the UserSettings row for SETTINGS_WRITER, which writes it
+    shortly after (write-behind). The muted list is changed through toggle_muted_user_in_db.
+    """
+    USER_SETTINGS_CACHE[telegram_id] = settings
+    RECIPIENT_INDEX.update_settings(telegram_id, settings)
+    SETTINGS_WRITER.stage_settings(_settings_row_values(telegram_id, settings))
+    logger.debug(f"Updated settings for user {telegram_id} in cache; DB write staged.")
+
+
+def toggle_muted_user_in_db(telegram_id: int, settings: UserSpecificSettings, username: str) -> bool:
+    """
+    Adds or removes one muted-list entry and returns True if the username is now listed.
+    The cache changes at once; SETTINGS_WRITER inserts or deletes the single muted_users row.
+    """
+    is_listed = settings.toggle_muted_user(username)
+    USER_SETTINGS_CACHE[telegram_id] = settings
+    RECIPIENT_INDEX.update_settings(telegram_id, settings)
+    SETTINGS_WRITER.stage_muted_user(telegram_id, username, is_listed)
+    return is_listed
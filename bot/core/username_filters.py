@@ -0,0 +1,107 @@
+import logging
+import re
+import fnmatch
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+def classify_username_pattern(pattern: str) -> str:
+    """Returns "exact", "prefix" (name*) or "glob" for a username pattern."""
+    if not _GLOB_CHARS.intersection(pattern):
+        return "exact"
+    if pattern.endswith("*") and not _GLOB_CHARS.intersection(pattern[:-1]):
+        return "prefix"
+    return "glob"
+
+
+class _TrieNode:
+    __slots__ = ("children", "pattern")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.pattern: str | None = None # Set on nodes that end a "prefix*" pattern
+
+
+class UsernamePatternMatcher:
+    """
+    Precompiled matcher for a set of username patterns.
+
+    Exact names go into a set, "prefix*" patterns into a character trie and other globs
+    into one combined regex, so matching costs one set lookup, one walk of the username
+    and at most one regex search no matter how many patterns there are.
+    Patterns are case-sensitive, like TeamTalk usernames.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._exact: set[str] = set()
+        self._prefix_root = _TrieNode()
+        self._has_prefixes = False
+        self._globs: list[tuple[str, re.Pattern]] = []
+        self._combined_glob_regex: re.Pattern | None = None
+        for pattern in patterns:
+            self._add(pattern)
+        if self._globs:
+            self._combined_glob_regex = re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern, _ in self._globs))
+
+    def __bool__(self) -> bool:
+        return bool(self._exact or self._has_prefixes or self._globs)
+
+    def _add(self, pattern: str) -> None:
+        pattern_kind = classify_username_pattern(pattern)
+        if pattern_kind == "exact":
+            self._exact.add(pattern)
+        elif pattern_kind == "prefix":
+            node = self._prefix_root
+            for char in pattern[:-1]:
+                node = node.children.setdefault(char, _TrieNode())
+            node.pattern = pattern
+            self._has_prefixes = True
+        else:
+            self._globs.append((pattern, re.compile(fnmatch.translate(pattern))))
+
+    def matches(self, username: str) -> bool:
+        if username in self._exact:
+            return True
+        if self._has_prefixes and self._first_prefix_match(username) is not None:
+            return True
+        return self._combined_glob_regex is not None and self._combined_glob_regex.match(username) is not None
+
+    def matching_patterns(self, username: str) -> list[str]:
+        """All patterns that match username (exact name first, then prefixes from shortest, then globs)."""
+        matched = [username] if username in self._exact else []
+        if self._has_prefixes:
+            node = self._prefix_root
+            if node.pattern is not None:
+                matched.append(node.pattern)
+            for char in username:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if node.pattern is not None:
+                    matched.append(node.pattern)
+        # The combined regex rejects the common no-match case before testing globs one by one
+        if self._combined_glob_regex is not None and self._combined_glob_regex.match(username):
+            matched.extend(pattern for pattern, pattern_regex in self._globs if pattern_regex.match(username))
+        return matched
+
+    def _first_prefix_match(self, username: str) -> str | None:
+        node = self._prefix_root
+        if node.pattern is not None:
+            return node.pattern
+        for char in username:
+            node = node.children.get(char)
+            if node is None:
+                return None
+            if node.pattern is not None:
+                return node.pattern
+        return None
+
+
+def parse_username_patterns(patterns_str: str | None) -> list[str]:
+    """Splits a comma-separated pattern list (as in GLOBAL_IGNORE_USERNAMES)."""
+    if not patterns_str:
+        return []
+    return [pattern.strip() for pattern in patterns_str.split(",") if pattern.strip()]
@@ -1,12 +1,14 @@
 import logging
 import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
-from bot.core.user_settings import USER_SETTINGS_CACHE # Added import
-from bot.database.models import SubscribedUser, Admin, Deeplink, UserSettings
+from bot.core.user_settings import USER_SETTINGS_CACHE, get_or_create_user_settings
+from bot.core.recipient_index import RECIPIENT_INDEX
+from bot.core.settings_writer import SETTINGS_WRITER
+from bot.database.models import SubscribedUser, Admin, Deeplink, UserSettings, MutedUser, OutboxMessage, OutboxStatus
 from bot.database.engine import Base # For type hinting model
-from bot.constants import DEEPLINK_EXPIRY_MINUTES
+from bot.constants import DEEPLINK_EXPIRY_MINUTES, SEND_PRIORITY_NOTIFICATION
 
 logger = logging.getLogger(__name__)
 
@@ -44,14 +46,42 @@ async def add_subscriber(session: AsyncSession, telegram_id: int) -> bool:
         logger.warning(f"User {telegram_id} is already a subscriber.")
         return False # Indicate already exists, not an error
     subscriber = SubscribedUser(telegram_id=telegram_id)
-    return await db_add_generic(session, subscriber)
+    if await db_add_generic(session, subscriber):
+        USER_SETTINGS_CACHE.pin(telegram_id)
+        RECIPIENT_INDEX.add_subscriber(telegram_id, await get_or_create_user_settings(telegram_id, session)) # Reloads evicted settings
+        return True
+    return False
+
+async def set_subscriber_event_bot(session: AsyncSession, telegram_id: int, event_bot_id: int) -> bool:
+    """Stores which event bot (shard) delivers notifications to the subscriber."""
+    try:
+        result = await session.execute(
+            update(SubscribedUser).where(SubscribedUser.telegram_id == telegram_id).values(event_bot_id=event_bot_id)
+        )
+        await session.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        logger.error(f"Error setting event bot {event_bot_id} for subscriber {telegram_id}: {e}")
+        await session.rollback()
+        return False
+
+async def get_subscriber_event_bot_ids(session: AsyncSession) -> dict[int, int]:
+    """Event bot ID per subscriber, for subscribers that have one stored."""
+    result = await session.execute(
+        select(SubscribedUser.telegram_id, SubscribedUser.event_bot_id).where(SubscribedUser.event_bot_id.is_not(None))
+    )
+    return {telegram_id: event_bot_id for telegram_id, event_bot_id in result.all()}
 
 async def remove_subscriber(session: AsyncSession, telegram_id: int) -> bool:
     subscriber = await session.get(SubscribedUser, telegram_id)
     if not subscriber:
         logger.warning(f"Subscriber with ID {telegram_id} not found for removal.")
         return False # Indicate not found
-    return await db_remove_generic(session, subscriber)
+    if await db_remove_generic(session, subscriber):
+        USER_SETTINGS_CACHE.unpin(telegram_id)
+        RECIPIENT_INDEX.remove_subscriber(telegram_id)
+        return True
+    return False
 
 async def get_all_subscribers_ids(session: AsyncSession) -> list[int]:
     try:
@@ -140,6 +170,7 @@ async def delete_user_data_fully(session: AsyncSession, telegram_id: int) -> boo
     Also removes the user from the in-memory cache upon successful deletion.
     """
     logger.info(f"Attempting to delete all data for Telegram ID: {telegram_id}")
+    await SETTINGS_WRITER.discard([telegram_id]) # A later flush must not write the rows back
     try:
         # Fetch both records first to see what needs to be deleted.
         user_settings_record = await session.get(UserSettings, telegram_id)
@@ -147,8 +178,9 @@ async def delete_user_data_fully(session: AsyncSession, telegram_id: int) -> boo
 
         if not user_settings_record and not subscribed_user_record:
             logger.info(f"No data found for Telegram ID {telegram_id}. Nothing to delete.")
-            # Also ensure cache is clear for this ID, just in case.
+            # Also ensure cache and recipient index are clear for this ID, just in case.
             USER_SETTINGS_CACHE.pop(telegram_id, None)
+            RECIPIENT_INDEX.remove_subscriber(telegram_id)
             return True
 
         if user_settings_record:
@@ -159,11 +191,14 @@ async def delete_user_data_fully(session: AsyncSession, telegram_id: int) -> boo
             await session.delete(subscribed_user_record)
             logger.info(f"Marked SubscribedUser for deletion for user {telegram_id}.")
 
+        await session.execute(delete(MutedUser).where(MutedUser.telegram_id == telegram_id))
+
         # Commit both deletions (or one of them) in a single transaction.
         await session.commit()
 
         # Clear from cache only after the transaction is successfully committed.
         USER_SETTINGS_CACHE.pop(telegram_id, None)
+        RECIPIENT_INDEX.remove_subscriber(telegram_id)
         logger.info(f"Successfully deleted all DB data for {telegram_id} and cleared from cache.")
         return True
 
@@ -171,3 +206,129 @@ async def delete_user_data_fully(session: AsyncSession, telegram_id: int) -> boo
         logger.error(f"Error during full data deletion for {telegram_id}: {e}. Rolling back.", exc_info=True)
         await session.rollback()
         return False
+
+async def remove_dead_recipients(session: AsyncSession, unsubscribe_ids: list[int], delete_ids: list[int]) -> None:
+    """
+    Removes recipients Telegram reported as unreachable, in one transaction:
+    unsubscribe_ids lose their subscription, delete_ids lose all their data.
+    Their pending outbox messages are marked failed. Raises after rollback on error;
+    the caller evicts the in-memory state once this returns.
+    """
+    all_ids = list(set(unsubscribe_ids) | set(delete_ids))
+    if not all_ids:
+        return
+    if delete_ids:
+        await SETTINGS_WRITER.discard(delete_ids) # A later flush must not write the rows back
+    try:
+        await session.execute(delete(SubscribedUser).where(SubscribedUser.telegram_id.in_(all_ids)))
+        if delete_ids:
+            await session.execute(delete(UserSettings).where(UserSettings.telegram_id.in_(delete_ids)))
+            await session.execute(delete(MutedUser).where(MutedUser.telegram_id.in_(delete_ids)))
+        await session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.chat_id.in_(all_ids), OutboxMessage.status == OutboxStatus.PENDING)
+            .values(status=OutboxStatus.FAILED)
+        )
+        await session.commit()
+    except Exception as e:
+        logger.error(f"Error removing {len(all_ids)} dead recipients: {e}. Rolling back.", exc_info=True)
+        await session.rollback()
+        raise
+
+
+# --- Notification outbox ---
+
+async def add_outbox_messages(session: AsyncSession, messages: list[dict]) -> bool:
+    """
+    Appends rendered notifications (dicts with chat_id, text and optional priority, event_at,
+    not_before) to the outbox in one batched insert. not_before (naive UTC) delays the first attempt.
+    """
+    if not messages:
+        return True
+    now = datetime.utcnow()
+    rows = [
+        {"chat_id": message["chat_id"], "text": message["text"],
+         "priority": message.get("priority", SEND_PRIORITY_NOTIFICATION), "event_at": message.get("event_at"),
+         "status": OutboxStatus.PENDING,
+         "attempts": 0, "next_attempt_at": message.get("not_before") or now, "created_at": now}
+        for message in messages
+    ]
+    try:
+        await session.execute(insert(OutboxMessage), rows)
+        await session.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error adding {len(rows)} messages to the notification outbox: {e}")
+        await session.rollback()
+        return False
+
+async def claim_due_outbox_messages(session: AsyncSession, limit: int) -> list[OutboxMessage]:
+    """Marks up to `limit` due pending messages as SENDING and returns them, by priority and then oldest first."""
+    result = await session.execute(
+        select(OutboxMessage)
+        .where(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.next_attempt_at <= datetime.utcnow())
+        .order_by(OutboxMessage.priority, OutboxMessage.id)
+        .limit(limit)
+    )
+    messages = result.scalars().all()
+    if messages:
+        await session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_([message.id for message in messages]))
+            .values(status=OutboxStatus.SENDING)
+        )
+    await session.commit()
+    return messages
+
+async def save_outbox_results(
+    session: AsyncSession,
+    sent_ids: list[int],
+    failed_ids: list[int],
+    retries: list[tuple[int, int, datetime]], # (id, attempts, next_attempt_at)
+    released_ids: list[int] | None = None # Claimed but never attempted, back to PENDING as is
+) -> None:
+    """Stores the delivery outcome of claimed outbox messages in a single transaction."""
+    try:
+        if sent_ids:
+            await session.execute(
+                update(OutboxMessage).where(OutboxMessage.id.in_(sent_ids))
+                .values(status=OutboxStatus.SENT, sent_at=datetime.utcnow())
+            )
+        if failed_ids:
+            await session.execute(
+                update(OutboxMessage).where(OutboxMessage.id.in_(failed_ids)).values(status=OutboxStatus.FAILED)
+            )
+        if retries:
+            await session.execute(
+                update(OutboxMessage),
+                [{"id": message_id, "status": OutboxStatus.PENDING, "attempts": attempts, "next_attempt_at": next_attempt_at}
+                 for message_id, attempts, next_attempt_at in retries]
+            )
+        if released_ids:
+            await session.execute(
+                update(OutboxMessage).where(OutboxMessage.id.in_(released_ids)).values(status=OutboxStatus.PENDING)
+            )
+        await session.commit()
+    except Exception as e:
+        logger.error(f"Error saving notification outbox results: {e}")
+        await session.rollback()
+        raise
+
+async def release_stale_outbox_claims(session: AsyncSession) -> int:
+    """Returns messages left in SENDING by a previous run to PENDING. Returns the number of rows reset."""
+    result = await session.execute(
+        update(OutboxMessage).where(OutboxMessage.status == OutboxStatus.SENDING).values(status=OutboxStatus.PENDING)
+    )
+    await session.commit()
+    return result.rowcount
+
+async def purge_sent_outbox_messages(session: AsyncSession, older_than: datetime) -> int:
+    """Deletes sent and failed messages older than the given time. Returns the number of rows deleted."""
+    result = await session.execute(
+        delete(OutboxMessage).where(
+            OutboxMessage.status.in_([OutboxStatus.SENT, OutboxStatus.FAILED]),
+            OutboxMessage.created_at < older_than
+        )
+    )
+    await session.commit()
+    return result.rowcount
@@ -1,8 +1,9 @@
 import logging
+from sqlalchemy import event, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from bot.config import app_config
-from bot.constants import DB_MAIN_NAME
+from bot.constants import DB_MAIN_NAME, SQLITE_BUSY_TIMEOUT_MS, DB_SCHEMA_VERSION_MUTED_USERS_TABLE
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +12,73 @@ async_engines = {
     db_name: create_async_engine(f"sqlite+aiosqlite:///{db_file}")
     for db_name, db_file in DATABASE_FILES.items()
 }
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    WAL lets the outbox feeder read while notifications are being enqueued, and with
+    synchronous=NORMAL a commit no longer waits for an fsync of the whole journal.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+for _engine in async_engines.values():
+    event.listen(_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 SessionFactory = sessionmaker(
     async_engines[DB_MAIN_NAME], expire_on_commit=False, class_=AsyncSession
 )
 Base = declarative_base()
 
+def _add_missing_columns(sync_conn) -> None:
+    """
+    create_all() does not alter existing tables, so columns added to models later
+    are added here. New columns must be nullable or define a server_default.
+    """
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column_info["name"] for column_info in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = f"{column.name} {column.type.compile(dialect=sync_conn.dialect)}"
+            if column.server_default is not None:
+                column_ddl += f" NOT NULL DEFAULT {column.server_default.arg}" if not column.nullable else f" DEFAULT {column.server_default.arg}"
+            sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+            logger.info(f"Added missing column {table.name}.{column.name} to the database.")
+
+def _migrate_muted_users_column(sync_conn) -> None:
+    """
+    Moves the comma-separated user_settings.muted_users lists into muted_users rows (once;
+    PRAGMA user_version records that the migration ran) and empties the old column.
+    """
+    if sync_conn.execute(text("PRAGMA user_version")).scalar_one() >= DB_SCHEMA_VERSION_MUTED_USERS_TABLE:
+        return
+    legacy_rows = sync_conn.execute(
+        text("SELECT telegram_id, muted_users FROM user_settings WHERE muted_users IS NOT NULL AND muted_users != ''")
+    ).all()
+    muted_user_rows = [
+        {"telegram_id": telegram_id, "tt_username": username}
+        for telegram_id, muted_users in legacy_rows
+        for username in dict.fromkeys(muted_users.split(",")) if username
+    ]
+    if muted_user_rows:
+        sync_conn.execute(
+            text("INSERT OR IGNORE INTO muted_users (telegram_id, tt_username) VALUES (:telegram_id, :tt_username)"),
+            muted_user_rows
+        )
+        sync_conn.execute(text("UPDATE user_settings SET muted_users = '' WHERE muted_users != ''"))
+        logger.info(f"Migrated {len(muted_user_rows)} muted list entries of {len(legacy_rows)} users to the muted_users table.")
+    sync_conn.execute(text(f"PRAGMA user_version = {DB_SCHEMA_VERSION_MUTED_USERS_TABLE}"))
+
 async def init_db() -> None:
     async with async_engines[DB_MAIN_NAME].begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_migrate_muted_users_column)
     logger.info("Database initialized.")
 
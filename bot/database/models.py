@@ -1,12 +1,13 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Index
 from sqlalchemy import Enum as SQLAEnum
 from bot.database.engine import Base
-from bot.constants import DEFAULT_LANGUAGE
+from bot.constants import DEFAULT_LANGUAGE, SEND_PRIORITY_NOTIFICATION
 
 class SubscribedUser(Base):
     __tablename__ = "subscribed_users"
     telegram_id = Column(Integer, primary_key=True, index=True, autoincrement=False) # Assuming telegram_id is unique and not auto-incrementing
+    event_bot_id = Column(Integer, nullable=True) # Event bot (shard) the user subscribed through; NULL means the main event bot
 
 class Admin(Base):
     __tablename__ = "admins"
@@ -31,9 +32,48 @@ class UserSettings(Base):
     telegram_id = Column(Integer, primary_key=True, index=True, autoincrement=False) # Assuming telegram_id is unique
     language = Column(String, default=DEFAULT_LANGUAGE, nullable=False)
     notification_settings = Column(SQLAEnum(NotificationSetting), default=NotificationSetting.ALL, nullable=False)
-    muted_users = Column(String, default="", nullable=False) # Comma-separated string
+    muted_users = Column(String, default="", nullable=False) # Legacy comma-separated list; moved to MutedUser rows by init_db, kept empty
     mute_all = Column(Boolean, default=False, nullable=False)
     teamtalk_username = Column(String, nullable=True, index=True)
     not_on_online_enabled = Column(Boolean, default=False, nullable=False)
     not_on_online_confirmed = Column(Boolean, default=False, nullable=False)
+    digest_enabled = Column(Boolean, default=False, server_default="0", nullable=False)
+    watched_channels = Column(String, default="", nullable=True) # Comma-separated TeamTalk channel IDs; empty or NULL means all channels
+    quiet_hours_start = Column(Integer, nullable=True) # Minute of the day in quiet_hours_timezone; NULL disables quiet hours
+    quiet_hours_end = Column(Integer, nullable=True)
+    quiet_hours_timezone = Column(String, nullable=True) # IANA name, e.g. Europe/Moscow; NULL means UTC
+    quiet_hours_mode = Column(String, nullable=True) # QUIET_HOURS_MODE_DIGEST (default) or QUIET_HOURS_MODE_SUPPRESS
 
+class MutedUser(Base):
+    """One entry of a user's muted list (allowed list with mute_all); the username may be a pattern."""
+    __tablename__ = "muted_users"
+    telegram_id = Column(Integer, primary_key=True, autoincrement=False)
+    tt_username = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_muted_users_tt_username", "tt_username"), # "Who muted X" lookups
+    )
+
+
+class OutboxStatus(enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending" # Claimed by a drain worker
+    SENT = "sent"
+    FAILED = "failed"
+
+class OutboxMessage(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+    priority = Column(Integer, default=SEND_PRIORITY_NOTIFICATION, server_default=str(SEND_PRIORITY_NOTIFICATION), nullable=False)
+    status = Column(SQLAEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    event_at = Column(Float, nullable=True) # Unix time of the originating TeamTalk event (latency metrics)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
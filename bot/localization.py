@@ -96,17 +96,92 @@ LOCALIZED_STRINGS = {
     "tt_forward_message_text": {"en": "Message from server {server_name}\nFrom {sender_display}:\n\n{message_text}", "ru": "Сообщение с сервера {server_name}\nОт {sender_display}:\n\n{message_text}"},
     "join_notification": {"en": "User {user_nickname} joined server {server_name}", "ru": "{user_nickname} присоединился к серверу {server_name}"},
     "leave_notification": {"en": "User {user_nickname} left server {server_name}", "ru": "{user_nickname} покинул сервер {server_name}"},
+    "digest_header": {"en": "Updates on server {server_name} ({count}):", "ru": "События на сервере {server_name} ({count}):"},
+    "digest_join_line": {"en": "➕ {user_nickname} joined", "ru": "➕ {user_nickname} присоединился"},
+    "digest_leave_line": {"en": "➖ {user_nickname} left", "ru": "➖ {user_nickname} вышел"},
+    "digest_more_line": {"en": "…and {count} more", "ru": "…и еще {count}"},
+    "filter_usage": {
+        "en": "Usage: <code>/filter &lt;username or pattern&gt;</code>\nPatterns: <code>name</code> (exact), <code>guest*</code> (prefix), <code>*bot?</code> (glob). Sending the same pattern again removes it.",
+        "ru": "Использование: <code>/filter &lt;имя или шаблон&gt;</code>\nШаблоны: <code>name</code> (точное имя), <code>guest*</code> (префикс), <code>*bot?</code> (glob). Повторная отправка того же шаблона удаляет его."
+    },
+    "filter_added": {"en": "<code>{pattern}</code> added to your {list_name}.", "ru": "<code>{pattern}</code> добавлен. Список: {list_name}."},
+    "filter_removed": {"en": "<code>{pattern}</code> removed from your {list_name}.", "ru": "<code>{pattern}</code> удален. Список: {list_name}."},
+    "filter_list_muted": {"en": "muted list", "ru": "заблокированные"},
+    "filter_list_allowed": {"en": "allowed list (Mute All is on)", "ru": "разрешенные (включен режим \"Блокировать всех\")"},
+    "channels_usage": {
+        "en": "Usage: <code>/channels &lt;channel path or ID&gt;</code> adds or removes a channel, <code>/channels clear</code> returns to all channels. A join is reported when the user enters the first channel after logging in; moving to another channel later is not reported.",
+        "ru": "Использование: <code>/channels &lt;путь или ID канала&gt;</code> - добавить или удалить канал, <code>/channels clear</code> - снова все каналы. О входе сообщается, когда пользователь заходит в первый канал после подключения; о переходах в другие каналы позже не сообщается."
+    },
+    "channels_all": {"en": "You get notifications for all channels.", "ru": "Вы получаете уведомления обо всех каналах."},
+    "channels_list_header": {"en": "You get notifications only for these channels:", "ru": "Вы получаете уведомления только об этих каналах:"},
+    "channels_added": {"en": "Channel {channel} added to your channel filter.", "ru": "Канал {channel} добавлен в фильтр каналов."},
+    "channels_removed": {"en": "Channel {channel} removed from your channel filter.", "ru": "Канал {channel} удален из фильтра каналов."},
+    "channels_cleared": {"en": "Channel filter cleared. You will get notifications for all channels.", "ru": "Фильтр каналов очищен. Вы будете получать уведомления обо всех каналах."},
+    "channels_not_found": {"en": "Channel <code>{channel}</code> not found on the server.", "ru": "Канал <code>{channel}</code> не найден на сервере."},
+    "quiet_usage": {
+        "en": "Usage: <code>/quiet 23:00-07:00 [timezone] [digest|suppress]</code>, e.g. <code>/quiet 23:00-07:00 Europe/Moscow</code>. <code>/quiet off</code> disables quiet hours.\n<code>digest</code> (default) sends what happened as one message when quiet hours end, <code>suppress</code> drops it.",
+        "ru": "Использование: <code>/quiet 23:00-07:00 [часовой пояс] [digest|suppress]</code>, например <code>/quiet 23:00-07:00 Europe/Moscow</code>. <code>/quiet off</code> - отключить тихие часы.\n<code>digest</code> (по умолчанию) - прислать все события одним сообщением после окончания тихих часов, <code>suppress</code> - не присылать."
+    },
+    "quiet_off": {"en": "Quiet hours are off.", "ru": "Тихие часы отключены."},
+    "quiet_current": {
+        "en": "Quiet hours: <b>{start}-{end}</b> ({timezone}), mode: <code>{mode}</code>.",
+        "ru": "Тихие часы: <b>{start}-{end}</b> ({timezone}), режим: <code>{mode}</code>."
+    },
+    "quiet_bad_timezone": {"en": "Unknown timezone <code>{timezone}</code>. Use an IANA name such as <code>Europe/Moscow</code>.", "ru": "Неизвестный часовой пояс <code>{timezone}</code>. Укажите название IANA, например <code>Europe/Moscow</code>."},
+    "stats_header": {
+        "en": "<b>Notification latency, ms</b> (last {uptime_minutes} min):",
+        "ru": "<b>Задержка уведомлений, мс</b> (за последние {uptime_minutes} мин):"
+    },
+    "stats_no_data": {"en": "No notifications sent yet.", "ru": "Уведомления еще не отправлялись."},
+    "stats_queues": {
+        "en": "Coalescer pending: {coalescer_pending}\nOutbox in memory: {outbox_in_memory} (failed result writes: {outbox_failed_flushes})\nSend queues: {scheduler_depths}\nReaper queue: {reaper_queue} (reaped: {reaped_count})",
+        "ru": "Ожидают в коалесцере: {coalescer_pending}\nOutbox в памяти: {outbox_in_memory} (неудачных записей результатов: {outbox_failed_flushes})\nОчереди отправки: {scheduler_depths}\nОчередь удаления: {reaper_queue} (удалено: {reaped_count})"
+    },
+    "stats_quiet_hours": {
+        "en": "Quiet hours: {deferred_chats} chats waiting for a digest, {deferred_count} events deferred, {suppressed_count} suppressed",
+        "ru": "Тихие часы: {deferred_chats} чатов ждут сводку, отложено событий: {deferred_count}, подавлено: {suppressed_count}"
+    },
+    "stats_settings_cache": {
+        "en": "Settings cache: {pinned_count} subscribers pinned, {transient_count} other users, {hits} hits, {misses} misses, {evicted_count} evicted",
+        "ru": "Кэш настроек: подписчиков закреплено {pinned_count}, других пользователей {transient_count}, попаданий {hits}, промахов {misses}, вытеснено {evicted_count}"
+    },
+    "stats_settings_writes": {
+        "en": "Settings writes: {pending_count} pending, {written_count} written in {flush_count} flushes, {failed_flush_count} failed flushes",
+        "ru": "Запись настроек: в очереди {pending_count}, записано {written_count} за {flush_count} сбросов, неудачных сбросов: {failed_flush_count}"
+    },
+    "stats_http_pool": {
+        "en": "HTTP pool {name} ({limit} connections): {in_flight} requests in flight (peak {peak_in_flight}), waited for a free connection {connection_waits} times, connections opened {connections_created}, reused {connections_reused}",
+        "ru": "HTTP-пул {name} ({limit} соединений): запросов в работе {in_flight} (пик {peak_in_flight}), ожиданий свободного соединения {connection_waits}, открыто соединений {connections_created}, переиспользовано {connections_reused}"
+    },
+    "circuits_empty": {
+        "en": "No chats with delivery failures. Sends skipped so far: {skipped_count}.",
+        "ru": "Нет чатов с ошибками доставки. Всего пропущено отправок: {skipped_count}."
+    },
+    "circuits_header": {
+        "en": "<b>Chats with delivery failures:</b> {count} (showing {shown}). Sends skipped so far: {skipped_count}.",
+        "ru": "<b>Чаты с ошибками доставки:</b> {count} (показано {shown}). Всего пропущено отправок: {skipped_count}."
+    },
+    "circuits_reset_done": {"en": "Circuits reset: {count}.", "ru": "Сброшено автоматов: {count}."},
+    "circuits_usage": {
+        "en": "Usage: <code>/circuits</code> to list, <code>/circuits reset [chat_id]</code> to reset one or all.",
+        "ru": "Использование: <code>/circuits</code> - список, <code>/circuits reset [chat_id]</code> - сбросить один или все."
+    },
     "help_text": {
         "en": (
                 "This bot forwards messages from a TeamTalk server to Telegram and sends join/leave notifications.\n\n"
                 "**Available Commands:**\n"
                 "/who - Show online users.\n"
                 "/settings - Access the interactive settings menu (language, notifications, mute lists, NOON feature).\n"
+                "/filter `<username or pattern>` - Add or remove a username, prefix (`guest*`) or glob (`*bot?`) in your mute list.\n"
+                "/channels `<channel path or ID>` - Only get notifications for users in the chosen channels (`/channels clear` for all). A join counts the first channel entered after login.\n"
+                "/quiet `23:00-07:00 [timezone] [digest|suppress]` - Set quiet hours: get a digest afterwards or nothing (`/quiet off` to disable).\n"
                 "/help - Show this help message.\n"
                 "(Note: `/start` is used to initiate the bot and process deeplinks.)\n\n"
                 "**Admin Commands:**\n"
                 "/kick - Kick a user from the server (via buttons).\n"
-                "/ban - Ban a user from the server (via buttons).\n\n"
+                "/ban - Ban a user from the server (via buttons).\n"
+                "/stats - Show notification latency percentiles and queue sizes.\n"
+                "/circuits - Show chats skipped after repeated delivery failures (`/circuits reset [chat_id]` to reset).\n\n"
                 "**Note on Mutes:**\n"
                 "- Mute functionality (block list / allow list) is managed via the `/settings` menu.\n\n"
                 "**Note on 'Not on Online' (NOON) feature (via /settings):**\n"
@@ -125,11 +200,16 @@ LOCALIZED_STRINGS = {
                 "**Доступные команды:**\n"
                 "/who - Показать онлайн пользователей.\n"
                 "/settings - Доступ к интерактивному меню настроек (язык, уведомления, списки мьютов, функция NOON).\n"
+                "/filter `<имя или шаблон>` - Добавить или удалить имя, префикс (`guest*`) или glob-шаблон (`*bot?`) в вашем списке мьютов.\n"
+                "/channels `<путь или ID канала>` - Получать уведомления только о пользователях в выбранных каналах (`/channels clear` - все каналы). Для входа учитывается первый канал после подключения.\n"
+                "/quiet `23:00-07:00 [часовой пояс] [digest|suppress]` - Тихие часы: сводка после них или ничего (`/quiet off` - отключить).\n"
                 "/help - Показать это сообщение.\n"
                 "(Примечание: `/start` используется для запуска бота и обработки deeplink-ссылок.)\n\n"
                 "**Команды для администраторов:**\n"
                 "/kick - Кикнуть пользователя с сервера (через кнопки).\n"
-                "/ban - Забанить пользователя на сервере (через кнопки).\n\n"
+                "/ban - Забанить пользователя на сервере (через кнопки).\n"
+                "/stats - Показать перцентили задержки уведомлений и размеры очередей.\n"
+                "/circuits - Показать чаты, пропускаемые после повторных ошибок доставки (`/circuits reset [chat_id]` - сбросить).\n\n"
                 "**Примечание по мьютам:**\n"
                 "- Управление мьютами (черный/белый список) осуществляется через меню `/settings`.\n\n"
                 "**Примечание по функции 'не в сети' (NOON) (через /settings):**\n"
@@ -162,6 +242,8 @@ LOCALIZED_STRINGS = {
     "back_to_settings_btn": {"en": "⬅️ Back to Settings", "ru": "⬅️ Назад к настройкам"},
     "notif_settings_menu_header": {"en": "Notification Settings", "ru": "Настройки уведомлений"},
     "notif_setting_noon_btn_toggle": {"en": "NOON (Not on Online): {status}", "ru": "NOON (Не в сети): {status}"},
+    "notif_setting_digest_btn_toggle": {"en": "Digest mode: {status}", "ru": "Режим сводки: {status}"},
+    "notif_setting_digest_updated_to": {"en": "Digest mode is now {status}.", "ru": "Режим сводки теперь {status}."},
     "notif_setting_manage_muted_btn": {"en": "Manage Muted/Allowed Users", "ru": "Управление блокировками"},
     "notif_setting_noon_updated_to": {"en": "NOON (Not on Online) is now {status}.", "ru": "NOON (Не в сети) теперь {status}."},
     "enabled_status": {"en": "Enabled", "ru": "Включено"},
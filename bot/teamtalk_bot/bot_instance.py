@@ -4,4 +4,4 @@ from bot.config import app_config
 
 tt_bot = pytalk.TeamTalkBot(client_name=app_config["CLIENT_NAME"])
 current_tt_instance: pytalk.instance.TeamTalkInstance | None = None
-login_complete_time: datetime | None = None # Used to ignore initial flood of user logins
+login_complete_time: datetime | None = None # None until the post-login roster snapshot is taken; join/leave events are ignored meanwhile
@@ -0,0 +1,101 @@
+import logging
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable
+
+import pytalk
+from pytalk.exceptions import TeamTalkException
+from pytalk.instance import TeamTalkInstance
+
+from bot.constants import TT_COMMAND_REPLY_TIMEOUT_SECONDS
+from bot.teamtalk_bot.sdk_executor import TT_SDK
+
+logger = logging.getLogger(__name__)
+sdk = pytalk.instance.sdk
+
+_REPLY_EVENTS = (sdk.ClientEvent.CLIENTEVENT_CMD_SUCCESS, sdk.ClientEvent.CLIENTEVENT_CMD_ERROR)
+_UNCLAIMED_REPLIES_MAX = 64 # Replies to commands nobody waits for (joins, status changes, ...)
+
+
+class _CommandReplyTap:
+    """Stands in for TeamTalkInstance.super and reports command replies read by getMessage()."""
+
+    def __init__(self, client, on_reply: Callable[[int, bool, int, str], None]):
+        self._client = client
+        self._on_reply = on_reply
+
+    def getMessage(self, *args):
+        msg = self._client.getMessage(*args)
+        if msg.nClientEvent in _REPLY_EVENTS:
+            if msg.nClientEvent == sdk.ClientEvent.CLIENTEVENT_CMD_SUCCESS:
+                self._on_reply(msg.nSource, True, 0, "")
+            else:
+                self._on_reply(msg.nSource, False, msg.clienterrormsg.nErrorNo, sdk.ttstr(msg.clienterrormsg.szErrorMsg))
+        return msg
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class TeamTalkCommandResults:
+    """
+    Runs TeamTalk commands that need the server's reply (kick, ban) without blocking the loop.
+
+    pytalk's own kick_user/ban_user wait in _waitForCmd, which reads (and drops) other messages
+    from the client's single queue for up to 2s per command. Here the raw command is only sent
+    via TT_SDK; the CMD_SUCCESS/CMD_ERROR reply is taken from the messages pytalk's event loop
+    already reads (it ignores them otherwise) and resolves the awaiting coroutine.
+    """
+
+    def __init__(self, reply_timeout_seconds: float):
+        self.reply_timeout_seconds = reply_timeout_seconds
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._waiters: dict[int, asyncio.Future] = {}
+        self._unclaimed: OrderedDict[int, tuple[bool, int, str]] = OrderedDict()
+
+    def attach(self, tt_instance: TeamTalkInstance) -> None:
+        """Taps the instance's replies; called on every login, pytalk reuses the instance on reconnect."""
+        self._loop = asyncio.get_running_loop()
+        if not isinstance(tt_instance.super, _CommandReplyTap):
+            tt_instance.super = _CommandReplyTap(tt_instance.super, self._on_reply)
+
+    def _on_reply(self, cmd_id: int, succeeded: bool, error_no: int, error_message: str) -> None:
+        # pytalk also reads messages on its connect/login worker threads
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._resolve, cmd_id, (succeeded, error_no, error_message))
+
+    def _resolve(self, cmd_id: int, reply: tuple[bool, int, str]) -> None:
+        waiter = self._waiters.pop(cmd_id, None)
+        if waiter is not None:
+            if not waiter.done():
+                waiter.set_result(reply)
+            return
+        # The reply can be read before the caller starts waiting for it
+        self._unclaimed[cmd_id] = reply
+        while len(self._unclaimed) > _UNCLAIMED_REPLIES_MAX:
+            self._unclaimed.popitem(last=False)
+
+    async def run(self, name: str, command: Callable[..., int], *args: Any) -> None:
+        """
+        Sends command(*args) (a raw TeamTalk TT_Do* call returning a command ID) and waits for the reply.
+        Raises TeamTalkException if the command is not sent, the server rejects it or does not reply in time.
+        """
+        cmd_id = await TT_SDK.call(name, command, *args)
+        if cmd_id == -1:
+            raise TeamTalkException(f"SDK failed to dispatch the {name} command.")
+        reply = self._unclaimed.pop(cmd_id, None)
+        if reply is None:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[cmd_id] = waiter
+            try:
+                reply = await asyncio.wait_for(waiter, self.reply_timeout_seconds)
+            except asyncio.TimeoutError:
+                raise TeamTalkException(f"No reply to the {name} command within {self.reply_timeout_seconds}s.") from None
+            finally:
+                self._waiters.pop(cmd_id, None)
+        succeeded, error_no, error_message = reply
+        if not succeeded:
+            raise TeamTalkException(f"{name} command failed with server error {error_no}: {error_message}")
+
+
+TT_COMMANDS = TeamTalkCommandResults(TT_COMMAND_REPLY_TIMEOUT_SECONDS)
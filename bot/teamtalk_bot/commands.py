@@ -10,7 +10,8 @@ from pytalk.message import Message as TeamTalkMessage
 from bot.config import app_config
 from bot.localization import get_text
 from bot.database.crud import create_deeplink, add_admin, remove_admin_db
-from bot.telegram_bot.bot_instances import tg_bot_event # For get_me()
+from bot.telegram_bot.bot_instances import tg_bot_event # For admin command menus
+from bot.telegram_bot.event_shards import EVENT_SHARDS
 from bot.telegram_bot.commands import ADMIN_COMMANDS, USER_COMMANDS
 from bot.teamtalk_bot.utils import send_long_tt_reply # For help message
 from bot.constants import (
@@ -143,7 +144,8 @@ async def _generate_and_reply_deeplink(
             payload=payload,
             expected_telegram_id=None
         )
-        bot_info_val = await tg_bot_event.get_me()
+        # Subscribers are spread over the event bot shards; the link must open the shard that will message them
+        bot_info_val = await EVENT_SHARDS.bot_for_new_subscriber(sender_tt_username).me()
         deeplink_url_val = f"https://t.me/{bot_info_val.username}?start={token_val}"
 
         logger.info(success_log_message.format(token=token_val, sender_username=sender_tt_username))
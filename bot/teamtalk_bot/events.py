@@ -1,5 +1,6 @@
 import logging
 import asyncio
+import time
 from datetime import datetime
 
 import pytalk
@@ -11,7 +12,11 @@ from pytalk.enums import UserStatusMode
 
 from bot.config import app_config
 from bot.database.engine import SessionFactory
-from bot.core.notifications import send_join_leave_notification_logic
+from bot.core.join_leave_coalescer import JOIN_LEAVE_COALESCER
+from bot.core.notifications import (
+    send_roster_diff_notifications, send_channel_join_notifications,
+    forget_join_awaiting_channel, clear_joins_awaiting_channel
+)
 from bot.core.user_settings import USER_SETTINGS_CACHE # For admin lang in on_message
 from bot.constants import (
     DEFAULT_LANGUAGE, TEAMTALK_PRIVATE_MESSAGE_TYPE,
@@ -20,6 +25,10 @@ from bot.constants import (
 
 # Import bot_instance variables carefully
 from bot.teamtalk_bot import bot_instance as tt_bot_module
+from bot.teamtalk_bot.online_users import ONLINE_USERS
+from bot.teamtalk_bot.sdk_executor import TT_SDK
+from bot.teamtalk_bot.command_results import TT_COMMANDS
+from bot.teamtalk_bot.server_properties import SERVER_PROPERTIES
 from bot.teamtalk_bot.utils import (
     _tt_reconnect,
     _tt_rejoin_channel,
@@ -46,6 +55,9 @@ async def _initiate_reconnect(reason: str):
     """
     logger.warning(reason) # Log the reason for reconnection first
 
+    ONLINE_USERS.suspend() # Roster is kept and diffed against a fresh snapshot on the next login
+    clear_joins_awaiting_channel()
+
     if tt_bot_module.current_tt_instance is not None:
         logger.info(f"Resetting current_tt_instance and login_complete_time due to: {reason}")
         tt_bot_module.current_tt_instance = None
@@ -86,16 +98,10 @@ async def on_my_login(server: PytalkServer):
     tt_instance_val = server.teamtalk_instance
     tt_bot_module.current_tt_instance = tt_instance_val
     tt_bot_module.login_complete_time = None
+    TT_COMMANDS.attach(tt_instance_val) # Kick/ban replies are taken from pytalk's event processing
 
-    server_name = "Unknown Server"
-    try:
-        server_props = tt_instance_val.server.get_properties()
-        if server_props:
-            server_name = ttstr(server_props.server_name)
-    except Exception as e_prop:
-        logger.warning(f"Could not get server name on login: {e_prop}")
-
-    logger.info(f"Successfully logged in to TeamTalk server: {server_name} ({ttstr(server.info.host)})")
+    await SERVER_PROPERTIES.refresh(tt_instance_val)
+    logger.info(f"Successfully logged in to TeamTalk server: {SERVER_PROPERTIES.server_name or 'Unknown Server'} ({ttstr(server.info.host)})")
 
     try:
         channel_id_or_path_val = app_config["CHANNEL"]
@@ -118,15 +124,23 @@ async def on_my_login(server: PytalkServer):
 
         if channel_id_val != -1:
             logger.info(f"Attempting to join channel: '{target_channel_name_log}' (Resolved ID: {channel_id_val})")
-            tt_instance_val.join_channel_by_id(channel_id_val, password=app_config.get("CHANNEL_PASSWORD"))
+            await TT_SDK.call("join_channel_by_id", tt_instance_val.join_channel_by_id, channel_id_val, password=app_config.get("CHANNEL_PASSWORD"))
             await asyncio.sleep(1) # Allow time for join to process
         else:
             logger.warning(f"Could not resolve channel '{app_config['CHANNEL']}' to an ID during login. Bot will remain in current channel (likely root).")
 
-        tt_instance_val.change_status(UserStatusMode.ONLINE, app_config["STATUS_TEXT"])
+        await TT_SDK.call("change_status", tt_instance_val.change_status, UserStatusMode.ONLINE, app_config["STATUS_TEXT"])
         logger.info(f"TeamTalk status set to: '{app_config['STATUS_TEXT']}'")
+        joined_users, left_users = [], []
+        try:
+            # Full snapshot once the initial user sync has arrived; sync events for users in it are skipped.
+            # Taken on the loop, not via TT_SDK, so no login/logout event is processed between snapshot and resync.
+            joined_users, left_users = ONLINE_USERS.resync(tt_instance_val.server.get_users())
+        except Exception as e_users:
+            logger.warning(f"Could not rebuild online user index after login: {e_users}")
         tt_bot_module.login_complete_time = datetime.utcnow() # Mark login sequence as complete
         logger.info(f"TeamTalk login sequence complete at {tt_bot_module.login_complete_time}.")
+        await send_roster_diff_notifications(joined_users, left_users, tt_instance_val)
 
     except Exception as e:
         logger.error(f"Error during on_my_login (joining channel/setting status): {e}", exc_info=True)
@@ -134,6 +148,12 @@ async def on_my_login(server: PytalkServer):
             asyncio.create_task(_tt_rejoin_channel(tt_instance_val))
 
 
+@tt_bot_module.tt_bot.event
+async def on_server_update(server: PytalkServer):
+    """Called when the server's properties (name, MOTD, limits) are changed."""
+    await SERVER_PROPERTIES.refresh(server.teamtalk_instance)
+
+
 @tt_bot_module.tt_bot.event
 async def on_my_connection_lost(server: PytalkServer):
     """Called when the connection to the TeamTalk server is lost."""
@@ -190,7 +210,7 @@ async def on_message(message: TeamTalkMessage):
 
     bot_reply_language = DEFAULT_LANGUAGE
     if app_config.get("TG_ADMIN_CHAT_ID"):
-        admin_settings = USER_SETTINGS_CACHE.get(app_config["TG_ADMIN_CHAT_ID"])
+        admin_settings = USER_SETTINGS_CACHE.peek(app_config["TG_ADMIN_CHAT_ID"])
         if admin_settings:
             bot_reply_language = admin_settings.language
 
@@ -214,9 +234,12 @@ async def on_message(message: TeamTalkMessage):
 @tt_bot_module.tt_bot.event
 async def on_user_login(user: TeamTalkUser):
     """Called when a user logs into the server."""
+    ingress_time = time.time()
+    if not ONLINE_USERS.add(user):
+        return # Already in the post-login snapshot: a late initial sync event, not a real join
     tt_instance = user.server.teamtalk_instance # Get instance from user object
     if tt_instance:
-        await send_join_leave_notification_logic(NOTIFICATION_EVENT_JOIN, user, tt_instance)
+        await JOIN_LEAVE_COALESCER.submit(NOTIFICATION_EVENT_JOIN, user, tt_instance, ingress_time)
     else:
         logger.warning(f"on_user_login: Could not get TeamTalkInstance from user {ttstr(user.username)}. Skipping notification.")
 
@@ -224,9 +247,20 @@ async def on_user_login(user: TeamTalkUser):
 @tt_bot_module.tt_bot.event
 async def on_user_logout(user: TeamTalkUser):
     """Called when a user logs out from the server."""
+    ingress_time = time.time()
+    channel_id = ONLINE_USERS.channel_of(user.id) # The logout event itself no longer carries the channel
+    forget_join_awaiting_channel(user.id) # Never entered a channel: filtered subscribers get neither join nor leave
+    if not ONLINE_USERS.remove(user):
+        return # Unknown session, e.g. logged out before the post-login snapshot
     tt_instance = user.server.teamtalk_instance
     if tt_instance:
-        await send_join_leave_notification_logic(NOTIFICATION_EVENT_LEAVE, user, tt_instance)
+        await JOIN_LEAVE_COALESCER.submit(NOTIFICATION_EVENT_LEAVE, user, tt_instance, ingress_time, channel_id)
     else:
         logger.warning(f"on_user_logout: Could not get TeamTalkInstance from user {ttstr(user.username)}. Skipping notification.")
 
+
+@tt_bot_module.tt_bot.event
+async def on_user_join(user: TeamTalkUser, channel: PytalkChannel):
+    """Called when a user joins a channel; tracked for per-channel subscription filters."""
+    ONLINE_USERS.set_channel(user.id, channel.id)
+    await send_channel_join_notifications(user, channel.id) # Only if the login was dispatched before this
@@ -0,0 +1,133 @@
+import logging
+from typing import Iterable
+
+import pytalk
+from pytalk.user import User as TeamTalkUser
+
+logger = logging.getLogger(__name__)
+ttstr = pytalk.instance.sdk.ttstr
+
+
+class RosterUser:
+    """A user remembered from an earlier roster; has the User attributes the notification path reads."""
+    __slots__ = ("id", "username", "nickname", "channel_id")
+
+    def __init__(self, user_id: int, username: str, nickname: str, channel_id: int = 0):
+        self.id = user_id
+        self.username = username
+        self.nickname = nickname
+        self.channel_id = channel_id
+
+
+class OnlineUserIndex:
+    """
+    In-memory view of who is logged in to the TeamTalk server.
+
+    Maintained from login/logout events and rebuilt from a full get_users() snapshot
+    after each (re)login, so online checks do not have to call into the SDK.
+    One username can be logged in from several clients, so sessions are counted.
+    Each session's last joined channel is kept (also after leaving it), so a logout
+    can still be attributed to the channel the user was in.
+
+    On disconnect the roster is kept (suspend) and compared with the first snapshot after
+    re-login (resync), so only users whose presence changed during the gap are reported.
+    """
+
+    def __init__(self):
+        self._username_by_user_id: dict[int, str] = {}
+        self._session_counts: dict[str, int] = {}
+        self._channel_by_user_id: dict[int, int] = {}
+        self._roster_users: dict[str, RosterUser] = {} # Latest session per username, for leave notifications
+        self._is_synced = False # True once built from a full snapshot and until the next disconnect
+        self._roster_before_gap: dict[str, RosterUser] | None = None
+
+    def __len__(self) -> int:
+        return len(self._username_by_user_id)
+
+    def is_online(self, username: str) -> bool:
+        return username in self._session_counts
+
+    def channel_of(self, user_id: int) -> int:
+        """Last channel the session joined; 0 if unknown."""
+        return self._channel_by_user_id.get(user_id, 0)
+
+    def set_channel(self, user_id: int, channel_id: int) -> None:
+        username = self._username_by_user_id.get(user_id)
+        if username is None or not channel_id:
+            return
+        self._channel_by_user_id[user_id] = channel_id
+        roster_user = self._roster_users.get(username)
+        if roster_user is not None and roster_user.id == user_id:
+            roster_user.channel_id = channel_id
+
+    def rebuild(self, users: Iterable[TeamTalkUser]) -> None:
+        self.clear()
+        for user in users:
+            self.add(user)
+        self._is_synced = True
+        logger.debug(f"Online user index rebuilt: {len(self._username_by_user_id)} sessions, {len(self._session_counts)} usernames.")
+
+    def clear(self) -> None:
+        self._username_by_user_id.clear()
+        self._session_counts.clear()
+        self._channel_by_user_id.clear()
+        self._roster_users.clear()
+        self._is_synced = False
+
+    def suspend(self) -> None:
+        """Called on disconnect: remembers the roster for resync() and empties the live index."""
+        # After a failed reconnect the index is already empty; keep the roster from before the first drop
+        if self._is_synced and self._roster_before_gap is None:
+            self._roster_before_gap = dict(self._roster_users)
+        self.clear()
+
+    def resync(self, users: Iterable[TeamTalkUser]) -> tuple[list[TeamTalkUser], list[RosterUser]]:
+        """
+        Rebuilds the index from a post-login snapshot and returns (joined, left): users whose
+        presence changed since suspend(). Both are empty on the first login.
+        """
+        users_list = list(users)
+        self.rebuild(users_list)
+        roster_before_gap, self._roster_before_gap = self._roster_before_gap, None
+        if roster_before_gap is None:
+            return [], []
+
+        joined_users = []
+        seen_usernames = set()
+        for user in users_list:
+            username = self._username_by_user_id.get(user.id)
+            if username and username not in roster_before_gap and username not in seen_usernames:
+                seen_usernames.add(username)
+                joined_users.append(user)
+        left_users = [roster_user for username, roster_user in roster_before_gap.items() if username not in self._session_counts]
+        return joined_users, left_users
+
+    def add(self, user: TeamTalkUser) -> bool:
+        """Returns False if the session is already known (e.g. a sync event for a user from the snapshot)."""
+        if user.id in self._username_by_user_id:
+            return False
+        username = ttstr(user.username)
+        channel_id = user.channel.id if user.channel else 0 # 0 right after login, set by on_user_join
+        self._username_by_user_id[user.id] = username
+        self._session_counts[username] = self._session_counts.get(username, 0) + 1
+        if channel_id:
+            self._channel_by_user_id[user.id] = channel_id
+        self._roster_users[username] = RosterUser(user.id, username, ttstr(user.nickname), channel_id)
+        return True
+
+    def remove(self, user: TeamTalkUser) -> bool:
+        """Returns False if the session was not known."""
+        username = self._username_by_user_id.pop(user.id, None)
+        if username is None:
+            return False
+        self._channel_by_user_id.pop(user.id, None)
+        remaining_sessions = self._session_counts.get(username, 0) - 1
+        if remaining_sessions > 0:
+            self._session_counts[username] = remaining_sessions
+        else:
+            self._session_counts.pop(username, None)
+            self._roster_users.pop(username, None)
+        return True
+
+
+ONLINE_USERS = OnlineUserIndex()
@@ -0,0 +1,63 @@
+import logging
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from bot.core.metrics import LATENCY_METRICS
+from bot.constants import TT_SDK_SLOW_CALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TeamTalkSdkExecutor:
+    """
+    Runs blocking pytalk/TeamTalk SDK calls on one dedicated worker thread.
+
+    Calls made through it are serialised and awaited, so Telegram polling and fan-out keep
+    running while the SDK is busy. Each call is recorded as "tt_sdk.<name>" (queueing + call)
+    and "tt_sdk.queue_wait". pytalk's own event processing still runs on the event loop.
+
+    Only plain getters and fire-and-forget commands belong here: calls that wait for a command
+    reply (pytalk's kick_user, ban_user, ...) read the client's single message queue, which the
+    loop also drains. Send the raw command (sdk._DoKickUser, ...) through TT_COMMANDS instead.
+    """
+
+    def __init__(self, slow_call_seconds: float):
+        self.slow_call_seconds = slow_call_seconds
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tt-sdk")
+        return self._executor
+
+    async def call(self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Runs func(*args, **kwargs) on the SDK thread and returns its result; exceptions are re-raised here."""
+        submitted_at = time.perf_counter()
+        started_at = submitted_at
+
+        def run_timed():
+            nonlocal started_at
+            started_at = time.perf_counter()
+            return func(*args, **kwargs)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), run_timed)
+        finally:
+            finished_at = time.perf_counter()
+            LATENCY_METRICS.observe("tt_sdk.queue_wait", started_at - submitted_at)
+            LATENCY_METRICS.observe(f"tt_sdk.{name}", finished_at - submitted_at)
+            if finished_at - submitted_at > self.slow_call_seconds:
+                logger.warning(
+                    f"Slow TeamTalk SDK call {name}: {finished_at - submitted_at:.3f}s "
+                    f"({started_at - submitted_at:.3f}s queued)."
+                )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+TT_SDK = TeamTalkSdkExecutor(TT_SDK_SLOW_CALL_SECONDS)
@@ -0,0 +1,40 @@
+import logging
+import time
+
+import pytalk
+from pytalk.instance import TeamTalkInstance
+
+from bot.teamtalk_bot.sdk_executor import TT_SDK
+
+logger = logging.getLogger(__name__)
+ttstr = pytalk.instance.sdk.ttstr
+
+
+class ServerPropertiesCache:
+    """
+    Last known TeamTalk server properties.
+
+    Refreshed in on_my_login (so also after every reconnect) and on the SDK's server update
+    event; readers never call into the SDK. Values are kept while disconnected.
+    """
+
+    def __init__(self):
+        self.server_name = ""
+        self.refreshed_at: float | None = None # time.time() of the last successful refresh
+
+    async def refresh(self, tt_instance: TeamTalkInstance) -> None:
+        try:
+            server_props = await TT_SDK.call("get_properties", tt_instance.server.get_properties)
+        except Exception as e:
+            logger.warning(f"Could not refresh TeamTalk server properties: {e}")
+            return
+        if not server_props:
+            return
+        server_name = ttstr(server_props.server_name)
+        if server_name != self.server_name:
+            logger.info(f"TeamTalk server name is now '{server_name}'.")
+        self.server_name = server_name
+        self.refreshed_at = time.time()
+
+
+SERVER_PROPERTIES = ServerPropertiesCache()
@@ -32,6 +32,7 @@ from bot.core.user_settings import USER_SETTINGS_CACHE # For admin language
 # from bot.localization import get_text # This line was a comment in the search, ensuring it's handled.
 # DEFAULT_LANGUAGE is imported from the group import of bot.constants
 from bot.core.utils import get_effective_server_name, get_tt_user_display_name
+from bot.teamtalk_bot.sdk_executor import TT_SDK
 
 
 logger = logging.getLogger(__name__)
@@ -128,12 +129,10 @@ async def forward_tt_message_to_telegram_admin(
         return
 
     admin_chat_id = app_config["TG_ADMIN_CHAT_ID"]
-    admin_settings = USER_SETTINGS_CACHE.get(admin_chat_id)
+    admin_settings = USER_SETTINGS_CACHE.peek(admin_chat_id)
     admin_language = admin_settings.language if admin_settings else DEFAULT_LANGUAGE
 
-    tt_instance_val = message.teamtalk_instance # Instance from which message originated
-
-    server_name_val = get_effective_server_name(tt_instance_val)
+    server_name_val = get_effective_server_name()
     sender_display_val = get_tt_user_display_name(message.user, admin_language)
     message_content = message.content
 
@@ -251,14 +250,14 @@ async def _tt_rejoin_channel(tt_instance: TeamTalkInstance):
                 continue
 
             logger.info(f"Attempting to rejoin channel: {channel_name_val} (ID: {channel_id_val}) (Attempt {attempts_val})")
-            tt_instance.join_channel_by_id(channel_id_val, password=app_config.get("CHANNEL_PASSWORD"))
+            await TT_SDK.call("join_channel_by_id", tt_instance.join_channel_by_id, channel_id_val, password=app_config.get("CHANNEL_PASSWORD"))
             await asyncio.sleep(1) # Give time for action to complete
 
             current_channel_id_val = tt_instance.getMyChannelID()
             if current_channel_id_val == channel_id_val:
                 logger.info(f"Successfully rejoined channel {channel_name_val}.")
                 # Update status text again in case it was lost
-                tt_instance.change_status(UserStatusMode.ONLINE, app_config["STATUS_TEXT"])
+                await TT_SDK.call("change_status", tt_instance.change_status, UserStatusMode.ONLINE, app_config["STATUS_TEXT"])
                 break # Exit rejoin loop
             else:
                 logger.warning(f"Failed to rejoin channel {channel_name_val}. Current channel ID: {current_channel_id_val}. Retrying...")
@@ -1,8 +1,31 @@
 from aiogram import Bot
 from bot.config import app_config
+from bot.telegram_bot.send_scheduler import ScheduledSendMiddleware
+from bot.telegram_bot.http_session import TelegramHttpSession, create_telegram_session
+
+# All bots talk to the same API host, so by default they share one connection pool
+_shared_session = create_telegram_session("shared") if app_config["TG_HTTP_SHARED_SESSION"] else None
+
+
+def _create_bot(token: str, session_name: str) -> Bot:
+    return Bot(token=token, session=_shared_session or create_telegram_session(session_name))
+
 
 # Bot for handling events like join/leave, deeplinks
-tg_bot_event = Bot(token=app_config["TG_EVENT_TOKEN"])
+tg_bot_event = _create_bot(app_config["TG_EVENT_TOKEN"], "event")
+
+# Extra event bots; join/leave notifications are sharded across all event bots (see event_shards.py)
+tg_event_shard_bots = [
+    _create_bot(token, f"event_shard_{shard_idx}")
+    for shard_idx, token in enumerate(app_config["TG_EVENT_SHARD_TOKENS"], start=1)
+]
+tg_event_bots = [tg_bot_event] + tg_event_shard_bots
 
 # Bot for forwarding messages from TeamTalk to admin (optional)
-tg_bot_message = Bot(token=app_config["TG_BOT_MESSAGE_TOKEN"]) if app_config["TG_BOT_MESSAGE_TOKEN"] else None
+tg_bot_message = _create_bot(app_config["TG_BOT_MESSAGE_TOKEN"], "message") if app_config["TG_BOT_MESSAGE_TOKEN"] else None
+
+# Direct sends (handler replies, edits) share the per-bot scheduler's rate limits in its urgent lane.
+# The middleware gets the Bot with each request, so a shared session needs it only once.
+_sessions: dict[int, TelegramHttpSession] = {id(_bot.session): _bot.session for _bot in (*tg_event_bots, tg_bot_message) if _bot}
+for _session in _sessions.values():
+    _session.middleware(ScheduledSendMiddleware())
@@ -16,7 +16,7 @@ class SubscriptionCallback(CallbackData, prefix="sub_set"):
 
 # For NOON toggle, navigating to mute management
 class NotificationActionCallback(CallbackData, prefix="notif_action"):
-    action: str  # e.g., "toggle_noon", "manage_muted"
+    action: str  # e.g., "toggle_noon", "toggle_digest", "manage_muted"
 
 # For toggling Mute All
 class MuteAllCallback(CallbackData, prefix="mute_all_toggle"):
@@ -0,0 +1,147 @@
+import logging
+import time
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramNetworkError, TelegramServerError
+
+from bot.core.recipient_reaper import classify_dead_recipient
+from bot.constants import (
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_BASE_COOLDOWN_SECONDS,
+    CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class ChatCircuitOpenError(Exception):
+    """Raised instead of sending when the chat's circuit is open."""
+
+    def __init__(self, chat_id: int, retry_in: float):
+        super().__init__(f"Circuit for chat {chat_id} is open, next probe in {retry_in:.0f}s")
+        self.chat_id = chat_id
+        self.retry_in = retry_in
+
+
+def is_chat_delivery_failure(error: TelegramAPIError) -> bool:
+    """
+    Errors that count against a chat: timeouts, server errors and BadRequests that do not
+    mean the chat is gone (those go to the recipient reaper instead).
+    """
+    if isinstance(error, (TelegramNetworkError, TelegramServerError)):
+        return True
+    return isinstance(error, TelegramBadRequest) and classify_dead_recipient(error) is None
+
+
+class _ChatCircuit:
+    __slots__ = ("consecutive_failures", "trips", "open_until", "probing", "last_error")
+
+    def __init__(self):
+        self.consecutive_failures = 0
+        self.trips = 0 # Times the circuit opened in a row; drives the cool-down
+        self.open_until = 0.0 # time.monotonic() value; 0 while closed
+        self.probing = False
+        self.last_error = ""
+
+
+class ChatCircuitBreaker:
+    """
+    Per-chat circuit breaker for outgoing messages.
+
+    After CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive failures the chat is skipped for a
+    cool-down that doubles on every trip (up to CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS).
+    When it expires one send is let through as a probe: success closes the circuit,
+    failure opens it again. Only chats with recent failures are tracked.
+    """
+
+    def __init__(self, failure_threshold: int, base_cooldown_seconds: float, max_cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown_seconds = base_cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self._circuits: dict[int, _ChatCircuit] = {}
+        self.skipped_count = 0
+
+    def _state(self, circuit: _ChatCircuit, now: float) -> str:
+        if not circuit.open_until:
+            return CIRCUIT_CLOSED
+        return CIRCUIT_OPEN if now < circuit.open_until else CIRCUIT_HALF_OPEN
+
+    def before_send(self, chat_id: int) -> None:
+        """Raises ChatCircuitOpenError if the chat must be skipped; otherwise the send may go ahead."""
+        circuit = self._circuits.get(chat_id)
+        if circuit is None:
+            return
+        now = time.monotonic()
+        state = self._state(circuit, now)
+        if state == CIRCUIT_CLOSED:
+            return
+        if state == CIRCUIT_HALF_OPEN and not circuit.probing:
+            circuit.probing = True
+            logger.info(f"Circuit for chat {chat_id} half-open: sending a probe.")
+            return
+        self.skipped_count += 1
+        raise ChatCircuitOpenError(chat_id, max(circuit.open_until - now, 0.0))
+
+    def record(self, chat_id: int, succeeded: bool | None, error: Exception | None = None) -> None:
+        """Outcome of a send: True, False (counts against the chat) or None (says nothing about the chat)."""
+        if succeeded:
+            if self._circuits.pop(chat_id, None) is not None:
+                logger.debug(f"Circuit for chat {chat_id} closed after a successful send.")
+            return
+
+        circuit = self._circuits.get(chat_id)
+        if succeeded is None:
+            if circuit is not None:
+                circuit.probing = False # Inconclusive probe; the next send probes again
+            return
+
+        if circuit is None:
+            circuit = _ChatCircuit()
+            self._circuits[chat_id] = circuit
+        was_probing = circuit.probing
+        circuit.probing = False
+        circuit.consecutive_failures += 1
+        circuit.last_error = str(error) if error else ""
+        if was_probing or circuit.consecutive_failures >= self.failure_threshold:
+            cooldown = min(self.base_cooldown_seconds * 2 ** circuit.trips, self.max_cooldown_seconds)
+            circuit.trips += 1
+            circuit.open_until = time.monotonic() + cooldown
+            logger.warning(
+                f"Circuit for chat {chat_id} opened for {cooldown:.0f}s after {circuit.consecutive_failures} "
+                f"consecutive failures (trip #{circuit.trips}). Last error: {circuit.last_error}"
+            )
+
+    def reset(self, chat_id: int | None = None) -> int:
+        """Closes one chat's circuit, or all of them. Returns how many were removed."""
+        if chat_id is None:
+            removed_count = len(self._circuits)
+            self._circuits.clear()
+            return removed_count
+        return 1 if self._circuits.pop(chat_id, None) is not None else 0
+
+    def snapshot(self) -> list[dict]:
+        """Tracked chats, open circuits first."""
+        now = time.monotonic()
+        entries = [
+            {
+                "chat_id": chat_id,
+                "state": self._state(circuit, now),
+                "consecutive_failures": circuit.consecutive_failures,
+                "trips": circuit.trips,
+                "retry_in": max(circuit.open_until - now, 0.0),
+                "last_error": circuit.last_error,
+            }
+            for chat_id, circuit in self._circuits.items()
+        ]
+        state_order = {CIRCUIT_OPEN: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_CLOSED: 2}
+        entries.sort(key=lambda entry: (state_order[entry["state"]], -entry["consecutive_failures"]))
+        return entries
+
+
+CHAT_CIRCUIT_BREAKER = ChatCircuitBreaker(
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_BASE_COOLDOWN_SECONDS,
+    CIRCUIT_BREAKER_MAX_COOLDOWN_SECONDS
+)
@@ -11,11 +11,16 @@ USER_COMMANDS: List[BotCommand] = [
     BotCommand(command="who", description="Show online users in TeamTalk"),
     BotCommand(command="help", description="Show this help message"),
     BotCommand(command="settings", description="Access interactive settings menu"),
+    BotCommand(command="filter", description="Toggle a username or pattern in your mute list"),
+    BotCommand(command="channels", description="Choose the TeamTalk channels you get notifications for"),
+    BotCommand(command="quiet", description="Set quiet hours for notifications"),
 ]
 
 ADMIN_COMMANDS: List[BotCommand] = USER_COMMANDS + [
     BotCommand(command="kick", description="Kick TT user (admin, via buttons)"),
     BotCommand(command="ban", description="Ban TT user (admin, via buttons)"),
+    BotCommand(command="stats", description="Show notification latency and queue stats (admin)"),
+    BotCommand(command="circuits", description="Show/reset chats skipped after delivery failures (admin)"),
 ]
 
 
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.crud import (
     add_subscriber,
+    set_subscriber_event_bot,
     delete_user_data_fully, # Added for new _handle_unsubscribe_deeplink
     get_deeplink as db_get_deeplink,
     delete_deeplink_by_token
@@ -18,6 +19,7 @@ from bot.core.user_settings import (
     update_user_settings_in_db
 )
 from bot.localization import get_text
+from bot.telegram_bot.event_shards import EVENT_SHARDS
 from bot.constants import (
     ACTION_SUBSCRIBE,
     ACTION_UNSUBSCRIBE,
@@ -96,7 +98,7 @@ async def _handle_subscribe_and_link_noon_deeplink(
         current_settings.not_on_online_enabled = False # Explicitly set to False for new/changed linking
         logger.info(f"User {telegram_id} newly confirmed NOON for TT user {tt_username_from_payload}. 'not_on_online_enabled' set to False.")
 
-    await update_user_settings_in_db(session, telegram_id, current_settings)
+    update_user_settings_in_db(telegram_id, current_settings)
 
     final_tt_username = current_settings.teamtalk_username
     # Fallback for final_tt_username, though current_settings.teamtalk_username should be set by the logic above.
@@ -112,6 +114,15 @@ async def _handle_subscribe_and_link_noon_deeplink(
 
 
 # Define a type for the handler functions
+async def _assign_event_bot(session: AsyncSession, telegram_id: int, bot_id: int) -> None:
+    """Keeps the subscriber on the event bot they just started; only that bot is allowed to message them."""
+    if EVENT_SHARDS.bot_for_chat(telegram_id).id == bot_id:
+        return
+    if await set_subscriber_event_bot(session, telegram_id, bot_id):
+        EVENT_SHARDS.assign(telegram_id, bot_id)
+        logger.info(f"User {telegram_id} assigned to event bot {bot_id}.")
+
+
 DeeplinkHandlerType = Callable[[AsyncSession, int, str, Any, UserSpecificSettings], Coroutine[Any, Any, str]]
 
 
@@ -158,9 +169,13 @@ async def handle_deeplink_payload(
             elif deeplink_obj.action == ACTION_SUBSCRIBE_AND_LINK_NOON:
                 # Call with the original signature for _handle_subscribe_and_link_noon_deeplink
                 reply_text_val = await handler(session, telegram_id_val, language, deeplink_obj.payload, user_specific_settings)
+                if message.bot and EVENT_SHARDS.is_event_bot(message.bot):
+                    await _assign_event_bot(session, telegram_id_val, message.bot.id)
             elif deeplink_obj.action == ACTION_SUBSCRIBE:
                 # Call with the original signature for _handle_subscribe_deeplink
                 reply_text_val = await handler(session, telegram_id_val, language, None, user_specific_settings)
+                if message.bot and EVENT_SHARDS.is_event_bot(message.bot):
+                    await _assign_event_bot(session, telegram_id_val, message.bot.id)
             else:
                 # Fallback for any other actions that might somehow get here if DEEPLINK_ACTION_HANDLERS has unexpected entries
                 logger.warning(f"Deeplink action '{deeplink_obj.action}' has a handler but no specific call structure in handle_deeplink_payload.")
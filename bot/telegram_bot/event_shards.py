@@ -0,0 +1,59 @@
+import logging
+import zlib
+from aiogram import Bot
+
+from bot.telegram_bot.bot_instances import tg_event_bots
+
+logger = logging.getLogger(__name__)
+
+
+class EventBotShards:
+    """
+    Spreads join/leave traffic over the event bot and the extra TG_EVENT_SHARD_TOKENS bots.
+    Every bot has its own send scheduler, so throughput grows with the number of tokens.
+
+    A bot can only message users who started it, so a subscriber stays with the bot that
+    handled their subscribe deeplink (stored in SubscribedUser.event_bot_id). New deeplinks
+    point to a shard picked deterministically from the TeamTalk username.
+    Subscribers without a stored bot, or whose bot is no longer configured, use the main event bot.
+    """
+
+    def __init__(self, bots: list[Bot]):
+        self.bots = bots
+        self._bots_by_id: dict[int, Bot] = {bot.id: bot for bot in bots}
+        self._chat_bot_ids: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    def is_event_bot(self, bot: Bot) -> bool:
+        return bot.id in self._bots_by_id
+
+    def bot_for_new_subscriber(self, shard_key: str) -> Bot:
+        # crc32 rather than hash(): str hashes are randomized per process
+        return self.bots[zlib.crc32(shard_key.encode("utf-8")) % len(self.bots)]
+
+    def bot_for_chat(self, chat_id: int) -> Bot:
+        bot_id = self._chat_bot_ids.get(chat_id)
+        if bot_id is None:
+            return self.bots[0]
+        return self._bots_by_id.get(bot_id, self.bots[0])
+
+    def assign(self, chat_id: int, bot_id: int) -> None:
+        self._chat_bot_ids[chat_id] = bot_id
+
+    def remove(self, chat_id: int) -> None:
+        self._chat_bot_ids.pop(chat_id, None)
+
+    def load(self, chat_bot_ids: dict[int, int]) -> None:
+        self._chat_bot_ids = dict(chat_bot_ids)
+        unknown_bot_count = sum(1 for bot_id in self._chat_bot_ids.values() if bot_id not in self._bots_by_id)
+        if unknown_bot_count:
+            logger.warning(
+                f"{unknown_bot_count} subscribers are assigned to event bots that are no longer configured; "
+                "they fall back to the main event bot."
+            )
+        logger.info(f"Event bot shards: {len(self.bots)} bots, {len(self._chat_bot_ids)} subscriber assignments loaded.")
+
+
+EVENT_SHARDS = EventBotShards(tg_event_bots)
@@ -1,10 +1,24 @@
 import logging
+import html
+import time
 from aiogram import Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 
 from bot.telegram_bot.filters import IsAdminFilter
 from bot.telegram_bot.utils import show_user_buttons
+from bot.telegram_bot.send_scheduler import get_send_queue_depths
+from bot.telegram_bot.http_session import get_http_pool_stats
+from bot.telegram_bot.circuit_breaker import CHAT_CIRCUIT_BREAKER
+from bot.constants import CIRCUIT_BREAKER_LIST_LIMIT
+from bot.core.metrics import LATENCY_METRICS
+from bot.core.outbox import NOTIFICATION_OUTBOX
+from bot.core.quiet_hours import QUIET_HOURS
+from bot.core.recipient_reaper import RECIPIENT_REAPER
+from bot.core.settings_writer import SETTINGS_WRITER
+from bot.core.user_settings import USER_SETTINGS_CACHE
+from bot.core.join_leave_coalescer import JOIN_LEAVE_COALESCER
+from bot.localization import get_text
 from pytalk.instance import TeamTalkInstance # For type hint
 
 logger = logging.getLogger(__name__)
@@ -33,3 +47,99 @@ async def ban_command_handler(
 ):
     # IsAdminFilter already applied at router level
     await show_user_buttons(message, "ban", language, tt_instance)
+
+
+@admin_router.message(Command("stats"))
+async def stats_command_handler(
+    message: Message,
+    language: str # From UserSettingsMiddleware
+):
+    # Latency in milliseconds per "<pipeline>.<stage>"; percentiles are histogram bucket upper bounds
+    snapshot = LATENCY_METRICS.snapshot()
+    if snapshot:
+        name_width = max(len(name) for name in snapshot)
+        lines = [f"{'stage':<{name_width}} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+        for name, stats in snapshot.items():
+            lines.append(
+                f"{name:<{name_width}} {stats['count']:>7} "
+                + " ".join(f"{stats[key] * 1000:>8.0f}" for key in ("p50", "p95", "p99", "max"))
+            )
+        latency_table = html.escape("\n".join(lines))
+    else:
+        latency_table = get_text("STATS_NO_DATA", language)
+
+    scheduler_depths = ", ".join(f"{bot_id}: {depth}" for bot_id, depth in get_send_queue_depths().items()) or "-"
+    reply_text = get_text("STATS_HEADER", language, uptime_minutes=int((time.time() - LATENCY_METRICS.started_at) / 60))
+    reply_text += f"\n<pre>{latency_table}</pre>\n"
+    reply_text += get_text(
+        "STATS_QUEUES", language,
+        coalescer_pending=JOIN_LEAVE_COALESCER.pending_count,
+        outbox_in_memory=NOTIFICATION_OUTBOX.pending_in_memory,
+        outbox_failed_flushes=NOTIFICATION_OUTBOX.failed_flush_count,
+        scheduler_depths=scheduler_depths,
+        reaper_queue=RECIPIENT_REAPER.queue_size,
+        reaped_count=RECIPIENT_REAPER.reaped_count
+    )
+    reply_text += "\n" + get_text(
+        "STATS_QUIET_HOURS", language,
+        deferred_chats=QUIET_HOURS.deferred_chats,
+        deferred_count=QUIET_HOURS.deferred_count,
+        suppressed_count=QUIET_HOURS.suppressed_count
+    )
+    reply_text += "\n" + get_text(
+        "STATS_SETTINGS_WRITES", language,
+        pending_count=SETTINGS_WRITER.pending_count,
+        written_count=SETTINGS_WRITER.written_count,
+        flush_count=SETTINGS_WRITER.flush_count,
+        failed_flush_count=SETTINGS_WRITER.failed_flush_count
+    )
+    reply_text += "\n" + get_text(
+        "STATS_SETTINGS_CACHE", language,
+        pinned_count=USER_SETTINGS_CACHE.pinned_count,
+        transient_count=USER_SETTINGS_CACHE.transient_count,
+        hits=USER_SETTINGS_CACHE.hits,
+        misses=USER_SETTINGS_CACHE.misses,
+        evicted_count=USER_SETTINGS_CACHE.evicted_count
+    )
+    for pool_stats in get_http_pool_stats():
+        reply_text += "\n" + get_text("STATS_HTTP_POOL", language, **pool_stats)
+    await message.reply(reply_text, parse_mode="HTML")
+
+
+@admin_router.message(Command("circuits"))
+async def circuits_command_handler(
+    message: Message,
+    command: CommandObject,
+    language: str # From UserSettingsMiddleware
+):
+    """Lists chats with delivery failures; "/circuits reset [chat_id]" closes one or all circuits."""
+    args_list = (command.args or "").split()
+    if args_list and args_list[0] == "reset":
+        if len(args_list) > 1 and not args_list[1].lstrip("-").isdigit():
+            await message.reply(get_text("CIRCUITS_USAGE", language), parse_mode="HTML")
+            return
+        reset_count = CHAT_CIRCUIT_BREAKER.reset(int(args_list[1]) if len(args_list) > 1 else None)
+        await message.reply(get_text("CIRCUITS_RESET_DONE", language, count=reset_count))
+        return
+    if args_list:
+        await message.reply(get_text("CIRCUITS_USAGE", language), parse_mode="HTML")
+        return
+
+    entries = CHAT_CIRCUIT_BREAKER.snapshot()
+    if not entries:
+        await message.reply(get_text("CIRCUITS_EMPTY", language, skipped_count=CHAT_CIRCUIT_BREAKER.skipped_count))
+        return
+
+    lines = [
+        f"{entry['chat_id']} {entry['state']} failures={entry['consecutive_failures']} trips={entry['trips']}"
+        + (f" retry_in={entry['retry_in']:.0f}s" if entry["retry_in"] else "")
+        + (f"\n  {entry['last_error'][:100]}" if entry["last_error"] else "")
+        for entry in entries[:CIRCUIT_BREAKER_LIST_LIMIT]
+    ]
+    reply_text = get_text(
+        "CIRCUITS_HEADER", language,
+        count=len(entries), shown=min(len(entries), CIRCUIT_BREAKER_LIST_LIMIT), skipped_count=CHAT_CIRCUIT_BREAKER.skipped_count
+    )
+    circuits_table = html.escape("\n".join(lines))
+    reply_text += f"\n<pre>{circuits_table}</pre>"
+    await message.reply(reply_text, parse_mode="HTML")
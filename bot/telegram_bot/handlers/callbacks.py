@@ -9,8 +9,10 @@ import pytalk
 from pytalk.instance import TeamTalkInstance
 
 from bot.localization import get_text
-from bot.core.user_settings import UserSpecificSettings, update_user_settings_in_db
+from bot.core.user_settings import UserSpecificSettings, update_user_settings_in_db, toggle_muted_user_in_db
 from bot.telegram_bot.filters import IsAdminFilter
+from bot.teamtalk_bot.sdk_executor import TT_SDK
+from bot.teamtalk_bot.command_results import TT_COMMANDS
 from bot.telegram_bot.keyboards import (
     create_main_settings_keyboard,
     create_language_selection_keyboard,
@@ -27,7 +29,8 @@ from bot.constants import (
 
 logger = logging.getLogger(__name__)
 callback_router = Router(name="callback_router")
-ttstr = pytalk.instance.sdk.ttstr
+sdk = pytalk.instance.sdk
+ttstr = sdk.ttstr
 
 
 async def _execute_tt_user_action(
@@ -39,7 +42,7 @@ async def _execute_tt_user_action(
     admin_tg_id: int
 ) -> str:
     try:
-        user_to_act_on = tt_instance.server.get_user(user_id_val) # Fetches the TeamTalkUser object
+        user_to_act_on = await TT_SDK.call("get_user", tt_instance.server.get_user, user_id_val) # Fetches the TeamTalkUser object
 
         if user_to_act_on:
             # It's good to use the full nickname from the user object for messages if available,
@@ -55,14 +58,15 @@ async def _execute_tt_user_action(
 
             quoted_nickname = html.quote(user_nickname_val) # Use the nickname from callback for messages
 
+            # Raw TT_DoKickUser/TT_DoBanUser sent via TT_SDK; the server's reply arrives through pytalk's event loop
             if action_val == "kick":
-                user_to_act_on.kick(from_server=True)
+                await TT_COMMANDS.run("kick", sdk._DoKickUser, tt_instance._tt, user_id_val, 0) # Channel 0: from the server
                 logger.info(f"Admin {admin_tg_id} kicked TT user '{user_nickname_val}' (ID: {user_id_val}, Full Nick: {ttstr(user_to_act_on.nickname)}, User: {ttstr(user_to_act_on.username)})")
                 return get_text("CALLBACK_USER_KICKED", language, user_nickname=quoted_nickname)
 
             elif action_val == "ban":
-                user_to_act_on.ban(from_server=True)
-                user_to_act_on.kick(from_server=True) # Ensure kick after ban
+                await TT_COMMANDS.run("ban", sdk._DoBanUser, tt_instance._tt, user_id_val, 0)
+                await TT_COMMANDS.run("kick", sdk._DoKickUser, tt_instance._tt, user_id_val, 0) # Ensure kick after ban
                 logger.info(f"Admin {admin_tg_id} banned and kicked TT user '{user_nickname_val}' (ID: {user_id_val}, Full Nick: {ttstr(user_to_act_on.nickname)}, User: {ttstr(user_to_act_on.username)})")
                 return get_text("CALLBACK_USER_BANNED_KICKED", language, user_nickname=quoted_nickname)
 
@@ -200,7 +204,6 @@ async def cq_show_language_menu(
 @callback_router.callback_query(LanguageCallback.filter(F.action == "set_lang"))
 async def cq_set_language(
     callback_query: CallbackQuery,
-    session: AsyncSession,
     user_specific_settings: UserSpecificSettings,
     callback_data: LanguageCallback # Consumes LanguageCallback
 ):
@@ -209,16 +212,8 @@ async def cq_set_language(
         return
 
     new_lang_code = callback_data.lang_code
-    original_lang_code = user_specific_settings.language
     user_specific_settings.language = new_lang_code
-
-    try:
-        await update_user_settings_in_db(session, callback_query.from_user.id, user_specific_settings)
-    except Exception as e:
-        logger.error(f"Failed to update language in DB for user {callback_query.from_user.id} to {new_lang_code}: {e}")
-        user_specific_settings.language = original_lang_code
-        await callback_query.answer(get_text("error_occurred", new_lang_code), show_alert=True)
-        return
+    update_user_settings_in_db(callback_query.from_user.id, user_specific_settings)
 
     # After setting language, go back to the main settings menu, now in the new language
     # This requires re-creating the main settings menu
@@ -281,7 +276,6 @@ async def cq_show_subscriptions_menu(
 @callback_router.callback_query(SubscriptionCallback.filter(F.action == "set_sub"))
 async def cq_set_subscription_setting(
     callback_query: CallbackQuery,
-    session: AsyncSession,
     language: str, # Current language, not new one yet
     user_specific_settings: UserSpecificSettings,
     callback_data: SubscriptionCallback
@@ -314,16 +308,8 @@ async def cq_set_subscription_setting(
         await callback_query.answer("Error: Invalid setting value.", show_alert=True)
         return
 
-    original_setting = user_specific_settings.notification_settings
     user_specific_settings.notification_settings = new_setting_enum
-
-    try:
-        await update_user_settings_in_db(session, callback_query.from_user.id, user_specific_settings)
-    except Exception as e:
-        logger.error(f"Failed to update subscription setting in DB for user {callback_query.from_user.id} to {new_setting_enum.name}: {e}")
-        user_specific_settings.notification_settings = original_setting # Revert
-        await callback_query.answer(get_text("error_occurred", language), show_alert=True)
-        return
+    update_user_settings_in_db(callback_query.from_user.id, user_specific_settings)
 
     # Use factory from keyboards.py
     updated_builder = create_subscription_settings_keyboard(language, new_setting_enum)
@@ -404,7 +390,6 @@ async def cq_show_notifications_menu(
 @callback_router.callback_query(NotificationActionCallback.filter(F.action == "toggle_noon"))
 async def cq_toggle_noon_setting_action(
     callback_query: CallbackQuery,
-    session: AsyncSession,
     language: str,
     user_specific_settings: UserSpecificSettings,
     callback_data: NotificationActionCallback # Consumes NotificationActionCallback
@@ -416,17 +401,7 @@ async def cq_toggle_noon_setting_action(
 
     await callback_query.answer() # Acknowledge action
     user_specific_settings.not_on_online_enabled = not user_specific_settings.not_on_online_enabled
-
-    try:
-        await update_user_settings_in_db(session, callback_query.from_user.id, user_specific_settings)
-    except Exception as e:
-        logger.error(f"Failed to update NOON setting in DB for user {callback_query.from_user.id}: {e}")
-        user_specific_settings.not_on_online_enabled = not user_specific_settings.not_on_online_enabled
-        try:
-            await callback_query.answer(get_text("error_occurred", language), show_alert=True)
-        except TelegramAPIError as e_ans:
-             logger.warning(f"Could not send error alert for NOON toggle DB fail: {e_ans}")
-        return
+    update_user_settings_in_db(callback_query.from_user.id, user_specific_settings)
 
     new_status_text = get_text("ENABLED_STATUS" if user_specific_settings.not_on_online_enabled else "DISABLED_STATUS", language)
     try:
@@ -452,6 +427,42 @@ async def cq_toggle_noon_setting_action(
         logger.error(f"TelegramAPIError re-editing message for NOON toggle: {e}")
 
 
+@callback_router.callback_query(NotificationActionCallback.filter(F.action == "toggle_digest"))
+async def cq_toggle_digest_setting_action(
+    callback_query: CallbackQuery,
+    language: str,
+    user_specific_settings: UserSpecificSettings,
+    callback_data: NotificationActionCallback
+):
+    if not callback_query.message or not callback_query.from_user:
+        await callback_query.answer("Error: Missing data.")
+        return
+
+    user_specific_settings.digest_enabled = not user_specific_settings.digest_enabled
+    update_user_settings_in_db(callback_query.from_user.id, user_specific_settings)
+
+    new_status_text = get_text("ENABLED_STATUS" if user_specific_settings.digest_enabled else "DISABLED_STATUS", language)
+    try:
+        await callback_query.answer(
+            get_text("NOTIF_SETTING_DIGEST_UPDATED_TO", language, status=new_status_text),
+            show_alert=False
+        )
+    except TelegramAPIError as e:
+        logger.warning(f"Could not send digest update confirmation toast: {e}")
+
+    updated_builder = create_notification_settings_keyboard(language, user_specific_settings)
+    try:
+        await callback_query.message.edit_text(
+            text=get_text("NOTIF_SETTINGS_MENU_HEADER", language),
+            reply_markup=updated_builder.as_markup()
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e).lower():
+            logger.error(f"TelegramBadRequest re-editing message for digest toggle: {e}")
+    except TelegramAPIError as e:
+        logger.error(f"TelegramAPIError re-editing message for digest toggle: {e}")
+
+
 # --- Manage Muted Users Callbacks ---
 
 @callback_router.callback_query(NotificationActionCallback.filter(F.action == "manage_muted"))
@@ -482,7 +493,6 @@ async def cq_show_manage_muted_menu(
 @callback_router.callback_query(MuteAllCallback.filter(F.action == "toggle_mute_all"))
 async def cq_toggle_mute_all_action(
     callback_query: CallbackQuery,
-    session: AsyncSession,
     language: str,
     user_specific_settings: UserSpecificSettings,
     callback_data: MuteAllCallback # Consumes
@@ -494,17 +504,7 @@ async def cq_toggle_mute_all_action(
     await callback_query.answer() # Acknowledge first
 
     user_specific_settings.mute_all_flag = not user_specific_settings.mute_all_flag
-
-    try:
-        await update_user_settings_in_db(session, callback_query.from_user.id, user_specific_settings)
-    except Exception as e:
-        logger.error(f"Failed to update mute_all_flag in DB for user {callback_query.from_user.id}: {e}")
-        user_specific_settings.mute_all_flag = not user_specific_settings.mute_all_flag # Revert
-        try:
-            await callback_query.answer(get_text("error_occurred", language), show_alert=True)
-        except TelegramAPIError as e_ans:
-            logger.warning(f"Could not send error alert for mute_all_flag DB fail: {e_ans}")
-        return
+    update_user_settings_in_db(callback_query.from_user.id, user_specific_settings)
 
     # Send confirmation toast
     new_status_text = get_text("ENABLED_STATUS" if user_specific_settings.mute_all_flag else "DISABLED_STATUS", language)
@@ -724,7 +724,6 @@ async def cq_paginate_all_accounts_list_action(
 @callback_router.callback_query(ToggleMuteSpecificCallback.filter(F.action == "toggle_user"))
 async def cq_toggle_specific_user_mute_action(
     callback_query: CallbackQuery,
-    session: AsyncSession,
     language: str,
     user_specific_settings: UserSpecificSettings,
     tt_instance: TeamTalkInstance | None, # Needed if list_type is "server_users" for refresh
@@ -789,15 +788,11 @@ async def cq_toggle_specific_user_mute_action(
              await _display_paginated_user_list(callback_query, language, user_specific_settings, list_type, 0) # Refresh to page 0
         return
 
-    # Toggle logic
-    if username_to_toggle in user_specific_settings.muted_users_set:
-        user_specific_settings.muted_users_set.discard(username_to_toggle)
-    else:
-        user_specific_settings.muted_users_set.add(username_to_toggle)
-
+    # The cached list changes at once; the muted_users row is written shortly after
+    is_listed_after_toggle = toggle_muted_user_in_db(callback_query.from_user.id, user_specific_settings, username_to_toggle)
     is_mute_all_active = user_specific_settings.mute_all_flag
-    effectively_muted_after_toggle = (is_mute_all_active and username_to_toggle not in user_specific_settings.muted_users_set) or \
-                                     (not is_mute_all_active and username_to_toggle in user_specific_settings.muted_users_set)
+    effectively_muted_after_toggle = (is_mute_all_active and not is_listed_after_toggle) or \
+                                     (not is_mute_all_active and is_listed_after_toggle)
 
     status_for_toast = get_text("MUTED_STATUS" if effectively_muted_after_toggle else "NOT_MUTED_STATUS", language)
 
@@ -806,20 +801,9 @@ async def cq_toggle_specific_user_mute_action(
          toast_message = get_text("USER_MUTED_TOAST" if effectively_muted_after_toggle else "USER_UNMUTED_TOAST", language, username=html.quote(display_nickname_for_toast))
 
     try:
-        await update_user_settings_in_db(session, callback_query.from_user.id, user_specific_settings)
         await callback_query.answer(toast_message, show_alert=False)
-    except Exception as e:
-        logger.error(f"DB error or answer error in toggle_user for {username_to_toggle}: {e}")
-        # Revert change in memory on DB fail
-        if username_to_toggle in user_specific_settings.muted_users_set:
-            user_specific_settings.muted_users_set.discard(username_to_toggle)
-        else:
-            user_specific_settings.muted_users_set.add(username_to_toggle)
-        try:
-            await callback_query.answer(get_text("error_occurred", language), show_alert=True)
-        except TelegramAPIError: pass # Ignore if can't send error toast
-        # Do not refresh list if DB failed, as it would show inconsistent state
-        return
+    except TelegramAPIError as e:
+        logger.warning(f"Could not send mute toggle toast for {username_to_toggle}: {e}")
 
     # Refresh the correct list to the same page
     if list_type == "all_accounts":
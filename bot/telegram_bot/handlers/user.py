@@ -11,11 +11,15 @@ from pytalk.user import User as TeamTalkUser
 
 from bot.localization import get_text
 from bot.telegram_bot.deeplink import handle_deeplink_payload
-from bot.core.user_settings import UserSpecificSettings # For type hint
+from bot.core.user_settings import UserSpecificSettings, update_user_settings_in_db, toggle_muted_user_in_db
 from bot.telegram_bot.filters import IsAdminFilter # For /who admin view
 from bot.telegram_bot.keyboards import create_main_settings_keyboard
 from bot.core.utils import get_tt_user_display_name
+from bot.teamtalk_bot.sdk_executor import TT_SDK
+from bot.core.quiet_hours import is_valid_timezone
 from bot.constants import (
+    QUIET_HOURS_MODE_DIGEST,
+    QUIET_HOURS_MODE_SUPPRESS,
     WHO_CHANNEL_ID_ROOT,
     WHO_CHANNEL_ID_SERVER_ROOT_ALT,
     WHO_CHANNEL_ID_SERVER_ROOT_ALT2
@@ -175,7 +179,7 @@ async def who_command_handler(
         return
 
     try:
-        all_users_list = tt_instance.server.get_users()
+        all_users_list = await TT_SDK.call("get_users", tt_instance.server.get_users)
     except Exception as e:
         logger.error(f"Failed to get users from TT for /who: {e}")
         await message.reply(get_text("TT_ERROR_GETTING_USERS", language))
@@ -211,6 +215,183 @@ async def help_command_handler(message: Message, language: str): # From UserSett
     await message.reply(get_text("HELP_TEXT", language), parse_mode="Markdown")
 
 
+@user_commands_router.message(Command("filter"))
+async def filter_command_handler(
+    message: Message,
+    command: CommandObject,
+    language: str,
+    user_specific_settings: UserSpecificSettings
+):
+    """Toggles a username or pattern (name*, glob) in the user's muted list (allowed list with Mute All)."""
+    if not message.from_user: return
+
+    pattern_val = (command.args or "").strip()
+    if not pattern_val or "," in pattern_val: # Commas would break the stored list
+        await message.reply(get_text("FILTER_USAGE", language), parse_mode="HTML")
+        return
+
+    list_name_key = "FILTER_LIST_ALLOWED" if user_specific_settings.mute_all_flag else "FILTER_LIST_MUTED"
+    is_listed = toggle_muted_user_in_db(message.from_user.id, user_specific_settings, pattern_val)
+    reply_key = "FILTER_ADDED" if is_listed else "FILTER_REMOVED"
+    await message.reply(
+        get_text(reply_key, language, pattern=html.quote(pattern_val), list_name=get_text(list_name_key, language)),
+        parse_mode="HTML"
+    )
+
+
+async def _resolve_tt_channel_id(tt_instance: TeamTalkInstance, channel_arg: str) -> int | None:
+    """Channel ID from an ID or a channel path; None if the server has no such channel."""
+    try:
+        if channel_arg.isdigit():
+            await TT_SDK.call("get_path_from_channel", tt_instance.get_path_from_channel, int(channel_arg)) # Validates the ID
+            return int(channel_arg)
+        channel_obj = await TT_SDK.call("get_channel_from_path", tt_instance.get_channel_from_path, channel_arg)
+        return channel_obj.id
+    except ValueError: # pytalk raises it for unknown channels
+        return None
+
+
+async def _format_tt_channel(tt_instance: TeamTalkInstance | None, channel_id: int) -> str:
+    channel_path = ""
+    if tt_instance and tt_instance.connected and tt_instance.logged_in:
+        try:
+            channel_path = ttstr(await TT_SDK.call("get_path_from_channel", tt_instance.get_path_from_channel, channel_id))
+        except ValueError:
+            pass
+    return f"<code>{html.quote(channel_path)}</code> (ID {channel_id})" if channel_path else f"ID {channel_id}"
+
+
+@user_commands_router.message(Command("channels"))
+async def channels_command_handler(
+    message: Message,
+    command: CommandObject,
+    language: str,
+    user_specific_settings: UserSpecificSettings,
+    tt_instance: TeamTalkInstance | None
+):
+    """Shows or toggles the TeamTalk channels the user gets join/leave notifications for (all when empty)."""
+    if not message.from_user: return
+
+    channel_arg = (command.args or "").strip()
+    if not channel_arg:
+        if not user_specific_settings.watched_channels:
+            await message.reply(get_text("CHANNELS_ALL", language) + "\n\n" + get_text("CHANNELS_USAGE", language), parse_mode="HTML")
+            return
+        channel_lines = [
+            f"- {await _format_tt_channel(tt_instance, channel_id)}" for channel_id in sorted(user_specific_settings.watched_channels)
+        ]
+        await message.reply(
+            "\n".join([get_text("CHANNELS_LIST_HEADER", language), *channel_lines]) + "\n\n" + get_text("CHANNELS_USAGE", language),
+            parse_mode="HTML"
+        )
+        return
+
+    if channel_arg.lower() == "clear":
+        user_specific_settings.watched_channels = ()
+        update_user_settings_in_db(message.from_user.id, user_specific_settings)
+        await message.reply(get_text("CHANNELS_CLEARED", language))
+        return
+
+    if not tt_instance or not tt_instance.connected or not tt_instance.logged_in:
+        await message.reply(get_text("TT_BOT_NOT_CONNECTED", language))
+        return
+
+    channel_id = await _resolve_tt_channel_id(tt_instance, channel_arg)
+    if channel_id is None:
+        await message.reply(get_text("CHANNELS_NOT_FOUND", language, channel=html.quote(channel_arg)), parse_mode="HTML")
+        return
+
+    reply_key = "CHANNELS_ADDED" if user_specific_settings.toggle_watched_channel(channel_id) else "CHANNELS_REMOVED"
+
+    update_user_settings_in_db(message.from_user.id, user_specific_settings)
+    await message.reply(get_text(reply_key, language, channel=await _format_tt_channel(tt_instance, channel_id)), parse_mode="HTML")
+
+
+def _parse_quiet_hours_range(range_text: str) -> tuple[int, int] | None:
+    """Parses "23:00-07:00" into minutes of the day, (1380, 420); None if malformed."""
+    try:
+        start_text, end_text = range_text.split("-")
+        minutes = []
+        for time_text in (start_text, end_text):
+            hours_text, minutes_text = time_text.split(":")
+            hours_val, minutes_val = int(hours_text), int(minutes_text)
+            if not (0 <= hours_val < 24 and 0 <= minutes_val < 60):
+                return None
+            minutes.append(hours_val * 60 + minutes_val)
+    except ValueError:
+        return None
+    if minutes[0] == minutes[1]:
+        return None
+    return minutes[0], minutes[1]
+
+
+def _format_minute_of_day(minute_of_day: int) -> str:
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+@user_commands_router.message(Command("quiet"))
+async def quiet_command_handler(
+    message: Message,
+    command: CommandObject,
+    language: str,
+    user_specific_settings: UserSpecificSettings
+):
+    """Shows, sets or disables the user's quiet hours."""
+    if not message.from_user: return
+
+    args = (command.args or "").split()
+    if not args:
+        if user_specific_settings.quiet_hours_start is None:
+            reply_text = get_text("QUIET_OFF", language)
+        else:
+            reply_text = get_text(
+                "QUIET_CURRENT", language,
+                start=_format_minute_of_day(user_specific_settings.quiet_hours_start),
+                end=_format_minute_of_day(user_specific_settings.quiet_hours_end),
+                timezone=html.quote(user_specific_settings.quiet_hours_timezone or "UTC"),
+                mode=user_specific_settings.quiet_hours_mode
+            )
+        await message.reply(reply_text + "\n\n" + get_text("QUIET_USAGE", language), parse_mode="HTML")
+        return
+
+    if args[0].lower() == "off":
+        user_specific_settings.quiet_hours_start = None
+        user_specific_settings.quiet_hours_end = None
+        update_user_settings_in_db(message.from_user.id, user_specific_settings)
+        await message.reply(get_text("QUIET_OFF", language))
+        return
+
+    quiet_range = _parse_quiet_hours_range(args[0])
+    mode_val = QUIET_HOURS_MODE_DIGEST
+    timezone_val = user_specific_settings.quiet_hours_timezone
+    for arg in args[1:]:
+        if arg.lower() in (QUIET_HOURS_MODE_DIGEST, QUIET_HOURS_MODE_SUPPRESS):
+            mode_val = arg.lower()
+        else:
+            timezone_val = arg
+    if quiet_range is None or len(args) > 3:
+        await message.reply(get_text("QUIET_USAGE", language), parse_mode="HTML")
+        return
+    if timezone_val and not is_valid_timezone(timezone_val):
+        await message.reply(get_text("QUIET_BAD_TIMEZONE", language, timezone=html.quote(timezone_val)), parse_mode="HTML")
+        return
+
+    user_specific_settings.quiet_hours_start, user_specific_settings.quiet_hours_end = quiet_range
+    user_specific_settings.quiet_hours_timezone = timezone_val
+    user_specific_settings.quiet_hours_mode = mode_val
+    update_user_settings_in_db(message.from_user.id, user_specific_settings)
+    await message.reply(
+        get_text(
+            "QUIET_CURRENT", language,
+            start=_format_minute_of_day(quiet_range[0]),
+            end=_format_minute_of_day(quiet_range[1]),
+            timezone=html.quote(timezone_val or "UTC"),
+            mode=mode_val
+        ),
+        parse_mode="HTML"
+    )
+
+
 @user_commands_router.message(Command("settings"))
 async def settings_command_handler(
     message: Message,
@@ -0,0 +1,122 @@
+import logging
+import asyncio
+from types import SimpleNamespace
+from aiohttp import ClientSession, TraceConfig, TraceConnectionQueuedStartParams, TraceConnectionQueuedEndParams
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+from aiogram import __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from bot.config import app_config
+from bot.core.metrics import LATENCY_METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramHttpSession(AiohttpSession):
+    """
+    aiogram's aiohttp session with a configurable connection pool (TG_HTTP_* settings)
+    and counters that show whether the pool is saturated.
+
+    One session can serve several Bot instances (they all talk to the same API host),
+    so the event bots and the message bot share a single pool unless TG_HTTP_SHARED_SESSION=0.
+    Time spent waiting for a free connection is recorded as "telegram_http.connection_wait".
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        limit_per_host: int,
+        keepalive_seconds: float,
+        timeout_seconds: float
+    ):
+        super().__init__(limit=limit, timeout=timeout_seconds)
+        self.name = name
+        self.limit = limit
+        self._connector_init["limit_per_host"] = limit_per_host
+        self._connector_init["keepalive_timeout"] = keepalive_seconds
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connection_waits = 0
+
+    async def create_session(self) -> ClientSession:
+        # Same as AiohttpSession.create_session, plus the trace hooks for the pool counters
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+                trace_configs=[self._create_trace_config()],
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(self, bot, method, timeout=None):
+        self.in_flight += 1
+        if self.in_flight > self.peak_in_flight:
+            self.peak_in_flight = self.in_flight
+        try:
+            return await super().make_request(bot, method, timeout)
+        finally:
+            self.in_flight -= 1
+
+    def _create_trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        trace_config.on_connection_queued_start.append(self._on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_connection_queued_end)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_connection_queued_start(
+        self, session: ClientSession, trace_config_ctx: SimpleNamespace, params: TraceConnectionQueuedStartParams
+    ) -> None:
+        trace_config_ctx.queued_at = asyncio.get_running_loop().time()
+
+    async def _on_connection_queued_end(
+        self, session: ClientSession, trace_config_ctx: SimpleNamespace, params: TraceConnectionQueuedEndParams
+    ) -> None:
+        self.connection_waits += 1
+        LATENCY_METRICS.observe("telegram_http.connection_wait", asyncio.get_running_loop().time() - trace_config_ctx.queued_at)
+
+    async def _on_connection_create_end(self, session: ClientSession, trace_config_ctx: SimpleNamespace, params) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(self, session: ClientSession, trace_config_ctx: SimpleNamespace, params) -> None:
+        self.connections_reused += 1
+
+    def pool_stats(self) -> dict[str, int | str]:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "connection_waits": self.connection_waits,
+        }
+
+
+_SESSIONS: list[TelegramHttpSession] = []
+
+
+def create_telegram_session(name: str) -> TelegramHttpSession:
+    session = TelegramHttpSession(
+        name=name,
+        limit=app_config["TG_HTTP_POOL_LIMIT"],
+        limit_per_host=app_config["TG_HTTP_POOL_LIMIT_PER_HOST"],
+        keepalive_seconds=app_config["TG_HTTP_KEEPALIVE_SECONDS"],
+        timeout_seconds=app_config["TG_HTTP_TIMEOUT_SECONDS"]
+    )
+    _SESSIONS.append(session)
+    return session
+
+
+def get_http_pool_stats() -> list[dict[str, int | str]]:
+    return [session.pool_stats() for session in _SESSIONS]
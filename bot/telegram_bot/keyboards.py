@@ -24,6 +24,7 @@ from bot.telegram_bot.callback_data import (
 )
 from bot.database.models import NotificationSetting # For subscription settings
 from bot.core.user_settings import UserSpecificSettings # For notification and mute settings
+from bot.core.username_filters import UsernamePatternMatcher
 
 ttstr = pytalk.instance.sdk.ttstr # For convenience if dealing with pytalk strings
 
@@ -110,6 +111,12 @@ def create_notification_settings_keyboard(
         text=noon_button_text,
         callback_data=NotificationActionCallback(action="toggle_noon").pack()
     )
+
+    digest_status_text = get_text("ENABLED_STATUS" if user_specific_settings.digest_enabled else "DISABLED_STATUS", language)
+    builder.button(
+        text=get_text("NOTIF_SETTING_DIGEST_BTN_TOGGLE", language, status=digest_status_text),
+        callback_data=NotificationActionCallback(action="toggle_digest").pack()
+    )
     builder.button(
         text=get_text("NOTIF_SETTING_MANAGE_MUTED_BTN", language),
         callback_data=NotificationActionCallback(action="manage_muted").pack()
@@ -227,13 +234,14 @@ def create_account_list_keyboard(
 ) -> InlineKeyboardBuilder:
     """Creates keyboard for a paginated list of all server user accounts."""
     builder = InlineKeyboardBuilder()
+    listed_matcher = UsernamePatternMatcher(user_specific_settings.muted_users_set) # List may contain patterns
 
     for idx, account_obj in enumerate(page_accounts):
         username_str = ttstr(account_obj._account.szUsername)
         # Nickname for display purposes; for UserAccount, username is the primary identifier.
         display_name = username_str
 
-        is_in_set = username_str in user_specific_settings.muted_users_set
+        is_in_set = listed_matcher.matches(username_str)
         is_effectively_muted = (user_specific_settings.mute_all_flag and not is_in_set) or \
                                (not user_specific_settings.mute_all_flag and is_in_set)
 
@@ -0,0 +1,314 @@
+import logging
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    TelegramMethod,
+    SendMessage,
+    EditMessageText,
+    EditMessageReplyMarkup,
+    ForwardMessage,
+    CopyMessage,
+)
+from aiogram.methods.base import TelegramType
+
+from bot.constants import (
+    TELEGRAM_GLOBAL_MESSAGES_PER_SECOND,
+    TELEGRAM_PER_CHAT_MESSAGES_PER_SECOND,
+    TELEGRAM_SEND_LANE_CONCURRENCY,
+    TELEGRAM_CHAT_BUCKET_IDLE_SECONDS,
+    TELEGRAM_SEND_SHUTDOWN_DRAIN_SECONDS,
+    SEND_PRIORITY_URGENT,
+    SEND_PRIORITY_NOTIFICATION,
+)
+
+logger = logging.getLogger(__name__)
+
+# Set while a scheduled send runs, so the request middleware does not schedule it a second time
+_SENDING_FROM_SCHEDULER: ContextVar[bool] = ContextVar("sending_from_scheduler", default=False)
+
+
+class TokenBucket:
+    """Classic token bucket; time values come from the event loop clock."""
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _SendJob:
+    __slots__ = ("chat_id", "send_factory", "future", "priority", "retries")
+
+    def __init__(self, chat_id: int, send_factory: Callable[[], Awaitable[Any]], future: asyncio.Future, priority: int):
+        self.chat_id = chat_id
+        self.send_factory = send_factory
+        self.future = future
+        self.priority = priority
+        self.retries = 0
+
+
+class TelegramSendScheduler:
+    """
+    Paces outbound sends of one Bot through a global token bucket and per-chat token buckets.
+    Sends throttled by the buckets or by a RetryAfter from Telegram are rescheduled, never dropped.
+
+    Sends are queued in priority lanes (SEND_PRIORITY_*). The lane with the lowest priority value
+    that has work and a free slot in its own concurrency budget gets the next global token,
+    so urgent sends are not stuck behind a broadcast.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lanes: dict[int, deque[_SendJob]] = {priority: deque() for priority in sorted(TELEGRAM_SEND_LANE_CONCURRENCY)}
+        self._lane_in_flight: dict[int, int] = {priority: 0 for priority in TELEGRAM_SEND_LANE_CONCURRENCY}
+        self._delayed: list[tuple[float, int, _SendJob]] = []
+        self._sequence = itertools.count()
+        self._global_bucket: TokenBucket | None = None
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._paused_until = 0.0
+        self._last_bucket_prune = 0.0
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._dispatcher_task: asyncio.Task | None = None
+        self._send_tasks: set[asyncio.Task] = set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of sends waiting to be dispatched (ready and delayed)."""
+        return sum(len(lane) for lane in self._lanes.values()) + len(self._delayed)
+
+    def queue_depths_by_priority(self) -> dict[int, int]:
+        depths = {priority: len(lane) for priority, lane in self._lanes.items()}
+        for _, _, job in self._delayed:
+            depths[job.priority] += 1
+        return depths
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def send(self, chat_id: int, send_factory: Callable[[], Awaitable[Any]], priority: int = SEND_PRIORITY_NOTIFICATION) -> Any:
+        """Queues a send and waits for its result. send_factory must create a fresh coroutine on each call."""
+        loop = asyncio.get_running_loop()
+        job = _SendJob(chat_id, send_factory, loop.create_future(), priority)
+        self._lanes[priority].append(job)
+        self._ensure_dispatcher()
+        self._wakeup.set()
+        return await job.future
+
+    async def close(self, drain_timeout: float = TELEGRAM_SEND_SHUTDOWN_DRAIN_SECONDS) -> None:
+        """Waits up to drain_timeout for queued sends, then stops the dispatcher."""
+        if self.queue_depth or self._in_flight:
+            logger.info(f"Send scheduler {self.name}: draining {self.queue_depth} queued and {self._in_flight} in-flight sends...")
+            deadline = asyncio.get_running_loop().time() + drain_timeout
+            while (self.queue_depth or self._in_flight) and asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.1)
+        if self._dispatcher_task and not self._dispatcher_task.done():
+            self._dispatcher_task.cancel()
+            try:
+                await self._dispatcher_task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._send_tasks):
+            task.cancel()
+        dropped_jobs = self._drain_pending()
+        for job in dropped_jobs:
+            if not job.future.done():
+                job.future.cancel()
+        if dropped_jobs:
+            logger.warning(f"Send scheduler {self.name}: dropped {len(dropped_jobs)} queued sends on shutdown.")
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher_task is None or self._dispatcher_task.done():
+            self._dispatcher_task = asyncio.create_task(self._dispatch_loop(), name=f"tg_send_scheduler_{self.name}")
+
+    def _drain_pending(self) -> list[_SendJob]:
+        pending = [job for lane in self._lanes.values() for job in lane] + [job for _, _, job in self._delayed]
+        for lane in self._lanes.values():
+            lane.clear()
+        self._delayed.clear()
+        return pending
+
+    def _has_ready(self) -> bool:
+        return any(self._lanes.values())
+
+    def _next_lane(self) -> deque[_SendJob] | None:
+        """Highest-priority lane with queued sends and spare concurrency, if any."""
+        for priority, lane in self._lanes.items():
+            if lane and self._lane_in_flight[priority] < TELEGRAM_SEND_LANE_CONCURRENCY[priority]:
+                return lane
+        return None
+
+    def _delay_job(self, job: _SendJob, ready_at: float) -> None:
+        heapq.heappush(self._delayed, (ready_at, next(self._sequence), job))
+
+    def _promote_delayed(self, now: float) -> None:
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            self._lanes[job.priority].append(job)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(TELEGRAM_PER_CHAT_MESSAGES_PER_SECOND, 1, now)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_chat_buckets(self, now: float) -> None:
+        if now - self._last_bucket_prune < TELEGRAM_CHAT_BUCKET_IDLE_SECONDS:
+            return
+        self._last_bucket_prune = now
+        idle_chat_ids = [
+            chat_id for chat_id, bucket in self._chat_buckets.items()
+            if now - bucket.updated_at > TELEGRAM_CHAT_BUCKET_IDLE_SECONDS
+        ]
+        for chat_id in idle_chat_ids:
+            del self._chat_buckets[chat_id]
+
+    async def _wait(self, timeout: float | None) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._global_bucket = self._global_bucket or TokenBucket(
+            TELEGRAM_GLOBAL_MESSAGES_PER_SECOND, TELEGRAM_GLOBAL_MESSAGES_PER_SECOND, loop.time()
+        )
+        while True:
+            now = loop.time()
+            self._promote_delayed(now)
+            self._prune_chat_buckets(now)
+            next_ready_in = self._delayed[0][0] - now if self._delayed else None
+
+            if not self._has_ready():
+                await self._wait(next_ready_in)
+                continue
+
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            lane = self._next_lane()
+            if lane is None: # Every lane with work is at its concurrency budget; a finishing send wakes us
+                await self._wait(next_ready_in)
+                continue
+
+            global_delay = self._global_bucket.delay(now)
+            if global_delay > 0:
+                await asyncio.sleep(global_delay)
+                continue
+
+            job = lane.popleft()
+            if job.future.done(): # Caller went away (cancelled); nothing to send
+                continue
+
+            chat_bucket = self._chat_bucket(job.chat_id, now)
+            chat_delay = chat_bucket.delay(now)
+            if chat_delay > 0:
+                self._delay_job(job, now + chat_delay)
+                continue
+
+            self._global_bucket.consume(now)
+            chat_bucket.consume(now)
+
+            self._in_flight += 1
+            self._lane_in_flight[job.priority] += 1
+            task = asyncio.create_task(self._run_job(job))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _run_job(self, job: _SendJob) -> None:
+        _SENDING_FROM_SCHEDULER.set(True) # Task-local: each job runs in its own task context
+        try:
+            result = await job.send_factory()
+        except TelegramRetryAfter as e:
+            loop = asyncio.get_running_loop()
+            job.retries += 1
+            self._paused_until = max(self._paused_until, loop.time() + e.retry_after)
+            logger.warning(
+                f"Send scheduler {self.name}: RetryAfter {e.retry_after}s for chat {job.chat_id} "
+                f"(retry #{job.retries}). Pausing sends, queue depth {self.queue_depth + 1}."
+            )
+            self._delay_job(job, self._paused_until)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            self._lane_in_flight[job.priority] -= 1
+            self._wakeup.set()
+
+
+class ScheduledSendMiddleware(BaseRequestMiddleware):
+    """
+    Session middleware that routes sends made directly through the Bot (handler replies,
+    message edits) into the urgent lane of the bot's scheduler, so they share its rate limits.
+    """
+    _SCHEDULED_METHODS = (SendMessage, EditMessageText, EditMessageReplyMarkup, ForwardMessage, CopyMessage)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> TelegramType:
+        if _SENDING_FROM_SCHEDULER.get() or not isinstance(method, self._SCHEDULED_METHODS) or method.chat_id is None:
+            return await make_request(bot, method)
+        return await get_send_scheduler(bot).send(
+            method.chat_id,
+            lambda: make_request(bot, method),
+            priority=SEND_PRIORITY_URGENT
+        )
+
+
+_SCHEDULERS: dict[int, TelegramSendScheduler] = {}
+
+
+def get_send_scheduler(bot: Bot) -> TelegramSendScheduler:
+    """Returns the send scheduler of a Bot instance, creating it on first use."""
+    scheduler = _SCHEDULERS.get(bot.id)
+    if scheduler is None:
+        scheduler = TelegramSendScheduler(name=str(bot.id))
+        _SCHEDULERS[bot.id] = scheduler
+    return scheduler
+
+
+def get_send_queue_depths() -> dict[str, int]:
+    """Queue depth per bot scheduler, keyed by bot ID."""
+    return {scheduler.name: scheduler.queue_depth for scheduler in _SCHEDULERS.values()}
+
+
+async def close_send_schedulers() -> None:
+    for scheduler in _SCHEDULERS.values():
+        await scheduler.close()
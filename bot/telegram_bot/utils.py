@@ -1,6 +1,5 @@
 import logging
-import asyncio
-from typing import Callable
+import time
 from aiogram import Bot, html
 from aiogram.types import InlineKeyboardMarkup, Message
 from aiogram.exceptions import TelegramForbiddenError, TelegramAPIError, TelegramBadRequest
@@ -9,17 +8,20 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 import pytalk # For TeamTalkUser, TeamTalkInstance type hints
 from pytalk.instance import TeamTalkInstance
 
-from bot.config import app_config
 from bot.localization import get_text
-from bot.database.crud import remove_subscriber, delete_user_data_fully
-from bot.database.engine import SessionFactory # For direct session usage if needed
+from bot.core.recipient_reaper import RECIPIENT_REAPER, classify_dead_recipient
+from bot.core.metrics import LATENCY_METRICS, STAGE_SEND_START_TO_ACK
 from bot.core.user_settings import USER_SETTINGS_CACHE
 from bot.constants import (
     DEFAULT_LANGUAGE,
     CALLBACK_NICKNAME_MAX_LENGTH,
+    SEND_PRIORITY_URGENT,
 )
-from bot.telegram_bot.bot_instances import tg_bot_event, tg_bot_message # Import bot instances
+from bot.telegram_bot.send_scheduler import get_send_scheduler
+from bot.telegram_bot.circuit_breaker import CHAT_CIRCUIT_BREAKER, ChatCircuitOpenError, is_chat_delivery_failure
 from bot.core.utils import get_tt_user_display_name
+from bot.teamtalk_bot.online_users import ONLINE_USERS
+from bot.teamtalk_bot.sdk_executor import TT_SDK
 
 logger = logging.getLogger(__name__)
 ttstr = pytalk.instance.sdk.ttstr
@@ -27,49 +29,19 @@ ttstr = pytalk.instance.sdk.ttstr
 
 async def _handle_telegram_api_error(error: TelegramAPIError, chat_id: int, language: str): # language may be unused
     """
-    Handles specific Telegram API errors, performing actions like unsubscribing users
-    or logging detailed error information.
+    Handles Telegram API errors of a send. Recipients that can never be reached again
+    (blocked the bot, deactivated, chat not found) are queued for the batched reaper;
+    everything else is logged.
     """
-    if isinstance(error, TelegramForbiddenError):
-        if "bot was blocked by the user" in str(error).lower() or "user is deactivated" in str(error).lower():
-            logger.warning(f"User {chat_id} blocked the bot or is deactivated. Unsubscribing...")
-            try:
-                async with SessionFactory() as unsubscribe_session:
-                    removed = await remove_subscriber(unsubscribe_session, chat_id)
-                if removed:
-                    logger.info(f"Successfully unsubscribed blocked/deactivated user {chat_id}.")
-                else:
-                    logger.info(f"User {chat_id} was likely already unsubscribed or not found (remove_subscriber returned False).")
-                USER_SETTINGS_CACHE.pop(chat_id, None)
-                logger.info(f"Removed user {chat_id} from settings cache.")
-            except Exception as db_err:
-                logger.error(f"Failed to unsubscribe blocked/deactivated user {chat_id} from DB: {db_err}")
-        else:
-            # For other Forbidden errors, just log. reply_tt_method was removed.
-            logger.error(f"Telegram API Forbidden error for chat_id {chat_id}: {error}")
-
+    dead_reason = classify_dead_recipient(error)
+    if dead_reason is not None:
+        logger.warning(f"Recipient {chat_id} is unreachable ({dead_reason.value}). Queued for removal. Error: {error}")
+        RECIPIENT_REAPER.enqueue(chat_id, dead_reason)
+    elif isinstance(error, TelegramForbiddenError):
+        logger.error(f"Telegram API Forbidden error for chat_id {chat_id}: {error}")
     elif isinstance(error, TelegramBadRequest):
-        if "chat not found" in str(error).lower():
-            logger.warning(f"Chat not found for TG ID {chat_id}. Assuming user is gone. Deleting all user data. Error: {error}")
-            try:
-                async with SessionFactory() as session:
-                    delete_success = await delete_user_data_fully(session, chat_id)
-                if delete_success:
-                    logger.info(f"Successfully deleted all data for TG ID {chat_id} due to chat not found.")
-                else:
-                    logger.error(f"Failed to delete all data for TG ID {chat_id} after chat not found.")
-
-                if USER_SETTINGS_CACHE.pop(chat_id, None): # Remove from cache regardless
-                    logger.info(f"Removed user {chat_id} from settings cache after chat not found.")
-                else:
-                    logger.info(f"User {chat_id} was not in settings cache (or already removed) after chat not found.")
-            except Exception as db_cleanup_err:
-                logger.error(f"Exception during full data cleanup for TG ID {chat_id} (chat not found): {db_cleanup_err}")
-        else:
-            # For other BadRequest errors, just log. reply_tt_method was removed.
-            logger.error(f"Telegram API BadRequest (non 'chat not found') for chat_id {chat_id}: {error}")
-
-    elif isinstance(error, TelegramAPIError): # Catch-all for other TelegramAPIError types
+        logger.error(f"Telegram API BadRequest (non 'chat not found') for chat_id {chat_id}: {error}")
+    else: # Catch-all for other TelegramAPIError types
         logger.error(f"Unhandled Telegram API error for chat_id {chat_id}: {error}")
 
     # Non-TelegramAPIError exceptions are not handled by this function.
@@ -82,7 +54,7 @@ async def _should_send_silently(chat_id: int, tt_instance_for_check: TeamTalkIns
     NOON (Notification On Online) settings and the online status of their linked TeamTalk user.
     """
     should_be_silent = False
-    recipient_settings = USER_SETTINGS_CACHE.get(chat_id)
+    recipient_settings = USER_SETTINGS_CACHE.peek(chat_id)
 
     if recipient_settings and \
        recipient_settings.not_on_online_enabled and \
@@ -94,11 +66,7 @@ async def _should_send_silently(chat_id: int, tt_instance_for_check: TeamTalkIns
         try:
             is_tt_user_online = False
             if tt_instance_for_check.connected and tt_instance_for_check.logged_in:
-                all_online_users = tt_instance_for_check.server.get_users()
-                for online_user in all_online_users:
-                    if ttstr(online_user.username) == tt_username_to_check:
-                        is_tt_user_online = True
-                        break
+                is_tt_user_online = ONLINE_USERS.is_online(tt_username_to_check)
             else:
                 logger.warning(f"Cannot check TT status for {tt_username_to_check}, TT instance not ready for chat_id {chat_id} (in _should_send_silently).")
 
@@ -112,28 +80,67 @@ async def _should_send_silently(chat_id: int, tt_instance_for_check: TeamTalkIns
     return should_be_silent
 
 
+async def deliver_telegram_message(
+    bot_instance: Bot,
+    chat_id: int,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    tt_instance_for_check: TeamTalkInstance | None = None,
+    priority: int = SEND_PRIORITY_URGENT
+) -> None:
+    """
+    Sends a single message, applying the NOON silent check.
+    Raises TelegramAPIError on failure and ChatCircuitOpenError if the chat is being skipped
+    after repeated failures; callers decide how to handle it.
+    """
+    CHAT_CIRCUIT_BREAKER.before_send(chat_id)
+    send_silently = await _should_send_silently(chat_id, tt_instance_for_check)
+
+    succeeded = None
+    send_error = None
+    try:
+        # Goes through the per-bot scheduler so global and per-chat rate limits are respected
+        await get_send_scheduler(bot_instance).send(
+            chat_id,
+            lambda: bot_instance.send_message(
+                chat_id=chat_id,
+                text=text,
+                reply_markup=reply_markup,
+                disable_notification=send_silently
+            ),
+            priority=priority
+        )
+        succeeded = True
+    except TelegramAPIError as e:
+        send_error = e
+        if is_chat_delivery_failure(e):
+            succeeded = False
+        raise
+    finally:
+        CHAT_CIRCUIT_BREAKER.record(chat_id, succeeded, send_error)
+    logger.debug(f"Message sent to {chat_id}. Silent: {send_silently}")
+
+
 async def send_telegram_message_individual(
     bot_instance: Bot,
     chat_id: int,
     text: str,
     language: str = DEFAULT_LANGUAGE,
     reply_markup: InlineKeyboardMarkup | None = None,
-    tt_instance_for_check: TeamTalkInstance | None = None
+    tt_instance_for_check: TeamTalkInstance | None = None,
     # reply_tt_method: Callable | None = None, # Parameter removed
+    priority: int = SEND_PRIORITY_URGENT
 ) -> bool: # Return type bool is already present, ensuring it stays.
-    # Determine if the message should be sent silently using the helper function
-    send_silently = await _should_send_silently(chat_id, tt_instance_for_check)
-
+    send_started_at = time.time()
     try:
-        await bot_instance.send_message(
-            chat_id=chat_id,
-            text=text,
-            reply_markup=reply_markup,
-            disable_notification=send_silently
-        )
-        logger.debug(f"Message sent to {chat_id}. Silent: {send_silently}")
+        await deliver_telegram_message(bot_instance, chat_id, text, reply_markup, tt_instance_for_check, priority)
+        LATENCY_METRICS.observe_since(f"direct.{STAGE_SEND_START_TO_ACK}", send_started_at)
         return True # Message sent successfully
 
+    except ChatCircuitOpenError as e:
+        logger.debug(f"Skipped message to {chat_id}: {e}")
+        return False
+
     except TelegramAPIError as e:
         # Delegate Telegram API error handling to the new helper function
         await _handle_telegram_api_error(e, chat_id, language)
@@ -144,50 +151,6 @@ async def send_telegram_message_individual(
     # Based on current structure, only TelegramAPIError results in False from this function.
 
 
-async def send_telegram_messages_to_list(
-    bot_token_to_use: str, # TG_EVENT_TOKEN or TG_BOT_MESSAGE_TOKEN
-    chat_ids: list[int],
-    text_generator: Callable[[str], str], # Takes language code, returns text
-    reply_markup_generator: Callable[[str, str, str, int], InlineKeyboardMarkup | None] | None = None, # tt_username, tt_nickname, lang, recipient_tg_id
-    tt_user_username_for_markup: str | None = None,
-    tt_user_nickname_for_markup: str | None = None,
-    tt_instance_for_check: TeamTalkInstance | None = None # For silent notification check
-):
-    """
-    Sends messages to a list of chat_ids.
-    Uses the appropriate bot instance based on bot_token_to_use.
-    """
-    bot_to_use = tg_bot_event if bot_token_to_use == app_config["TG_EVENT_TOKEN"] else tg_bot_message
-    if not bot_to_use:
-        logger.error(f"No Telegram bot instance available for token: {bot_token_to_use}")
-        return
-
-    tasks_list = []
-    for chat_id_val in chat_ids:
-        user_settings_val = USER_SETTINGS_CACHE.get(chat_id_val)
-        language_val = user_settings_val.language if user_settings_val else DEFAULT_LANGUAGE
-        text_val = text_generator(language_val)
-
-        current_reply_markup_val = None
-        if reply_markup_generator and tt_user_username_for_markup and tt_user_nickname_for_markup:
-            current_reply_markup_val = reply_markup_generator(
-                tt_user_username_for_markup,
-                tt_user_nickname_for_markup,
-                language_val,
-                chat_id_val
-            )
-
-        tasks_list.append(send_telegram_message_individual(
-            bot_instance=bot_to_use,
-            chat_id=chat_id_val,
-            text=text_val,
-            language=language_val,
-            reply_markup=current_reply_markup_val,
-            tt_instance_for_check=tt_instance_for_check
-        ))
-    await asyncio.gather(*tasks_list)
-
-
 async def show_user_buttons(
     message: Message,
     command_type: str, # e.g., "id", "kick", "ban"
@@ -199,7 +162,7 @@ async def show_user_buttons(
         return
 
     try:
-        users_list = tt_instance.server.get_users()
+        users_list = await TT_SDK.call("get_users", tt_instance.server.get_users)
     except Exception as e:
         logger.error(f"Failed to get users from TT for {command_type} button list: {e}")
         await message.reply(get_text("TT_ERROR_GETTING_USERS", language))
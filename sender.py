@@ -21,7 +21,15 @@ from bot.config import app_config # Load config early for potential use
 from bot.database.engine import init_db, SessionFactory
 from bot.database import crud # Import crud
 from bot.core.user_settings import load_user_settings_to_cache
-from bot.telegram_bot.bot_instances import tg_bot_event, tg_bot_message
+from bot.core.outbox import NOTIFICATION_OUTBOX
+from bot.core.join_leave_coalescer import JOIN_LEAVE_COALESCER
+from bot.core.digest import NOTIFICATION_DIGEST
+from bot.core.quiet_hours import QUIET_HOURS
+from bot.core.recipient_reaper import RECIPIENT_REAPER
+from bot.core.settings_writer import SETTINGS_WRITER
+from bot.telegram_bot.bot_instances import tg_bot_message, tg_event_bots
+from bot.telegram_bot.event_shards import EVENT_SHARDS
+from bot.telegram_bot.send_scheduler import close_send_schedulers
 from bot.telegram_bot.commands import set_telegram_commands
 from bot.telegram_bot.middlewares import (
     DbSessionMiddleware,
@@ -37,6 +45,7 @@ from bot.telegram_bot.handlers import (
 )
 # Import TeamTalk bot and its events so they are registered
 from bot.teamtalk_bot import bot_instance as tt_bot_module
+from bot.teamtalk_bot.sdk_executor import TT_SDK
 # Ensure TeamTalk events are loaded by importing the events module
 from bot.teamtalk_bot import events as tt_events # Loads event handlers
 
@@ -62,9 +71,17 @@ async def main_async():
     await init_db()
     logger.info("Database initialization complete.")
 
-    # Load user settings into cache
-    asyncio.create_task(load_user_settings_to_cache(SessionFactory))
-    logger.info("User settings loaded into cache.")
+    # Which event bot shard each subscriber is reached through; needed before the outbox sends anything
+    async with SessionFactory() as session:
+        EVENT_SHARDS.load(await crud.get_subscriber_event_bot_ids(session))
+
+    # Load user settings into cache in the background; handlers, notifications and the outbox wait on USER_SETTINGS_READY
+    settings_load_task = asyncio.create_task(load_user_settings_to_cache(SessionFactory), name="user_settings_load")
+
+    # Start draining the notification outbox (also picks up messages left by a previous run)
+    await NOTIFICATION_OUTBOX.start()
+    RECIPIENT_REAPER.start()
+    SETTINGS_WRITER.start()
 
     # Ensure TG_ADMIN_CHAT_ID is in the admin database
     tg_admin_chat_id_str = app_config.get("TG_ADMIN_CHAT_ID")
@@ -93,7 +110,8 @@ async def main_async():
         # For now, it will proceed with an empty list if fetching fails.
 
     # Set Telegram bot commands using admin IDs from the database
-    asyncio.create_task(set_telegram_commands(tg_bot_event, admin_ids=db_admin_ids))
+    for event_bot in tg_event_bots:
+        asyncio.create_task(set_telegram_commands(event_bot, admin_ids=db_admin_ids))
     logger.info("Telegram commands set.")
 
     dp = Dispatcher()
@@ -129,7 +147,7 @@ async def main_async():
 
     dp.shutdown.register(on_aiogram_shutdown)
     telegram_polling_task = dp.start_polling(
-        tg_bot_event,
+        *tg_event_bots, # Shard bots receive the /start deeplinks of their subscribers
         allowed_updates=dp.resolve_used_update_types() # Optimize updates
     )
     global _telegram_polling_task_ref_for_shutdown
@@ -164,7 +182,27 @@ async def main_async():
         await dp.storage.close() # If storage is used
         await dp.fsm.storage.close() # If FSM storage is used
 
-        await tg_bot_event.session.close()
+        if not settings_load_task.done():
+            settings_load_task.cancel() # Still sets USER_SETTINGS_READY, so the flushes below do not block
+        await JOIN_LEAVE_COALESCER.flush() # Pending join/leave events go to the outbox before it stops
+        await NOTIFICATION_DIGEST.flush_all()
+        await QUIET_HOURS.stop() # Deferred digests are persisted, due at the end of their quiet window
+        await NOTIFICATION_OUTBOX.stop()
+        logger.info("Notification outbox stopped.")
+
+        await close_send_schedulers()
+        logger.info("Telegram send schedulers stopped.")
+
+        await RECIPIENT_REAPER.stop()
+        logger.info("Recipient reaper stopped.")
+
+        await SETTINGS_WRITER.stop() # Writes the settings changes still staged
+        logger.info("Settings writer stopped.")
+
+        TT_SDK.shutdown()
+
+        for event_bot in tg_event_bots:
+            await event_bot.session.close()
         if tg_bot_message:
             await tg_bot_message.session.close()
         logger.info("Telegram bot sessions closed.")